@@ -0,0 +1,300 @@
+"""
+HeartGuard Pro - Cost-Aware Sequential Feature Acquisition
+Staged inference driven by the test costs in ``Heart Disease Data/costs``. A patient is
+first scored on the immediate, near-free tests (age, sex, chest pain, resting blood
+pressure) by a sub-model trained on exactly those features. While the probability stays
+inside the uncertainty band, the next test panel is requested and the patient is re-scored
+by the sub-model for the enlarged feature set; otherwise a decision is returned.
+
+Tests that share a procedure (heart-disease.group) are ordered together as one panel and
+priced with the group discount from heart-disease.expense. The panel order is chosen at
+fit time by cross-validated ROC-AUC gain per unit of cost.
+
+    python acquisition.py --benchmark     expected cost / latency vs accuracy on the held-out split
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, roc_auc_score
+from sklearn.model_selection import StratifiedKFold, cross_val_predict
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+import warnings
+
+warnings.filterwarnings('ignore')
+
+COST_DIR = os.path.join('Heart Disease Data', 'costs')
+ACQUISITION_MODEL_FILE = 'acquisition_model.pkl'
+FEATURES = ['age', 'sex', 'cp', 'trestbps', 'chol', 'fbs', 'restecg', 'thalach', 'exang', 'oldpeak', 'slope', 'ca', 'thal']
+
+# Probabilities inside [low, high] are too uncertain to act on without another test
+UNCERTAINTY_BAND = (0.2, 0.8)
+BENCHMARK_BANDS = [(0.5, 0.5), (0.4, 0.6), (0.3, 0.7), (0.2, 0.8), (0.1, 0.9), (0.05, 0.95), (0.0, 1.0)]
+CV_FOLDS = 5
+
+
+def _read_cost_file(path):
+    """``<test>: <value>[, <value>]`` rows -> {test: [values]}; blank and header rows are skipped."""
+    rows = {}
+    with open(path) as f:
+        for line in f:
+            test, sep, value = line.partition(':')
+            if sep and test.strip() in FEATURES:
+                rows[test.strip()] = [v.strip().rstrip('.') for v in value.split(',')]
+    return rows
+
+
+def load_test_costs(cost_dir=COST_DIR):
+    """Per-test cost, group-discounted cost, group and result delay from the UCI cost files."""
+    cost = _read_cost_file(os.path.join(cost_dir, 'heart-disease.cost'))
+    expense = _read_cost_file(os.path.join(cost_dir, 'heart-disease.expense'))
+    group = _read_cost_file(os.path.join(cost_dir, 'heart-disease.group'))
+    delay = _read_cost_file(os.path.join(cost_dir, 'heart-disease.delay'))
+    return {
+        test: {
+            'cost': float(cost[test][0]),
+            'discount_cost': float(expense.get(test, cost[test])[-1]),
+            'group': group[test][0] if test in group else None,
+            'delay': delay.get(test, ['delayed'])[0],
+        }
+        for test in FEATURES
+    }
+
+
+def build_panels(costs):
+    """
+    Orderable units of acquisition. Immediate tests form the free first panel; tests of one
+    group are ordered together (first at full cost, the rest at the discount); every other
+    delayed test is a panel of its own.
+    """
+    immediate = [t for t in FEATURES if costs[t]['delay'] == 'immediate']
+    panels = [{'name': 'intake', 'tests': immediate}]
+    seen = set(immediate)
+    for test in FEATURES:
+        if test in seen:
+            continue
+        grp = costs[test]['group']
+        members = [t for t in FEATURES if grp and costs[t]['group'] == grp] if grp else [test]
+        seen.update(members)
+        panels.append({'name': f'group {grp}' if grp else test, 'tests': members})
+    for panel in panels:
+        panel['cost'] = panel_cost(panel['tests'], costs)
+        panel['delay'] = 'immediate' if all(costs[t]['delay'] == 'immediate' for t in panel['tests']) else 'delayed'
+    return panels
+
+
+def panel_cost(tests, costs):
+    """Cheapest billing of ``tests`` ordered together: one full-price test per group, the rest discounted."""
+    if len(tests) == 1:
+        return costs[tests[0]]['cost']
+    full = [costs[t]['cost'] for t in tests]
+    discounted = [costs[t]['discount_cost'] for t in tests]
+    return round(min(full[i] + sum(discounted) - discounted[i] for i in range(len(tests))), 2)
+
+
+def default_estimator():
+    return make_pipeline(StandardScaler(), LogisticRegression(random_state=42, max_iter=1000))
+
+
+class StagedClassifier:
+    """
+    Sequence of sub-models over growing feature sets, one per acquired panel. ``stages[k]``
+    holds the tests acquired so far, their cumulative cost and the model fitted on them.
+    """
+
+    def __init__(self, costs=None, estimator=None, band=UNCERTAINTY_BAND, cv_folds=CV_FOLDS):
+        self.costs = costs or load_test_costs()
+        self.estimator = estimator if estimator is not None else default_estimator()
+        self.band = tuple(band)
+        self.cv_folds = cv_folds
+        self.stages = []
+
+    def _cv_auc(self, X, y, features):
+        cols = [FEATURES.index(f) for f in features]
+        cv = StratifiedKFold(self.cv_folds, shuffle=True, random_state=42)
+        proba = cross_val_predict(clone(self.estimator), X[:, cols], y, cv=cv, method='predict_proba')[:, 1]
+        return roc_auc_score(y, proba)
+
+    def fit(self, X, y):
+        """Order the panels greedily by CV ROC-AUC gain per unit cost, then fit one sub-model per stage."""
+        X = np.asarray(X[FEATURES] if hasattr(X, 'columns') else X, dtype=np.float64)
+        y = np.asarray(y)
+        panels = build_panels(self.costs)
+        order, remaining = [panels[0]], panels[1:]
+        features = list(panels[0]['tests'])
+        auc = self._cv_auc(X, y, features)
+        cv_auc = [auc]
+        while remaining:
+            scored = [(self._cv_auc(X, y, features + p['tests']), p) for p in remaining]
+            best_auc, best = max(scored, key=lambda s: (s[0] - auc) / s[1]['cost'])
+            order.append(best)
+            remaining.remove(best)
+            features += best['tests']
+            auc = best_auc
+            cv_auc.append(auc)
+
+        self.stages, features, spent = [], [], 0.0
+        for panel, auc in zip(order, cv_auc):
+            features = features + panel['tests']
+            spent += panel['cost']
+            cols = [FEATURES.index(f) for f in features]
+            self.stages.append({
+                'panel': panel['name'], 'tests': panel['tests'], 'panel_cost': panel['cost'],
+                'delay': panel['delay'], 'features': features, 'columns': cols,
+                'cumulative_cost': round(spent, 2), 'cv_roc_auc': round(float(auc), 4),
+                'model': clone(self.estimator).fit(X[:, cols], y),
+            })
+        return self
+
+    def _band(self, band):
+        low, high = band if band is not None else self.band
+        if not 0.0 <= low <= high <= 1.0:
+            raise ValueError(f"Uncertainty band must satisfy 0 <= low <= high <= 1, got {(low, high)}")
+        return low, high
+
+    def decide(self, patient, band=None):
+        """
+        Score a patient given whichever tests are known (a dict; missing tests absent or None).
+        Returns a decision when the probability leaves the band or every test is in, and the
+        next recommended test panel otherwise.
+        """
+        low, high = self._band(band)
+        known = {f for f in FEATURES if patient.get(f) is not None}
+        missing_intake = [t for t in self.stages[0]['tests'] if t not in known]
+        if missing_intake:
+            raise ValueError(f"Intake tests are required before staged scoring: {missing_intake}")
+
+        # Deepest stage whose feature set is fully known
+        k = 0
+        while k + 1 < len(self.stages) and set(self.stages[k + 1]['features']) <= known:
+            k += 1
+        stage = self.stages[k]
+        row = np.array([[float(patient[f]) for f in stage['features']]])
+        probability = float(stage['model'].predict_proba(row)[0, 1])
+
+        result = {
+            'probability': round(probability, 4),
+            'stage': k,
+            'tests_used': stage['features'],
+            'acquisition_cost': stage['cumulative_cost'],
+            'uncertainty_band': [low, high],
+        }
+        final = k == len(self.stages) - 1
+        if final or probability < low or probability > high:
+            result.update({'status': 'decision', 'prediction': int(probability >= 0.5)})
+        else:
+            nxt = self.stages[k + 1]
+            result.update({'status': 'test_required', 'next_test': {
+                'panel': nxt['panel'], 'tests': [t for t in nxt['tests'] if t not in known],
+                'cost': nxt['panel_cost'], 'delay': nxt['delay'],
+                'cumulative_cost': nxt['cumulative_cost']}})
+        return result
+
+    def simulate(self, X, band=None):
+        """
+        Run every row through the staged policy as if each requested panel were then
+        performed. Returns the final probability, the stage reached and the cost paid per row.
+        """
+        low, high = self._band(band)
+        X = np.asarray(X[FEATURES] if hasattr(X, 'columns') else X, dtype=np.float64)
+        n = len(X)
+        proba = np.empty(n)
+        reached = np.zeros(n, dtype=int)
+        active = np.arange(n)
+        for k, stage in enumerate(self.stages):
+            p = stage['model'].predict_proba(X[np.ix_(active, stage['columns'])])[:, 1]
+            proba[active] = p
+            reached[active] = k
+            active = active[(p >= low) & (p <= high)]
+            if not len(active):
+                break
+        cost = np.array([self.stages[k]['cumulative_cost'] for k in reached])
+        return proba, reached, cost
+
+    def summary(self):
+        return [{k: v for k, v in s.items() if k not in ('model', 'columns')} for s in self.stages]
+
+
+def fit_acquisition(X_train, y_train, costs=None, band=UNCERTAINTY_BAND):
+    return StagedClassifier(costs, band=band).fit(X_train, y_train)
+
+
+def load_acquisition(path=ACQUISITION_MODEL_FILE):
+    """Exported staged model, or one fitted on the default training split when none is exported."""
+    import joblib
+    if os.path.exists(path):
+        return joblib.load(path)
+    from heart_data import load_training_data, split_holdout
+    X_train, _, y_train, _ = split_holdout(load_training_data())
+    return fit_acquisition(X_train, y_train)
+
+
+def benchmark(staged, X_test, y_test, bands=BENCHMARK_BANDS, latency_rows=200):
+    """
+    Expected acquisition cost, stages used and per-patient decision latency against
+    held-out accuracy / ROC-AUC for each uncertainty band. The (0, 1) band always
+    acquires every test and is the full-information baseline.
+    """
+    y_test = np.asarray(y_test)
+    records = [dict(zip(FEATURES, map(float, row))) for row in np.asarray(X_test[FEATURES], dtype=np.float64)]
+    records = (records * (latency_rows // len(records) + 1))[:latency_rows]
+    results = []
+    for band in bands:
+        proba, reached, cost = staged.simulate(X_test, band)
+        pred = (proba >= 0.5).astype(int)
+
+        # Latency of the sequential API path: one decide() call per stage a patient needs
+        timings = []
+        for rec in records:
+            known = {t: rec[t] for t in staged.stages[0]['features']}
+            t = time.perf_counter()
+            while True:
+                out = staged.decide(known, band)
+                if out['status'] == 'decision':
+                    break
+                known.update({f: rec[f] for f in out['next_test']['tests']})
+            timings.append(time.perf_counter() - t)
+        timings = np.array(timings) * 1000
+
+        results.append({
+            'band': list(band),
+            'accuracy': round(float(accuracy_score(y_test, pred)), 4),
+            'roc_auc': round(float(roc_auc_score(y_test, proba)), 4),
+            'expected_cost': round(float(cost.mean()), 2),
+            'mean_stages': round(float(reached.mean() + 1), 2),
+            'full_panel_share': round(float((reached == len(staged.stages) - 1).mean()), 3),
+            'latency_ms_p50': round(float(np.percentile(timings, 50)), 3),
+            'latency_ms_p95': round(float(np.percentile(timings, 95)), 3),
+        })
+    return results
+
+
+if __name__ == '__main__':
+    import joblib
+    from heart_data import load_training_data, split_holdout
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--benchmark', action='store_true')
+    parser.add_argument('--sites', default=None, help="comma-separated UCI sites, or 'all' (default: cleveland)")
+    parser.add_argument('--cost-dir', default=COST_DIR)
+    parser.add_argument('--export', action='store_true', help=f'write the fitted staged model to {ACQUISITION_MODEL_FILE}')
+    args = parser.parse_args()
+
+    X_train, X_test, y_train, y_test = split_holdout(load_training_data(args.sites))
+    staged = fit_acquisition(X_train, y_train, load_test_costs(args.cost_dir))
+    for i, stage in enumerate(staged.summary()):
+        print(f"stage {i}: +{stage['panel']:10} {', '.join(stage['tests']):28} cost {stage['cumulative_cost']:7.2f}  "
+              f"CV ROC-AUC {stage['cv_roc_auc']:.3f}")
+    if args.export:
+        joblib.dump(staged, ACQUISITION_MODEL_FILE)
+    if args.benchmark:
+        rows = benchmark(staged, X_test, y_test)
+        print(f"{'band':>12} {'acc':>6} {'auc':>6} {'cost':>7} {'stages':>6} {'full%':>6} {'p50 ms':>7} {'p95 ms':>7}")
+        for r in rows:
+            print(f"{str(tuple(r['band'])):>12} {r['accuracy']:6.3f} {r['roc_auc']:6.3f} {r['expected_cost']:7.2f} "
+                  f"{r['mean_stages']:6.2f} {r['full_panel_share'] * 100:6.1f} {r['latency_ms_p50']:7.3f} {r['latency_ms_p95']:7.3f}")
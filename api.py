@@ -1,80 +1,190 @@
 """
 HeartGuard AI - Next-Gen Multi-Model REST API Service
 FastAPI backend for querying multi-model ensemble suite predictions programmatically.
+
+Models are served from the active model_registry version and hot-swapped when a new
+export is activated (see model_registry.py); /admin/models lists versions and rolls back.
+/admin/experiment sets a shadow version and A/B traffic splits for /predict (experiments.py).
+Scored inputs are counted against the training distribution; /drift reports drift (drift.py).
+HEARTGUARD_TRACE / HEARTGUARD_PROFILE switch on per-request stage traces and sampling profiles (profiling.py).
+After start-up every model, explainer and the report builder are warmed in the background; /readyz
+answers 503 until that has finished, /livez as soon as the process serves requests.
+/admin/* endpoints require an X-Admin-Token header matching HEARTGUARD_ADMIN_TOKEN; they answer 403
+while that variable is unset.
 """
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
 import pandas as pd
 import numpy as np
-import joblib
-import json
+import hmac
+import importlib.util
+import io
+import os
+import threading
+import time
 import warnings
-from typing import Optional
-from sklearn.preprocessing import StandardScaler
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier, VotingClassifier
-from sklearn.neighbors import KNeighborsClassifier
-from sklearn.linear_model import LogisticRegression
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from acquisition import load_acquisition, UNCERTAINTY_BAND
+from inference import InferenceEngine, risk_level
+from drift import DriftMonitor, load_reference
+from experiments import ExperimentRouter, comparison_report
+from model_registry import ModelRegistry, ModelServer, WARMUP_PATIENTS, warm_engine
+from patient_store import PatientStore
+import profiling
 
 warnings.filterwarnings('ignore')
 
+ADMIN_TOKEN_ENV = 'HEARTGUARD_ADMIN_TOKEN'
+
+@asynccontextmanager
+async def lifespan(app):
+    """Start-up: follow the registry, start the warm-up and any sampler; shutdown: stop and flush the logs."""
+    if server is not None:
+        server.watch()
+        threading.Thread(target=run_warmup, name='warmup', daemon=True).start()
+    profiling.sampler_from_env()
+    yield
+    if server is not None:
+        server.stop()
+        experiments.flush()
+
 app = FastAPI(
     title="HeartGuard AI Multi-Model REST API",
     description="Production ML API serving 5 Multi-Model Cardiac Classifiers (Random Forest, Gradient Boosting, KNN, Logistic Regression, Voting Ensemble)",
-    version="3.0.0"
+    version="3.0.0",
+    lifespan=lifespan
 )
 
-# Load ML Suite with dynamic fallback
-try:
-    with open('models_metadata.json', 'r') as f:
-        metadata = json.load(f)
-    scaler = joblib.load('scaler.pkl')
+STREAM_CHUNK_BYTES = 64 * 1024
+
+# Opt-in stage traces; with tracing off the middleware is never installed
+if profiling.trace_mode() != 'off':
+    @app.middleware("http")
+    async def trace_request(request: Request, call_next):
+        if profiling.trace_mode() == 'header' and request.headers.get(profiling.TRACE_HEADER) != '1':
+            return await call_next(request)
+        trace = profiling.Trace()
+        token = profiling.activate(trace)
+        try:
+            response = await call_next(request)
+        finally:
+            profiling.deactivate(token)
+        response.headers['Server-Timing'] = trace.server_timing()
+        return response
+
+def fallback_engine():
+    """Models fitted on the Cleveland data at start-up, used when no export can be loaded."""
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier, VotingClassifier
+    from sklearn.neighbors import KNeighborsClassifier
+    from sklearn.linear_model import LogisticRegression
+
+    url = 'https://archive.ics.uci.edu/ml/machine-learning-databases/heart-disease/processed.cleveland.data'
+    column_names = ['age', 'sex', 'cp', 'trestbps', 'chol', 'fbs', 'restecg', 'thalach', 'exang', 'oldpeak', 'slope', 'ca', 'thal', 'target']
+    try:
+        df = pd.read_csv(url, names=column_names, na_values='?')
+    except Exception:
+        df = pd.read_csv('Heart Disease Data/processed.cleveland.data', names=column_names, na_values='?')
+        
+    df = df.dropna().reset_index(drop=True)
+    df['target'] = (df['target'] > 0).astype(int)
     
-    models = {}
-    for m_name, info in metadata['models'].items():
-        models[m_name] = joblib.load(info['filename'])
+    X = df.drop('target', axis=1)
+    y = df['target']
+    
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+    
+    models = {
+        'Random Forest': RandomForestClassifier(n_estimators=100, random_state=42).fit(X_scaled, y),
+        'Gradient Boosting': GradientBoostingClassifier(n_estimators=100, random_state=42).fit(X_scaled, y),
+        'K-Nearest Neighbors': KNeighborsClassifier(n_neighbors=7).fit(X_scaled, y),
+        'Logistic Regression': LogisticRegression(random_state=42).fit(X_scaled, y)
+    }
+    
+    ensemble = VotingClassifier(
+        estimators=[
+            ('rf', models['Random Forest']),
+            ('gb', models['Gradient Boosting']),
+            ('knn', models['K-Nearest Neighbors']),
+            ('lr', models['Logistic Regression'])
+        ],
+        voting='soft'
+    ).fit(X_scaled, y)
+    
+    models['Voting Ensemble'] = ensemble
+    return InferenceEngine(models, scaler, X_scaled)
+
+# Load ML Suite (active registry version, else the working-tree export) with dynamic fallback
+registry = ModelRegistry()
+try:
+    server = ModelServer(registry)
     models_loaded = True
 except Exception as e:
     try:
-        url = 'https://archive.ics.uci.edu/ml/machine-learning-databases/heart-disease/processed.cleveland.data'
-        column_names = ['age', 'sex', 'cp', 'trestbps', 'chol', 'fbs', 'restecg', 'thalach', 'exang', 'oldpeak', 'slope', 'ca', 'thal', 'target']
-        try:
-            df = pd.read_csv(url, names=column_names, na_values='?')
-        except Exception:
-            df = pd.read_csv('Heart Disease Data/processed.cleveland.data', names=column_names, na_values='?')
-            
-        df = df.dropna().reset_index(drop=True)
-        df['target'] = (df['target'] > 0).astype(int)
-        
-        X = df.drop('target', axis=1)
-        y = df['target']
-        
-        scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(X)
-        
-        models = {
-            'Random Forest': RandomForestClassifier(n_estimators=100, random_state=42).fit(X_scaled, y),
-            'Gradient Boosting': GradientBoostingClassifier(n_estimators=100, random_state=42).fit(X_scaled, y),
-            'K-Nearest Neighbors': KNeighborsClassifier(n_neighbors=7).fit(X_scaled, y),
-            'Logistic Regression': LogisticRegression(random_state=42).fit(X_scaled, y)
-        }
-        
-        ensemble = VotingClassifier(
-            estimators=[
-                ('rf', models['Random Forest']),
-                ('gb', models['Gradient Boosting']),
-                ('knn', models['K-Nearest Neighbors']),
-                ('lr', models['Logistic Regression'])
-            ],
-            voting='soft'
-        ).fit(X_scaled, y)
-        
-        models['Voting Ensemble'] = ensemble
+        server = ModelServer(registry, engine=fallback_engine())
         models_loaded = True
     except Exception as ex:
+        server = None
         models_loaded = False
         load_error = str(ex)
 
+# Shadow / split arms over registry versions; scores are logged off the request path
+experiments = ExperimentRouter(server) if server is not None else None
+
+# Input drift against the training distribution of the served version
+drift_monitor = DriftMonitor(load_reference(server.engine.metadata)) if server is not None else None
+drift_version = server.current.version if server is not None else None
+
+def follow_drift_reference():
+    """Start counting afresh against the new reference after a hot swap (watch-thread hook)."""
+    global drift_monitor, drift_version
+    if server.current.version != drift_version:
+        drift_version, drift_monitor = server.current.version, DriftMonitor(load_reference(server.engine.metadata))
+
+if server is not None:
+    server.hooks.append(follow_drift_reference)
+
+# Start-up warm-up: the registry load only scores single rows, so the first explanation would still
+# import shap and build its explainer, and the first report import reportlab
+WARMUP_REPORT = importlib.util.find_spec('reportlab') is not None
+warmup = {'state': 'pending', 'model_version': None, 'started_at': None, 'total_ms': None, 'steps_ms': {}, 'error': None}
+
+def warm_fully(engine):
+    """Hot-swap warm-up: the registry's single-row scoring plus batches, explainers and a report; returns ms."""
+    return warm_engine(engine) + sum(engine.warm_up(WARMUP_PATIENTS, report=WARMUP_REPORT).values())
+
+def run_warmup():
+    """Warm the served suite; readiness is reported once this returns, also when a step failed."""
+    warmup.update(state='running', model_version=server.current.version,
+                  started_at=datetime.now().isoformat(timespec='seconds'))
+    t = time.perf_counter()
+    try:
+        warmup['steps_ms'] = server.engine.warm_up(WARMUP_PATIENTS, report=WARMUP_REPORT)
+    except Exception as e:
+        warmup['error'] = str(e)
+    warmup.update(state='done', total_ms=round((time.perf_counter() - t) * 1000, 1))
+    server.warm = warm_fully
+
+def current_engine():
+    """The engine this request is served by; read once per request so a hot swap never splits one."""
+    return server.engine
+
+# Staged (cost-aware) scoring: exported sub-models, or fitted on the training split if absent
+try:
+    staged_model = load_acquisition()
+except Exception as e:
+    staged_model = None
+    staged_error = str(e)
+
+# Longitudinal store shared with the Streamlit app
+patient_store = PatientStore()
+
 class PatientData(BaseModel):
     age: int = Field(..., ge=18, le=120, description="Age in years")
     sex: int = Field(..., ge=0, le=1, description="Gender (1 = Male, 0 = Female)")
@@ -90,51 +200,277 @@ class PatientData(BaseModel):
     ca: int = Field(..., ge=0, le=3, description="Major Vessels Colored by Fluoroscopy (0-3)")
     thal: int = Field(..., description="Thalassemia (3=Normal, 6=Fixed Defect, 7=Reversible Defect)")
 
+class StagedPatientData(BaseModel):
+    """Tests known so far; the intake tests (age, sex, cp, trestbps) are required, the rest may be omitted."""
+    age: int = Field(..., ge=18, le=120, description="Age in years")
+    sex: int = Field(..., ge=0, le=1, description="Gender (1 = Male, 0 = Female)")
+    cp: int = Field(..., ge=1, le=4, description="Chest Pain Type (1=Typical, 2=Atypical, 3=Non-anginal, 4=Asymptomatic)")
+    trestbps: float = Field(..., ge=70, le=240, description="Resting Blood Pressure (mm Hg)")
+    chol: Optional[float] = Field(None, ge=80, le=650, description="Serum Cholesterol (mg/dl)")
+    fbs: Optional[int] = Field(None, ge=0, le=1, description="Fasting Blood Sugar > 120 mg/dl (1 = True, 0 = False)")
+    restecg: Optional[int] = Field(None, ge=0, le=2, description="Resting ECG Results (0=Normal, 1=ST-T abnormality, 2=LV hypertrophy)")
+    thalach: Optional[float] = Field(None, ge=60, le=230, description="Maximum Heart Rate Achieved (bpm)")
+    exang: Optional[int] = Field(None, ge=0, le=1, description="Exercise Induced Angina (1 = Yes, 0 = No)")
+    oldpeak: Optional[float] = Field(None, ge=0.0, le=7.0, description="ST Depression Induced by Exercise (mm)")
+    slope: Optional[int] = Field(None, ge=1, le=3, description="Slope of Peak Exercise ST Segment (1=Upsloping, 2=Flat, 3=Downsloping)")
+    ca: Optional[int] = Field(None, ge=0, le=3, description="Major Vessels Colored by Fluoroscopy (0-3)")
+    thal: Optional[int] = Field(None, description="Thalassemia (3=Normal, 6=Fixed Defect, 7=Reversible Defect)")
+
+class ReportPatient(PatientData):
+    patient_id: Optional[str] = Field(None, description="Identifier printed on the report and used as its file name")
+
+class BatchReportRequest(BaseModel):
+    patients: List[ReportPatient]
+
+class ExperimentConfig(BaseModel):
+    shadow: Optional[str] = Field(None, description="Registry version scored in the background on every /predict request")
+    split: Dict[str, float] = Field(default_factory=dict, description="Registry version -> percent of /predict traffic it serves")
+
 @app.get("/")
 def read_root():
     return {
         "status": "online",
         "service": "HeartGuard AI Multi-Model REST API",
         "version": "3.0.0",
-        "available_models": list(models.keys()) if models_loaded else [],
-        "models_loaded": models_loaded
+        "available_models": list(current_engine().models) if models_loaded else [],
+        "models_loaded": models_loaded,
+        "model_version": server.current.version if models_loaded else None
     }
 
 @app.get("/health")
 def health_check():
     if not models_loaded:
         raise HTTPException(status_code=500, detail=f"Models failed to load: {load_error}")
-    return {"status": "healthy", "available_models": list(models.keys())}
+    return {"status": "healthy", "available_models": list(current_engine().models), "model_version": server.current.version,
+            "ready": warmup['state'] == 'done'}
+
+@app.get("/livez")
+def liveness():
+    """The process is up and answering; says nothing about the models."""
+    return {"status": "alive"}
+
+@app.get("/readyz")
+def readiness():
+    """Ready to take traffic: the suite is loaded and the start-up warm-up has finished (503 until then)."""
+    if not models_loaded or warmup['state'] != 'done':
+        raise HTTPException(status_code=503, detail={"status": "not ready", "models_loaded": models_loaded,
+                                                     "warmup": warmup})
+    return {"status": "ready", "model_version": server.current.version, "warmup": warmup}
 
 @app.post("/predict")
 def predict_risk(
     patient: PatientData, 
-    model_name: Optional[str] = Query("Voting Ensemble", description="ML Model: 'Random Forest', 'Gradient Boosting', 'K-Nearest Neighbors', 'Logistic Regression', 'Voting Ensemble'")
+    model_name: Optional[str] = Query("Voting Ensemble", description="ML Model: 'Random Forest', 'Gradient Boosting', 'K-Nearest Neighbors', 'Logistic Regression', 'Voting Ensemble'"),
+    patient_id: Optional[str] = Query(None, description="When given, the assessment is stored on this patient's timeline")
 ):
-    if not models_loaded:
-        raise HTTPException(status_code=500, detail="ML model suite is not available")
-    
-    if model_name not in models:
-        raise HTTPException(status_code=400, detail=f"Invalid model_name '{model_name}'. Choose from: {list(models.keys())}")
+    profiling.mark('request parsing & validation')
+    _check_model_request(model_name)
+    with profiling.stage('drift observe'):
+        drift_monitor.observe(patient.dict())
+    version, engine, role = experiments.route(patient_id)
+    t = time.perf_counter()
+    probability, prediction = engine.predict(model_name, patient.dict())
+    with profiling.stage('experiment log'):
+        experiments.observe(model_name, patient.dict(), version, role, probability, prediction,
+                            (time.perf_counter() - t) * 1000)
+    if patient_id:
+        shap_values = engine.explain(model_name, patient.dict())
+        with profiling.stage('patient store'):
+            patient_store.record(patient_id, patient.dict(), probability, prediction, model_name,
+                                 engine.model_version(model_name), shap_values)
+    interval = engine.interval(model_name, patient.dict())
+    trace = profiling.current()
 
-    target_model = models[model_name]
-    input_df = pd.DataFrame([patient.dict()])
-    scaled_df = scaler.transform(input_df)
-    
-    probability = float(target_model.predict_proba(scaled_df)[0][1] * 100)
-    prediction = int(target_model.predict(scaled_df)[0])
-    
-    risk_level = "HIGH RISK" if probability >= 70 else "MODERATE RISK" if probability >= 35 else "LOW RISK"
-    
     return {
+        "patient_id": patient_id,
         "model_used": model_name,
+        "model_version": version,
         "heart_disease_probability": round(probability, 2),
+        "probability_interval": None if interval['low'] is None else [round(interval['low'], 2), round(interval['high'], 2)],
+        "interval_level": interval['level'],
+        "uncertainty_method": interval['method'],
         "prediction": prediction,
         "prediction_label": "Heart Disease Present" if prediction == 1 else "No Heart Disease Detected",
-        "risk_level": risk_level,
-        "features_processed": patient.dict()
+        "risk_level": risk_level(probability),
+        "features_processed": patient.dict(),
+        **({"trace": trace.as_dict()} if trace is not None else {})
     }
 
+def _check_model_request(model_name):
+    """Engine snapshot for the request, after checking the suite is up and knows ``model_name``."""
+    if not models_loaded:
+        raise HTTPException(status_code=500, detail="ML model suite is not available")
+    engine = current_engine()
+    if model_name not in engine.models:
+        raise HTTPException(status_code=400, detail=f"Invalid model_name '{model_name}'. Choose from: {list(engine.models)}")
+    return engine
+
+def _stream_file(f):
+    """Yield a rewound file in fixed-size chunks and close it once fully sent."""
+    try:
+        while True:
+            chunk = f.read(STREAM_CHUNK_BYTES)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        f.close()
+
+@app.post("/report")
+def clinical_report(
+    patient: PatientData,
+    model_name: Optional[str] = Query("Voting Ensemble", description="ML Model used for the assessment"),
+    patient_id: Optional[str] = Query(None, description="Identifier printed on the report")
+):
+    """Clinical assessment PDF for one patient."""
+    from clinical_report import render_report, report_filename
+    engine = _check_model_request(model_name)
+    drift_monitor.observe(patient.dict())
+    r = engine.report(model_name, patient.dict(), patient_id)
+    pdf = render_report(model_name, r['features'], r['probability'], r['prediction'], r['shap'],
+                        r['recommendations'], engine.model_stats(model_name), patient_id)
+    name = report_filename(patient_id or datetime.now().strftime('%Y%m%d_%H%M%S'))
+    return StreamingResponse(_stream_file(io.BytesIO(pdf)), media_type="application/pdf",
+                             headers={"Content-Disposition": f'attachment; filename="{name}"'})
+
+@app.post("/report/batch")
+def clinical_report_batch(
+    batch: BatchReportRequest,
+    model_name: Optional[str] = Query("Voting Ensemble", description="ML Model used for the assessment"),
+    format: str = Query("zip", pattern="^(zip|pdf)$", description="'zip' of per-patient PDFs or one merged 'pdf'")
+):
+    """Clinical PDFs for many patients, rendered to a spooled temporary file and streamed back."""
+    from clinical_report import render_batch_pdf, render_batch_zip
+    engine = _check_model_request(model_name)
+    if not batch.patients:
+        raise HTTPException(status_code=400, detail="No patients supplied")
+
+    X = pd.DataFrame([p.dict(exclude={'patient_id'}) for p in batch.patients])
+    ids = [p.patient_id or f"{i + 1:05d}" for i, p in enumerate(batch.patients)]
+    drift_monitor.observe_batch(X)
+    reports = engine.reports(model_name, X, ids)
+    render = render_batch_zip if format == "zip" else render_batch_pdf
+    f, _ = render(reports, model_name, engine.model_stats(model_name))
+
+    name = f"HeartGuard_Batch_Reports_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{format}"
+    return StreamingResponse(_stream_file(f), media_type="application/zip" if format == "zip" else "application/pdf",
+                             headers={"Content-Disposition": f'attachment; filename="{name}"'})
+
+@app.post("/predict/staged")
+def predict_staged(
+    patient: StagedPatientData,
+    band_low: float = Query(UNCERTAINTY_BAND[0], ge=0.0, le=1.0, description="Lower edge of the uncertainty band"),
+    band_high: float = Query(UNCERTAINTY_BAND[1], ge=0.0, le=1.0, description="Upper edge of the uncertainty band")
+):
+    """Decide on the tests supplied so far, or name the next test to order when the risk is still uncertain."""
+    if staged_model is None:
+        raise HTTPException(status_code=500, detail=f"Staged model is not available: {staged_error}")
+    if band_low > band_high:
+        raise HTTPException(status_code=400, detail="band_low must not exceed band_high")
+
+    result = staged_model.decide(patient.dict(), (band_low, band_high))
+    if result['status'] == 'decision':
+        result['risk_level'] = risk_level(result['probability'] * 100)
+        result['prediction_label'] = "Heart Disease Present" if result['prediction'] == 1 else "No Heart Disease Detected"
+    return result
+
+@app.get("/patients/{patient_id}/trend")
+def patient_trend(
+    patient_id: str,
+    days: float = Query(90, gt=0, description="Window for the trend score, in days")
+):
+    """Every stored assessment for one patient, oldest first, with the change over the last ``days``."""
+    trend = patient_store.trend(patient_id)
+    if trend.empty:
+        raise HTTPException(status_code=404, detail=f"No assessments stored for patient '{patient_id}'")
+    return {"patient_id": patient_id, "assessments": trend.to_dict('records'),
+            "trend": patient_store.trend_score(patient_id, days)}
+
+@app.get("/cohort/rising")
+def cohort_rising(
+    points: float = Query(15, ge=0, description="Minimum rise in risk, in percentage points"),
+    days: float = Query(90, gt=0, description="Window, in days, ending now"),
+    limit: int = Query(100, ge=1, le=10000)
+):
+    """Patients whose risk rose by more than ``points`` within the last ``days``, largest rise first."""
+    rising = patient_store.rising(points, days, limit=limit)
+    return {"points": points, "days": days, "count": len(rising), "patients": rising.to_dict('records')}
+
+@app.get("/cohort/summary")
+def cohort_summary(days: Optional[float] = Query(None, gt=0, description="Only patients seen in the last N days")):
+    """Patient and assessment counts with the latest-risk distribution."""
+    return patient_store.cohort_summary(None if days is None else time.time() - days * 86400)
+
+@app.get("/drift")
+def input_drift(window: str = Query("all", pattern="^(all|recent)$", description="'all' traffic since start-up / last swap, or the 'recent' window")):
+    """Per-feature PSI, KS, live vs. reference quantiles / code shares and out-of-range rates of scored inputs."""
+    if drift_monitor is None:
+        raise HTTPException(status_code=500, detail="ML model suite is not available")
+    return {"model_version": drift_version, **drift_monitor.state(window)}
+
+def require_admin(x_admin_token: Optional[str] = Header(None, description=f"Must match {ADMIN_TOKEN_ENV}")):
+    """Shared-token guard for /admin/*: disabled (403) unless the token variable is set, 401 on a wrong token."""
+    expected = os.environ.get(ADMIN_TOKEN_ENV)
+    if not expected:
+        raise HTTPException(status_code=403, detail=f"Admin endpoints are disabled; set {ADMIN_TOKEN_ENV} to enable them")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), expected.encode()):
+        raise HTTPException(status_code=401, detail="Missing or invalid X-Admin-Token")
+    if server is None:
+        raise HTTPException(status_code=500, detail=f"ML model suite is not available: {load_error}")
+
+@app.get("/admin/models", dependencies=[Depends(require_admin)])
+def admin_models():
+    """Published model versions (newest first) and the one this worker is serving."""
+    return {**server.status(), "startup_warmup": warmup, "versions": registry.versions()}
+
+@app.post("/admin/models/{version}/activate", dependencies=[Depends(require_admin)])
+def admin_activate(version: str):
+    """Make ``version`` active and swap to it once loaded and warmed; requests keep being served meanwhile."""
+    try:
+        registry.activate(version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown model version '{version}'")
+    try:
+        server.load(version)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Version '{version}' failed to load; still serving '{server.current.version}': {e}")
+    follow_drift_reference()
+    return server.status()
+
+@app.post("/admin/models/rollback", dependencies=[Depends(require_admin)])
+def admin_rollback():
+    """Re-activate the version published before the active one."""
+    previous = registry.previous()
+    if previous is None:
+        raise HTTPException(status_code=409, detail="No earlier version to roll back to")
+    return admin_activate(previous)
+
+@app.get("/admin/profile", dependencies=[Depends(require_admin)], response_class=PlainTextResponse)
+def admin_profile(seconds: float = Query(5.0, gt=0, le=60, description="How long to sample every thread's stack")):
+    """Collapsed-stack sampling profile of this worker (flamegraph.pl / speedscope input)."""
+    return profiling.profile_for(seconds)
+
+@app.get("/admin/experiment", dependencies=[Depends(require_admin)])
+def admin_experiment():
+    """Current shadow version, traffic split and background worker counters."""
+    return experiments.status()
+
+@app.put("/admin/experiment", dependencies=[Depends(require_admin)])
+def admin_set_experiment(config: ExperimentConfig):
+    """Replace the experiment; arms are loaded and warmed before the new split takes traffic."""
+    try:
+        experiments.configure(config.shadow, config.split)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Unknown model version(s): {e.args[0]}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return experiments.status()
+
+@app.get("/admin/experiment/report", dependencies=[Depends(require_admin)])
+def admin_experiment_report(hours: Optional[float] = Query(None, gt=0, description="Only scores from the last N hours")):
+    """Served arms, and shadow agreement / probability deltas against the served scores."""
+    return comparison_report(experiments.db_path, None if hours is None else time.time() - hours * 3600)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
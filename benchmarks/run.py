@@ -0,0 +1,245 @@
+"""
+HeartGuard Pro - Benchmark Suite
+Latency of the serving, explanation, reporting, start-up and training paths, so a new
+scikit-learn / SHAP release or a retrained model suite can be checked for regressions.
+
+Every case except training is timed after a warm-up call; the minimum, median, mean and
+spread over its repeats are written with the library versions and git commit to
+``benchmarks/results/<timestamp>.json``. ``--compare`` checks a run against an earlier
+result file and exits non-zero when a case's median is slower by more than ``--threshold``.
+Cases run against the model suite exported to the repository root.
+
+    python benchmarks/run.py                                  every group
+    python benchmarks/run.py --only predict,batch             selected groups
+    python benchmarks/run.py --compare benchmarks/results/<baseline>.json --threshold 0.25
+
+Groups:
+    predict      single-row POST /predict per model through the FastAPI TestClient
+    batch        InferenceEngine.predict_batch per model at 1k, 10k and 100k synthetic patients
+    explain      SHAP values for one patient per model (uncached; explainers built once)
+    report       one clinical PDF report (clinical_report.render_report)
+    cold_start   fresh-process import of the API, and the first run of the Streamlit app
+    train        train_and_export in a scratch copy of the repository
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from functools import cached_property
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+sys.path.insert(0, ROOT)
+
+MODEL_NAMES = ['Random Forest', 'Gradient Boosting', 'K-Nearest Neighbors', 'Logistic Regression', 'Voting Ensemble']
+BATCH_ROWS = {1000: 20, 10000: 10, 100000: 3}          # rows: repeats
+REPEATS = {'predict': 200, 'explain': 10, 'report': 10, 'cold_start': 3, 'train': 1}
+COLD_GROUPS = {'train'}                                 # too slow to warm up; timed from the first call
+REGRESSION_THRESHOLD = 0.25                             # fraction slower than the baseline median
+MIN_DELTA_MS = 0.05                                     # ignore slow-downs smaller than timer noise
+TRAINING_INPUTS = ['Heart Disease Data', 'dataset_cache.parquet', 'models_metadata.json']
+LIBRARIES = ['numpy', 'pandas', 'sklearn', 'scipy', 'shap', 'fastapi', 'streamlit', 'reportlab']
+
+
+class Context:
+    """Loaded lazily, so a run of one group only pays for what it uses."""
+
+    @cached_property
+    def engine(self):
+        from inference import load_engine
+        return load_engine()
+
+    @cached_property
+    def X_test(self):
+        from heart_data import load_training_data, split_holdout
+        _, X_test, _, _ = split_holdout(load_training_data(self.engine.metadata.get('sites')))
+        return X_test
+
+    @cached_property
+    def client(self):
+        from fastapi.testclient import TestClient
+        import api
+        return TestClient(api.app)
+
+
+def _time(fn, repeats, warmup=True):
+    """Wall time (ms) of ``repeats`` calls, after one warm-up call unless ``warmup`` is off."""
+    if warmup:
+        fn()
+    samples = []
+    for _ in range(repeats):
+        t = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t) * 1000)
+    return samples
+
+
+def _summary(samples):
+    return {'unit': 'ms', 'repeats': len(samples), 'min': round(min(samples), 4),
+            'median': round(statistics.median(samples), 4), 'mean': round(statistics.fmean(samples), 4),
+            'stdev': round(statistics.stdev(samples), 4) if len(samples) > 1 else 0.0}
+
+
+# ── Cases ────────────────────────────────────────────────────────────────────
+# Each group yields (name, callable, repeats, extra) tuples.
+
+def predict_cases(ctx):
+    base = ctx.X_test.iloc[0].to_dict()
+    # a fresh cholesterol value per call, so every request misses the engine's LRU cache
+    tick = itertools.count()
+    for name in MODEL_NAMES:
+        def call(name=name):
+            r = ctx.client.post('/predict', params={'model_name': name},
+                                json={**base, 'chol': base['chol'] + next(tick) * 1e-6})
+            assert r.status_code == 200, r.text
+        yield f'predict[{name}]', call, REPEATS['predict'], {}
+
+
+def batch_cases(ctx):
+    from synthetic import load_copula, sample
+    copula = load_copula(ctx.engine.metadata.get('sites'))
+    for rows, repeats in BATCH_ROWS.items():
+        X = sample(copula, rows, np.random.default_rng(0))
+        for name in MODEL_NAMES:
+            yield f'batch[{name}, {rows}]', lambda name=name, X=X: ctx.engine.predict_batch(name, X), repeats, {'rows': rows}
+
+
+def explain_cases(ctx):
+    Xs = ctx.engine.scaler.transform(ctx.X_test.iloc[:1])
+    for name in MODEL_NAMES:
+        yield f'explain[{name}]', lambda name=name: ctx.engine.explain_matrix(name, Xs), REPEATS['explain'], {}
+
+
+def report_cases(ctx):
+    from clinical_report import render_report
+    name = 'Voting Ensemble'
+    r = ctx.engine.report(name, ctx.X_test.iloc[0].to_dict())
+    yield 'report[pdf]', lambda: render_report(name, r['features'], r['probability'], r['prediction'], r['shap'],
+                                               r['recommendations'], ctx.engine.model_stats(name)), REPEATS['report'], {}
+
+
+def _run_python(code, cwd=ROOT):
+    subprocess.run([sys.executable, '-c', code], cwd=cwd, check=True, capture_output=True)
+
+
+def cold_start_cases(ctx):
+    yield 'cold_start[import api]', lambda: _run_python('import api'), REPEATS['cold_start'], {}
+    # load_all_models_and_data runs inside the app's first script run (st.cache_resource is empty)
+    app = ("from streamlit.testing.v1 import AppTest\n"
+           "at = AppTest.from_file('heart_disease_app.py', default_timeout=600).run()\n"
+           "assert not at.exception, at.exception")
+    yield 'cold_start[app first run]', lambda: _run_python(app), REPEATS['cold_start'], {}
+
+
+def train_cases(ctx):
+    scratch = tempfile.mkdtemp(prefix='heartguard-train-')
+    for entry in os.listdir(ROOT):
+        src = os.path.join(ROOT, entry)
+        if entry.endswith('.py'):
+            shutil.copy2(src, scratch)
+        elif entry in TRAINING_INPUTS and os.path.exists(src):
+            (shutil.copytree if os.path.isdir(src) else shutil.copy2)(src, os.path.join(scratch, entry))
+    stages = {}
+
+    def train():
+        code = ("import json\nfrom train_models import train_and_export\n"
+                "print(json.dumps(train_and_export(cases_path='no_labelled_cases.csv')['stage_seconds']))")
+        out = subprocess.run([sys.executable, '-c', code], cwd=scratch, check=True, capture_output=True, text=True)
+        stages.update(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    yield 'train[train_and_export]', train, REPEATS['train'], {'stage_seconds': stages}
+    shutil.rmtree(scratch, ignore_errors=True)
+
+
+GROUPS = {'predict': predict_cases, 'batch': batch_cases, 'explain': explain_cases, 'report': report_cases,
+          'cold_start': cold_start_cases, 'train': train_cases}
+
+
+# ── Running and comparing ────────────────────────────────────────────────────
+def environment():
+    import importlib
+    versions = {}
+    for lib in LIBRARIES:
+        try:
+            versions[lib] = importlib.import_module(lib).__version__
+        except Exception:
+            versions[lib] = None
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'cpu_count': os.cpu_count(),
+            'git_commit': commit, 'libraries': versions}
+
+
+def run(groups, scale=1.0):
+    """Time every case of ``groups``; ``scale`` multiplies the repeat counts."""
+    ctx, results = Context(), {}
+    for group in groups:
+        for name, fn, repeats, extra in GROUPS[group](ctx):
+            results[name] = {'group': group, **_summary(_time(fn, max(1, round(repeats * scale)), group not in COLD_GROUPS)), **extra}
+            print(f"{name:<45} median {results[name]['median']:>11.3f} ms", file=sys.stderr)
+    return {'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'environment': environment(), 'benchmarks': results}
+
+
+def compare(current, baseline, threshold=REGRESSION_THRESHOLD):
+    """Per-case median ratios against ``baseline``; a case regresses when slower by more than ``threshold``."""
+    rows, regressions = {}, []
+    for name, cur in current['benchmarks'].items():
+        base = baseline['benchmarks'].get(name)
+        if base is None:
+            continue
+        ratio = cur['median'] / base['median'] if base['median'] else float('inf')
+        regressed = ratio > 1 + threshold and cur['median'] - base['median'] > MIN_DELTA_MS
+        rows[name] = {'baseline_ms': base['median'], 'current_ms': cur['median'], 'ratio': round(ratio, 3),
+                      'regressed': regressed}
+        if regressed:
+            regressions.append(name)
+    changed = {lib: [v, current['environment']['libraries'].get(lib)]
+               for lib, v in baseline['environment'].get('libraries', {}).items()
+               if current['environment']['libraries'].get(lib) != v}
+    return {'baseline': baseline['timestamp'], 'baseline_commit': baseline['environment'].get('git_commit'),
+            'threshold': threshold, 'library_changes': changed, 'regressions': regressions, 'cases': rows}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', help=f"comma-separated groups ({', '.join(GROUPS)})")
+    parser.add_argument('--scale', type=float, default=1.0, help='multiply every repeat count (e.g. 0.2 for a quick run)')
+    parser.add_argument('--output', help='result file (default: benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--compare', metavar='BASELINE', help='earlier result file to check for regressions')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+
+    groups = args.only.split(',') if args.only else list(GROUPS)
+    unknown = [g for g in groups if g not in GROUPS]
+    if unknown:
+        parser.error(f"unknown group(s): {', '.join(unknown)}")
+
+    os.chdir(ROOT)
+    result = run(groups, args.scale)
+    output = args.output or os.path.join(RESULTS_DIR, datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"Results written to {output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            report = compare(result, json.load(f), args.threshold)
+        print(json.dumps(report, indent=2))
+        sys.exit(1 if report['regressions'] else 0)
+    print(json.dumps({name: r['median'] for name, r in result['benchmarks'].items()}, indent=2))
@@ -0,0 +1,147 @@
+"""
+HeartGuard Pro - Probability Calibration
+Maps each model's raw ``predict_proba`` output onto observed risk, so the 35% / 70% risk
+cut-offs mean the same thing for every model. Calibrators are fitted by ``train_models.py``
+on out-of-fold probabilities (stratified k-fold on the training split): an isotonic fit and
+a Platt fit on the log-odds are both cross-validated and the one with the lower Brier score
+is kept, unless the raw probabilities already score better. They are stored in
+``models_metadata.json`` as lookup tables, breakpoint arrays (isotonic, applied with
+``np.interp``) or two floats (Platt, a closed-form sigmoid), together with held-out
+reliability bins and Brier scores before and after calibration. Every scorer derives the
+predicted class from the calibrated probability (``decide``), so the two never disagree.
+
+    python calibration.py --benchmark     calibration latency per row and per batch; Brier before / after
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+from scipy.special import expit, logit
+from sklearn.base import clone
+from sklearn.isotonic import IsotonicRegression
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import brier_score_loss
+from sklearn.model_selection import StratifiedKFold, cross_val_predict
+
+CV_FOLDS = 5
+RELIABILITY_BINS = 10
+EPS = 1e-6
+DECISION_THRESHOLD = 0.5
+
+
+def _log_odds(p):
+    return logit(np.clip(p, EPS, 1 - EPS))
+
+
+def fit_isotonic(p, y):
+    iso = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds='clip').fit(p, y)
+    return {'method': 'isotonic', 'x': np.round(iso.X_thresholds_, 6).tolist(),
+            'y': np.round(iso.y_thresholds_, 6).tolist()}
+
+
+def fit_platt(p, y):
+    lr = LogisticRegression(C=1e6).fit(_log_odds(p).reshape(-1, 1), y)
+    return {'method': 'platt', 'a': round(float(lr.coef_[0, 0]), 6), 'b': round(float(lr.intercept_[0]), 6)}
+
+
+def fit_identity(p, y):
+    return {'method': 'identity'}
+
+
+def calibrate(table, p):
+    """Calibrated probabilities for raw probabilities ``p`` (any shape, 0-1); ``table=None`` is the identity."""
+    if table is None or table['method'] == 'identity':
+        return p
+    if table['method'] == 'isotonic':
+        return np.interp(p, table['x'], table['y'])
+    return expit(table['a'] * _log_odds(p) + table['b'])
+
+
+def decide(p):
+    """Predicted classes for calibrated probabilities ``p`` (0-1): positive at ``DECISION_THRESHOLD`` and above."""
+    return (np.asarray(p) >= DECISION_THRESHOLD).astype(int)
+
+
+def choose_calibrator(p, y, folds=CV_FOLDS):
+    """Isotonic, Platt or identity, whichever has the lowest cross-validated Brier score on ``(p, y)``."""
+    cv = StratifiedKFold(folds, shuffle=True, random_state=42)
+    scores = {fit_identity: brier_score_loss(y, p)}
+    for fit in (fit_isotonic, fit_platt):
+        out = np.empty(len(y))
+        for tr, te in cv.split(p.reshape(-1, 1), y):
+            out[te] = calibrate(fit(p[tr], y[tr]), p[te])
+        scores[fit] = brier_score_loss(y, out)
+    best = min(scores, key=scores.get)
+    return {**best(p, y), 'cv_brier': round(float(scores[best]), 4)}
+
+
+def fit_calibrators(models, X_train_scaled, y_train, folds=CV_FOLDS):
+    """One calibrator per model, fitted on its out-of-fold training probabilities."""
+    y = np.asarray(y_train)
+    cv = StratifiedKFold(folds, shuffle=True, random_state=42)
+    tables = {}
+    for name, model in models.items():
+        oof = cross_val_predict(clone(model), X_train_scaled, y, cv=cv, method='predict_proba')[:, 1]
+        tables[name] = choose_calibrator(oof, y, folds)
+    return tables
+
+
+def reliability(y_true, y_proba, bins=RELIABILITY_BINS):
+    """Equal-width reliability bins: mean predicted probability, observed positive rate and count per bin."""
+    y_true, y_proba = np.asarray(y_true), np.asarray(y_proba)
+    idx = np.minimum((y_proba * bins).astype(int), bins - 1)
+    out = {'mean_predicted': [], 'fraction_positive': [], 'count': []}
+    for b in range(bins):
+        in_bin = idx == b
+        if in_bin.any():
+            out['mean_predicted'].append(round(float(y_proba[in_bin].mean()), 4))
+            out['fraction_positive'].append(round(float(y_true[in_bin].mean()), 4))
+            out['count'].append(int(in_bin.sum()))
+    return out
+
+
+def calibration_report(models, tables, X_test_scaled, y_test):
+    """Calibrator tables with held-out Brier scores and reliability bins, raw and calibrated."""
+    report = {}
+    for name, model in models.items():
+        table = tables.get(name)
+        raw = model.predict_proba(X_test_scaled)[:, 1]
+        cal = calibrate(table, raw)
+        report[name] = {
+            **(table or {'method': 'identity'}),
+            'brier_raw': round(float(brier_score_loss(y_test, raw)), 4),
+            'brier_calibrated': round(float(brier_score_loss(y_test, cal)), 4),
+            'reliability': {'raw': reliability(y_test, raw), 'calibrated': reliability(y_test, cal)},
+        }
+    return report
+
+
+def benchmark(rows=10000, repeats=200):
+    """Latency of applying each exported calibrator to one probability and to ``rows`` of them."""
+    with open('models_metadata.json', 'r') as f:
+        tables = json.load(f).get('calibration', {})
+    p_one, p_many = np.array([0.42]), np.random.default_rng(0).uniform(size=rows)
+    results = {}
+    for name, table in tables.items():
+        timings = {}
+        for label, p in (('1_row_us', p_one), (f'{rows}_rows_us', p_many)):
+            t = time.perf_counter()
+            for _ in range(repeats):
+                calibrate(table, p)
+            timings[label] = round((time.perf_counter() - t) / repeats * 1e6, 2)
+        results[name] = {'method': table['method'], **timings,
+                         'brier_raw': table.get('brier_raw'), 'brier_calibrated': table.get('brier_calibrated')}
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--benchmark', action='store_true')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        print(json.dumps(benchmark(), indent=2))
+    else:
+        parser.print_help()
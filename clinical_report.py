@@ -0,0 +1,340 @@
+"""
+HeartGuard Pro - Clinical PDF Report Engine
+Builds the clinical assessment PDF for one patient or for a whole batch. Paragraph and
+table styles, reference tables and the static flowables (rules, disclaimer, table header
+rows) are created once at import, so each report only lays out its patient-specific rows.
+
+Batches render in a process pool, in chunks of ``REPORT_CHUNK`` patients, either into a
+ZIP of per-patient PDFs or into a single merged PDF. Output is written to a spooled
+temporary file, so a batch of thousands of patients never has to sit in memory at once.
+
+    python clinical_report.py --benchmark     pages per second, single and batch rendering
+"""
+
+import argparse
+import copy
+import io
+import os
+import re
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, HRFlowable, PageBreak
+
+try:
+    from pypdf import PdfWriter
+    HAS_PYPDF = True
+except ImportError:
+    HAS_PYPDF = False
+
+REPORT_WORKERS = os.cpu_count() or 1
+REPORT_CHUNK = 50
+SPOOL_MAX_BYTES = 32 * 1024 * 1024
+# patient ids are client input; only these characters reach a file or ZIP member name
+UNSAFE_FILENAME_CHARS = re.compile(r'[^A-Za-z0-9._-]')
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  STYLES & STATIC FLOWABLES (built once per process)
+# ─────────────────────────────────────────────────────────────────────────────
+BURGUNDY, NAVY, INK, MUTED = (colors.HexColor(c) for c in ('#7C1B2E', '#1E3A5F', '#3D3228', '#7A6A5A'))
+PAPER, RULE, GRID = (colors.HexColor(c) for c in ('#FAF7F0', '#D4C9B0', '#EDE8DC'))
+RISK_HIGH, RISK_MODERATE, RISK_LOW = (colors.HexColor(c) for c in ('#C0392B', '#B8860B', '#1B5741'))
+
+STYLE_HEADER = ParagraphStyle('ReportTitle', fontName='Helvetica-Bold', fontSize=18, leading=22, textColor=BURGUNDY)
+STYLE_SUB = ParagraphStyle('ReportSub', fontName='Helvetica-Bold', fontSize=10, leading=14, textColor=MUTED)
+STYLE_SEC = ParagraphStyle('ReportSec', fontName='Helvetica-Bold', fontSize=12, leading=16, textColor=NAVY, spaceBefore=10, spaceAfter=6)
+STYLE_BODY = ParagraphStyle('ReportBody', fontName='Helvetica', fontSize=9, leading=13, textColor=INK)
+STYLE_BODY_BOLD = ParagraphStyle('ReportBodyBold', fontName='Helvetica-Bold', fontSize=9, leading=13, textColor=INK)
+STYLE_CODE = ParagraphStyle('ReportCode', fontName='Courier', fontSize=8, leading=11, textColor=NAVY)
+STYLE_DISCLAIMER = ParagraphStyle('Disc', parent=STYLE_SUB, fontSize=7, leading=9)
+STYLE_RISK = {c: ParagraphStyle(f'Risk{i}', parent=STYLE_BODY_BOLD, textColor=c)
+              for i, c in enumerate((RISK_HIGH, RISK_MODERATE, RISK_LOW))}
+
+RESULT_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0,0), (-1,-1), PAPER),
+    ('BOX', (0,0), (-1,-1), 1, RULE),
+    ('INNERGRID', (0,0), (-1,-1), 0.5, GRID),
+    ('PADDING', (0,0), (-1,-1), 6),
+])
+VITALS_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0,0), (-1,0), NAVY),
+    ('TEXTCOLOR', (0,0), (-1,0), colors.white),
+    ('BOX', (0,0), (-1,-1), 1, RULE),
+    ('INNERGRID', (0,0), (-1,-1), 0.5, GRID),
+    ('PADDING', (0,0), (-1,-1), 4),
+])
+SHAP_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0,0), (-1,0), PAPER),
+    ('BOX', (0,0), (-1,-1), 1, RULE),
+    ('INNERGRID', (0,0), (-1,-1), 0.5, GRID),
+    ('PADDING', (0,0), (-1,-1), 4),
+])
+
+FEATURE_LABELS = {
+    'age':'Age','sex':'Biological Sex','cp':'Chest Pain Type','trestbps':'Resting Blood Pressure',
+    'chol':'Serum Cholesterol','fbs':'Fasting Blood Sugar > 120','restecg':'Resting ECG Result',
+    'thalach':'Max Heart Rate Achieved','exang':'Exercise Induced Angina','oldpeak':'Exercise ST Depression',
+    'slope':'ST Segment Slope','ca':'Fluoroscopy Vessels','thal':'Thallium Stress Test'
+}
+FEATURE_TARGETS = {
+    'age':'< 55 yrs','sex':'Male (1) / Female (0)','cp':'1=Typical, 2=Atypical, 3=Non-anginal, 4=Asymptomatic',
+    'trestbps':'< 120 mm Hg','chol':'< 200 mg/dl','fbs':'<= 120 mg/dl (0)','restecg':'Normal (0)',
+    'exang':'No (0)','oldpeak':'< 1.0 mm','slope':'Upsloping (1)','ca':'0 vessels','thal':'Normal (3)'
+}
+
+TITLE_RULE = HRFlowable(width="100%", thickness=1.5, color=BURGUNDY, spaceBefore=6, spaceAfter=12)
+TITLE = Paragraph("HEARTGUARD AI — CLINICAL ASSESSMENT REPORT", STYLE_HEADER)
+SECTION_VITALS = Paragraph("Patient Clinical Intake Parameters", STYLE_SEC)
+SECTION_SHAP = Paragraph("Explainable AI (SHAP) Risk Drivers", STYLE_SEC)
+SECTION_RECS = Paragraph("Actionable Clinical Recommendations", STYLE_SEC)
+VITALS_HEADER = [Paragraph("<b>Parameter</b>", STYLE_BODY_BOLD), Paragraph("<b>Entered Value</b>", STYLE_BODY_BOLD),
+                 Paragraph("<b>Clinical Target Reference</b>", STYLE_BODY_BOLD)]
+SHAP_HEADER = [Paragraph("<b>Clinical Feature</b>", STYLE_BODY_BOLD), Paragraph("<b>SHAP Value Push</b>", STYLE_BODY_BOLD),
+               Paragraph("<b>Impact Direction</b>", STYLE_BODY_BOLD)]
+RESULT_LABELS = [Paragraph(f"<b>{t}</b>", STYLE_BODY_BOLD)
+                 for t in ("DIAGNOSTIC OUTCOME", "PREDICTED PROBABILITY", "EVALUATION MODEL")]
+FOOTER = [
+    Spacer(1, 12),
+    HRFlowable(width="100%", thickness=1, color=RULE, spaceBefore=4, spaceAfter=8),
+    Paragraph("DISCLAIMER: HeartGuard AI is a machine learning decision support software intended solely for clinical "
+              "reference. Final diagnosis rests with the attending physician.", STYLE_DISCLAIMER),
+]
+
+
+def _fresh(flowables):
+    """
+    Shallow copies of pre-built flowables. Platypus records layout state (postponement,
+    frame) on the flowable itself, so a static flowable cannot be placed twice; a shallow
+    copy keeps its parsed text and styles and only gives the layout a clean object.
+    """
+    return [copy.copy(f) for f in flowables]
+
+
+def risk_band(prob):
+    """Outcome title and colour for a probability in percent."""
+    if prob >= 70:
+        return "HIGH CARDIOVASCULAR RISK", RISK_HIGH
+    if prob >= 35:
+        return "MODERATE CARDIOVASCULAR RISK", RISK_MODERATE
+    return "LOW CARDIOVASCULAR RISK", RISK_LOW
+
+
+def recommendations(feat, prob):
+    """Clinical recommendations for numeric features; shared by the intake workspace, the API and batch reports."""
+    recs = []
+    if prob >= 50: recs.append("Cardiology referral warranted for coronary angiography / nuclear stress test.")
+    if feat['chol'] > 240: recs.append(f"Dyslipidaemia: serum cholesterol {feat['chol']} mg/dl exceeds threshold. Evaluate statin therapy.")
+    if feat['trestbps'] >= 130: recs.append(f"Hypertension: BP {feat['trestbps']} mm Hg — ambulatory monitoring and antihypertensive review.")
+    if feat['oldpeak'] >= 1.0: recs.append(f"Ischaemia: ST depression {feat['oldpeak']} mm meets diagnostic threshold for exertional ischaemia.")
+    if feat['exang'] == 1: recs.append("Exertional angina confirmed — anti-anginal therapy and flow restriction evaluation.")
+    if feat['ca'] > 0: recs.append(f"Multi-vessel CAD ({feat['ca']} vessels fluoroscopy) — revascularisation assessment advised.")
+    if not recs: recs.append("Parameters largely within normal reference ranges. Maintain lifestyle risk factor modification.")
+    return recs
+
+
+def build_story(model_name, feat, prob, pred, shap_vals, recs, model_stats=None, generated=None, patient_id=None):
+    """Flowables for one patient's report; ``prob`` is in percent, ``model_stats`` carries accuracy / roc_auc."""
+    generated = generated or datetime.now().strftime('%d %b %Y %H:%M:%S')
+    patient = f" | Patient: {patient_id}" if patient_id is not None else ""
+    story = _fresh([TITLE]) + [
+        Paragraph(f"Generated: {generated} | Model Engine: {model_name} | UCI Cleveland Provenance{patient}", STYLE_SUB),
+    ] + _fresh([TITLE_RULE])
+
+    # Patient Vitals & Risk Result Table
+    risk_title, risk_color = risk_band(prob)
+    stats = f" (Accuracy: {model_stats['accuracy']*100:.1f}%, AUC: {model_stats['roc_auc']:.3f})" if model_stats else ""
+    labels = _fresh(RESULT_LABELS)
+    t_result = Table([
+        [labels[0], Paragraph(f"<b>{risk_title}</b>", STYLE_RISK[risk_color])],
+        [labels[1], Paragraph(f"<b>{prob:.1f}%</b> (Classification: {'POSITIVE' if pred==1 else 'NEGATIVE'})", STYLE_BODY)],
+        [labels[2], Paragraph(f"{model_name}{stats}", STYLE_BODY)],
+    ], colWidths=[160, 380], style=RESULT_TABLE_STYLE)
+    story += [t_result, Spacer(1, 10)]
+
+    # Clinical Parameters Table
+    vitals = [_fresh(VITALS_HEADER)]
+    for k, v in feat.items():
+        target = f'{220 - feat["age"]} bpm target' if k == 'thalach' else FEATURE_TARGETS.get(k, '-')
+        vitals.append([Paragraph(FEATURE_LABELS.get(k, k), STYLE_BODY), Paragraph(str(v), STYLE_CODE),
+                       Paragraph(target, STYLE_BODY)])
+    story += _fresh([SECTION_VITALS]) + [Table(vitals, colWidths=[180, 120, 240], style=VITALS_TABLE_STYLE), Spacer(1, 10)]
+
+    # Top SHAP Feature Contributors
+    shap_pairs = sorted(zip(feat.keys(), shap_vals), key=lambda x: abs(x[1]), reverse=True)[:6]
+    shap_rows = [_fresh(SHAP_HEADER)]
+    for k, s_val in shap_pairs:
+        direction = "Pushes Risk HIGHER (+)" if s_val > 0 else "Reduces Risk (−)"
+        d_color = RISK_HIGH if s_val > 0 else RISK_LOW
+        shap_rows.append([Paragraph(FEATURE_LABELS.get(k, k), STYLE_BODY), Paragraph(f"{s_val:+.3f}", STYLE_CODE),
+                          Paragraph(f"<font color='{d_color.hexval()}'><b>{direction}</b></font>", STYLE_BODY)])
+    story += _fresh([SECTION_SHAP]) + [Table(shap_rows, colWidths=[180, 140, 220], style=SHAP_TABLE_STYLE), Spacer(1, 10)]
+
+    # Clinical Recommendations
+    story += _fresh([SECTION_RECS])
+    for r in recs:
+        story += [Paragraph(f"• {r}", STYLE_BODY), Spacer(1, 2)]
+    return story + _fresh(FOOTER)
+
+
+def _new_doc(out):
+    return SimpleDocTemplate(out, pagesize=letter, rightMargin=36, leftMargin=36, topMargin=36, bottomMargin=36)
+
+
+def report_filename(patient_id):
+    """File name for one patient's PDF, as downloaded or stored in a batch ZIP."""
+    return f"HeartGuard_Report_{UNSAFE_FILENAME_CHARS.sub('_', str(patient_id))}.pdf"
+
+
+def render_report(model_name, feat, prob, pred, shap_vals, recs, model_stats=None, patient_id=None):
+    """One patient's report as PDF bytes."""
+    buffer = io.BytesIO()
+    _new_doc(buffer).build(build_story(model_name, feat, prob, pred, shap_vals, recs, model_stats, patient_id=patient_id))
+    return buffer.getvalue()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  BATCH RENDERING
+# ─────────────────────────────────────────────────────────────────────────────
+# A batch is a list of report dicts: patient_id, features, probability (percent),
+# prediction, shap (sequence aligned with features) and recommendations.
+
+def _story_for(report, model_name, model_stats, generated):
+    return build_story(model_name, report['features'], report['probability'], report['prediction'], report['shap'],
+                       report['recommendations'], model_stats, generated, report['patient_id'])
+
+
+def _render_separate(reports, model_name, model_stats, generated):
+    """Per-patient PDFs for a chunk: [(patient_id, pdf bytes, pages)]."""
+    out = []
+    for report in reports:
+        buffer = io.BytesIO()
+        doc = _new_doc(buffer)
+        doc.build(_story_for(report, model_name, model_stats, generated))
+        out.append((report['patient_id'], buffer.getvalue(), doc.page))
+    return out
+
+
+def _render_merged(reports, model_name, model_stats, generated, out=None):
+    """One PDF for a chunk, a page break between patients. Returns (pdf bytes or None, pages)."""
+    story = []
+    for i, report in enumerate(reports):
+        if i:
+            story.append(PageBreak())
+        story += _story_for(report, model_name, model_stats, generated)
+    buffer = out if out is not None else io.BytesIO()
+    doc = _new_doc(buffer)
+    doc.build(story)
+    return (None if out is not None else buffer.getvalue()), doc.page
+
+
+def _chunks(reports, size):
+    return [reports[i:i + size] for i in range(0, len(reports), size)]
+
+
+def _pool_map(fn, chunks, workers, *args):
+    """Results of ``fn(chunk, *args)`` in chunk order, from a process pool when ``workers > 1``."""
+    if workers <= 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            yield fn(chunk, *args)
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+        futures = [pool.submit(fn, chunk, *args) for chunk in chunks]
+        for future in futures:
+            yield future.result()
+
+
+def render_batch_zip(reports, model_name, model_stats=None, workers=REPORT_WORKERS, chunk_size=REPORT_CHUNK, out=None):
+    """
+    ZIP of per-patient PDFs written to ``out`` (default: a spooled temporary file), filled
+    chunk by chunk as workers finish. Returns the file rewound to the start, and the page count.
+    """
+    out = out if out is not None else tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    generated = datetime.now().strftime('%d %b %Y %H:%M:%S')
+    pages = 0
+    # PDF streams are already deflated; storing avoids compressing them twice
+    with zipfile.ZipFile(out, 'w', compression=zipfile.ZIP_STORED) as zf:
+        for rendered in _pool_map(_render_separate, _chunks(reports, chunk_size), workers, model_name, model_stats, generated):
+            for patient_id, pdf, n in rendered:
+                zf.writestr(report_filename(patient_id), pdf)
+                pages += n
+    out.seek(0)
+    return out, pages
+
+
+def render_batch_pdf(reports, model_name, model_stats=None, workers=REPORT_WORKERS, chunk_size=REPORT_CHUNK, out=None):
+    """
+    Single merged PDF written to ``out`` (default: a spooled temporary file). With pypdf
+    installed, chunks are rendered in the process pool and concatenated; otherwise the
+    whole batch is laid out as one document in this process.
+    """
+    out = out if out is not None else tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    generated = datetime.now().strftime('%d %b %Y %H:%M:%S')
+    if HAS_PYPDF and workers > 1 and len(reports) > chunk_size:
+        writer, pages = PdfWriter(), 0
+        for pdf, n in _pool_map(_render_merged, _chunks(reports, chunk_size), workers, model_name, model_stats, generated):
+            writer.append(io.BytesIO(pdf))
+            pages += n
+        writer.write(out)
+    else:
+        _, pages = _render_merged(reports, model_name, model_stats, generated, out)
+    out.seek(0)
+    return out, pages
+
+
+def benchmark(n_patients=200, workers=REPORT_WORKERS, chunk_size=REPORT_CHUNK, seed=0):
+    """Pages per second for one-at-a-time reports and for both batch modes, on synthetic patients."""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    feats = ['age', 'sex', 'cp', 'trestbps', 'chol', 'fbs', 'restecg', 'thalach', 'exang', 'oldpeak', 'slope', 'ca', 'thal']
+    reports = []
+    for i in range(n_patients):
+        feat = {'age': int(rng.integers(30, 78)), 'sex': int(rng.integers(0, 2)), 'cp': int(rng.integers(1, 5)),
+                'trestbps': int(rng.integers(95, 190)), 'chol': int(rng.integers(130, 400)), 'fbs': int(rng.integers(0, 2)),
+                'restecg': int(rng.integers(0, 3)), 'thalach': int(rng.integers(90, 200)), 'exang': int(rng.integers(0, 2)),
+                'oldpeak': round(float(rng.uniform(0, 4)), 1), 'slope': int(rng.integers(1, 4)),
+                'ca': int(rng.integers(0, 4)), 'thal': int(rng.choice([3, 6, 7]))}
+        prob = float(rng.uniform(0, 100))
+        reports.append({'patient_id': f'P{i:05d}', 'features': feat, 'probability': prob, 'prediction': int(prob >= 50),
+                        'shap': rng.normal(0, 0.1, len(feats)).tolist(), 'recommendations': recommendations(feat, prob)})
+    stats = {'accuracy': 0.85, 'roc_auc': 0.949}
+
+    results = {}
+    generated = datetime.now().strftime('%d %b %Y %H:%M:%S')
+    t = time.perf_counter()
+    pages = sum(_render_separate([r], 'Voting Ensemble', stats, generated)[0][2] for r in reports[:min(50, n_patients)])
+    secs = time.perf_counter() - t
+    results['single'] = {'reports': min(50, n_patients), 'pages': pages, 'seconds': round(secs, 3),
+                         'pages_per_s': round(pages / secs, 1)}
+
+    for mode, fn in (('zip', render_batch_zip), ('merged', render_batch_pdf)):
+        t = time.perf_counter()
+        f, pages = fn(reports, 'Voting Ensemble', stats, workers, chunk_size)
+        secs = time.perf_counter() - t
+        size = f.seek(0, io.SEEK_END)
+        f.close()
+        results[mode] = {'reports': n_patients, 'pages': pages, 'seconds': round(secs, 3),
+                         'pages_per_s': round(pages / secs, 1), 'bytes': size, 'workers': workers}
+    return results
+
+
+if __name__ == '__main__':
+    import json
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--benchmark', action='store_true')
+    parser.add_argument('--patients', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=REPORT_WORKERS)
+    parser.add_argument('--chunk', type=int, default=REPORT_CHUNK)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        print(json.dumps(benchmark(args.patients, args.workers, args.chunk), indent=2))
+    else:
+        parser.print_help()
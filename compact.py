@@ -0,0 +1,392 @@
+"""
+HeartGuard Pro - Compact Model Export
+The model suite in small typed arrays, scored with NumPy alone, for clinic kiosks where
+scikit-learn is not installed and memory is short.
+
+``export_compact`` writes ``models_compact.npz`` (``build_compact`` then ``write_compact``, so
+a caller can build and check the export before writing anything). It holds a JSON header (features,
+scaler, model layout, calibrators) and one set of arrays per model:
+
+    Random Forest        split nodes: feature (int8/int16), threshold (float32), child indices;
+                         leaf class-1 probabilities as uint8 (p * 255) where that stays within
+                         the test resolution, else float16 / float32
+    Gradient Boosting    the same tree layout; leaf values pre-multiplied by the learning rate
+    Logistic Regression  weights and intercept in float32
+    K-Nearest Neighbors  the reference set in float32 (float64 if that moves a probability) and uint8 labels
+    Voting Ensemble      member names and weights only; members are shared with the suite
+
+Thresholds are rounded down to float32, which is exact: trees compare float32 inputs,
+and a float32 ``x`` is ``<= t`` exactly when it is ``<=`` the largest float32 not above
+``t``. Each model takes the smallest leaf / reference dtype whose largest probability
+deviation from the scikit-learn original, on the check rows, stays within
+``RESOLUTION``. The sizes and deviations are stored in the header and in
+``models_metadata.json``.
+
+``CompactScorer`` needs only NumPy; scikit-learn is imported only for exporting.
+
+    python compact.py --export       write models_compact.npz from the exported pickles
+    python compact.py --benchmark    sizes, deviations and latency vs. the scikit-learn models
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+COMPACT_FILE = 'models_compact.npz'
+FORMAT_VERSION = 1
+RESOLUTION = 5e-4            # half the 0.1-point probability resolution the app and reports show
+DECISION_THRESHOLD = 0.5     # calibration.DECISION_THRESHOLD, on the calibrated probability
+CHUNK_ROWS = 2048            # rows per vectorised tree descent (rows x trees node indices)
+ENSEMBLE_MEMBERS = {'rf': 'Random Forest', 'gb': 'Gradient Boosting', 'knn': 'K-Nearest Neighbors',
+                    'lr': 'Logistic Regression'}
+
+
+def _smallest_int(max_value):
+    return next(t for t in (np.int8, np.int16, np.int32) if max_value <= np.iinfo(t).max)
+
+
+def _expit(z):
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+# ── Scoring (NumPy only) ─────────────────────────────────────────────────────
+class _Trees:
+    """
+    The stored per-tree split / leaf arrays expanded into one node table for scoring:
+    split nodes first, then leaves, which point to themselves so that ``depth`` steps of
+    a vectorised descent land every (row, tree) pair on its leaf.
+    """
+
+    def __init__(self, a):
+        n_split, n_leaf = a['n_split'].astype(np.int64), a['n_leaf'].astype(np.int64)
+        split_at = np.concatenate([[0], np.cumsum(n_split)[:-1]])
+        leaf_at = n_split.sum() + np.concatenate([[0], np.cumsum(n_leaf)[:-1]])
+        tree = np.repeat(np.arange(len(n_split)), n_split)
+        leaves = np.arange(n_split.sum(), n_split.sum() + n_leaf.sum())
+
+        def globalise(child):
+            child = child.astype(np.int64)
+            return np.where(child >= 0, child + split_at[tree], -1 - child + leaf_at[tree])
+
+        self.n_split = int(n_split.sum())
+        self.feature = np.concatenate([a['feature'], np.zeros(len(leaves), a['feature'].dtype)]).astype(np.intp)
+        self.threshold = np.concatenate([a['threshold'], np.full(len(leaves), np.inf, np.float32)])
+        # column 1 is taken when the input goes left (x <= threshold); leaves always go "left", to themselves
+        self.children = np.column_stack([np.concatenate([globalise(a['right']), leaves]),
+                                         np.concatenate([globalise(a['left']), leaves])])
+        self.roots = np.where(n_split > 0, split_at, leaf_at)
+        self.leaf_value = a['leaf_value'].astype(np.float64) / (255.0 if a['leaf_value'].dtype == np.uint8 else 1.0)
+        self.depth = int(a['depth'])
+
+    def leaves(self, X32):
+        """Leaf value of every tree for every row: shape (rows, trees)."""
+        n, n_features = X32.shape
+        flat, offset = X32.ravel(), (np.arange(n) * n_features)[:, None]
+        node = np.broadcast_to(self.roots, (n, len(self.roots)))
+        for _ in range(self.depth):
+            go_left = flat[offset + self.feature[node]] <= self.threshold[node]
+            node = self.children[node, go_left.view(np.int8)]
+        return self.leaf_value[node - self.n_split]
+
+
+def _score(kind, spec, compiled, Xs):
+    """Class-1 probabilities of one compiled model for the scaled matrix ``Xs``."""
+    if kind in ('forest', 'boosting'):
+        X32 = Xs.astype(np.float32)
+        out = np.empty(len(Xs))
+        for s in range(0, len(Xs), CHUNK_ROWS):
+            leaves = compiled.leaves(X32[s:s + CHUNK_ROWS])
+            out[s:s + CHUNK_ROWS] = (leaves.mean(axis=1) if kind == 'forest'
+                                     else _expit(spec['init'] + leaves.sum(axis=1)))
+        return out
+    if kind == 'logistic':
+        return _expit(Xs @ compiled['coef'].astype(np.float64) + float(compiled['intercept'][0]))
+    if kind == 'knn':
+        ref, labels, k = compiled['reference'].astype(np.float64), compiled['labels'], spec['n_neighbors']
+        ref_sq = (ref ** 2).sum(axis=1)
+        out = np.empty(len(Xs))
+        for s in range(0, len(Xs), CHUNK_ROWS):
+            x = Xs[s:s + CHUNK_ROWS]
+            if spec['p'] == 2:    # |x - r|^2 = |x|^2 - 2 x.r + |r|^2, as sklearn's brute-force search does
+                d = np.sqrt(np.maximum((x ** 2).sum(axis=1)[:, None] - 2 * x @ ref.T + ref_sq, 0))
+            else:
+                d = np.abs(x[:, None, :] - ref[None, :, :]).sum(axis=2)
+            nearest = np.argpartition(d, k - 1, axis=1)[:, :k]
+            dist, y = np.take_along_axis(d, nearest, axis=1), labels[nearest]
+            if spec['weights'] == 'distance':
+                with np.errstate(divide='ignore'):
+                    w = 1.0 / dist
+                exact = np.isinf(w)
+                w = np.where(exact.any(axis=1, keepdims=True), exact, w)
+            else:
+                w = np.ones_like(dist)
+            out[s:s + CHUNK_ROWS] = (w * y).sum(axis=1) / w.sum(axis=1)
+        return out
+    raise ValueError(f"Unknown compact model kind '{kind}'")
+
+
+def _calibrate(table, p):
+    if not table or table['method'] == 'identity':
+        return p
+    if table['method'] == 'isotonic':
+        return np.interp(p, table['x'], table['y'])
+    q = np.clip(p, 1e-6, 1 - 1e-6)
+    return _expit(table['a'] * np.log(q / (1 - q)) + table['b'])
+
+
+class CompactScorer:
+    """Scores the suite from a ``models_compact.npz`` file; needs NumPy only."""
+
+    def __init__(self, path=COMPACT_FILE, arrays=None):
+        if arrays is None:
+            with np.load(path, allow_pickle=False) as data:
+                arrays = {k: data[k] for k in data.files}
+        else:
+            arrays = dict(arrays)       # arrays built by build_compact, not yet written
+        self.header = json.loads(arrays.pop('__header__').tobytes().decode())
+        if self.header.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported compact format {self.header.get('format_version')}")
+        self.features = self.header['features']
+        self.mean = np.array(self.header['scaler']['mean'])
+        self.scale = np.array(self.header['scaler']['scale'])
+        self.specs = self.header['models']
+        self._compiled = {}
+        for key in {spec['key'] for spec in self.specs.values() if 'key' in spec}:
+            parts = {k.split('/', 1)[1]: v for k, v in arrays.items() if k.startswith(key + '/')}
+            kind = next(s['kind'] for s in self.specs.values() if s.get('key') == key)
+            self._compiled[key] = _Trees(parts) if kind in ('forest', 'boosting') else parts
+
+    @property
+    def models(self):
+        return list(self.specs)
+
+    def _matrix(self, X):
+        if hasattr(X, 'columns'):
+            X = X[self.features].to_numpy(dtype=float)
+        return (np.atleast_2d(np.asarray(X, dtype=float)) - self.mean) / self.scale
+
+    def _raw(self, model_name, Xs):
+        spec = self.specs[model_name]
+        if spec['kind'] == 'voting':
+            w = np.array(spec['weights'], dtype=float)
+            return sum(wi * self._raw(m, Xs) for m, wi in zip(spec['members'], w) if wi) / w.sum()
+        return _score(spec['kind'], spec, self._compiled[spec['key']], Xs)
+
+    def predict_proba(self, model_name, X):
+        """Uncalibrated class-1 probabilities (0-1), as the scikit-learn model's ``predict_proba[:, 1]``."""
+        return self._raw(model_name, self._matrix(X))
+
+    def predict(self, model_name, X):
+        """Calibrated probabilities (percent) and predicted classes, as ``InferenceEngine.predict_batch``."""
+        p = _calibrate(self.header.get('calibration', {}).get(model_name), self.predict_proba(model_name, X))
+        return p * 100, (p >= DECISION_THRESHOLD).astype(int)
+
+
+# ── Export (needs scikit-learn) ──────────────────────────────────────────────
+def _floor_float32(t):
+    t32 = t.astype(np.float32)
+    return np.where(t32.astype(np.float64) > t, np.nextafter(t32, np.float32(-np.inf)), t32)
+
+
+def _tree_arrays(trees, leaf_values):
+    """Split / leaf arrays for sklearn ``Tree`` objects; ``leaf_values(tree)`` gives each node's value."""
+    feature, threshold, left, right, leaves, n_split, n_leaf = [], [], [], [], [], [], []
+    for t in trees:
+        is_leaf = t.children_left == -1
+        split_id = np.cumsum(~is_leaf) - 1
+        leaf_id = np.cumsum(is_leaf) - 1
+        local = lambda child: np.where(is_leaf[child], -1 - leaf_id[child], split_id[child])
+        feature.append(t.feature[~is_leaf])
+        threshold.append(t.threshold[~is_leaf])
+        left.append(local(t.children_left[~is_leaf]))
+        right.append(local(t.children_right[~is_leaf]))
+        leaves.append(leaf_values(t)[is_leaf])
+        n_split.append((~is_leaf).sum())
+        n_leaf.append(is_leaf.sum())
+    child = _smallest_int(max(max(n_split), max(n_leaf)))
+    return {'feature': np.concatenate(feature).astype(_smallest_int(max(np.concatenate(feature).max(), 1))),
+            'threshold': _floor_float32(np.concatenate(threshold)),
+            'left': np.concatenate(left).astype(child), 'right': np.concatenate(right).astype(child),
+            'leaf_value': np.concatenate(leaves), 'n_split': np.array(n_split, dtype=np.int32),
+            'n_leaf': np.array(n_leaf, dtype=np.int32), 'depth': np.array(max(t.max_depth for t in trees))}
+
+
+def _leaf_candidates(values, kind):
+    if kind == 'forest':
+        yield 'uint8', np.round(values * 255).astype(np.uint8)
+    yield 'float16', values.astype(np.float16)
+    yield 'float32', values.astype(np.float32)
+
+
+def _compile(model):
+    """(kind, spec, arrays, candidate variants) for one fitted scikit-learn model."""
+    from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.neighbors import KNeighborsClassifier
+
+    if isinstance(model, RandomForestClassifier):
+        arrays = _tree_arrays([e.tree_ for e in model.estimators_],
+                              lambda t: t.value[:, 0, 1] / t.value[:, 0, :].sum(axis=1))
+        return 'forest', {}, arrays, [('leaf_value', d, v) for d, v in _leaf_candidates(arrays['leaf_value'], 'forest')]
+    if isinstance(model, GradientBoostingClassifier):
+        if model.estimators_.shape[1] != 1:
+            raise ValueError("Only binary Gradient Boosting models can be exported")
+        arrays = _tree_arrays([e.tree_ for e in model.estimators_[:, 0]],
+                              lambda t: t.value[:, 0, 0] * model.learning_rate)
+        p0 = float(np.clip(model.init_.predict_proba(np.zeros((1, model.n_features_in_)))[0, 1], 1e-12, 1 - 1e-12))
+        return ('boosting', {'init': float(np.log(p0 / (1 - p0)))}, arrays,
+                [('leaf_value', d, v) for d, v in _leaf_candidates(arrays['leaf_value'], 'boosting')])
+    if isinstance(model, LogisticRegression):
+        return 'logistic', {}, {'coef': model.coef_[0].astype(np.float32),
+                                'intercept': model.intercept_.astype(np.float32)}, [(None, 'float32', None)]
+    if isinstance(model, KNeighborsClassifier):
+        if model.metric != 'minkowski' or model.p not in (1, 2) or model.weights not in ('uniform', 'distance'):
+            raise ValueError("Only Minkowski p=1/2 KNN with uniform or distance weights can be exported")
+        labels = (model._y == np.flatnonzero(model.classes_ == 1)[0]).astype(np.uint8)
+        spec = {'n_neighbors': int(model.n_neighbors), 'p': int(model.p), 'weights': model.weights}
+        return 'knn', spec, {'labels': labels}, [('reference', d, model._fit_X.astype(d))
+                                                  for d in ('float32', 'float64')]
+    raise ValueError(f"{type(model).__name__} cannot be exported in compact form")
+
+
+def _digest(arrays):
+    h = hashlib.sha1()
+    for k in sorted(arrays):
+        h.update(k.encode())
+        h.update(np.ascontiguousarray(arrays[k]).tobytes())
+    return h.hexdigest()
+
+
+def build_compact(models, scaler, X_check, calibration=None, resolution=RESOLUTION):
+    """
+    The suite's compact arrays and export report, in memory: per model the compact bytes,
+    the chosen dtype and the largest probability deviation from the original on ``X_check``
+    (raw feature rows).
+    """
+    from sklearn.ensemble import VotingClassifier
+    features = list(getattr(scaler, 'feature_names_in_', X_check.columns))
+    Xs = scaler.transform(X_check[features])
+    header = {'format_version': FORMAT_VERSION, 'features': features,
+              'scaler': {'mean': scaler.mean_.tolist(), 'scale': scaler.scale_.tolist()}, 'models': {},
+              'calibration': {n: {k: v for k, v in t.items() if k in ('method', 'x', 'y', 'a', 'b')}
+                              for n, t in (calibration or {}).items()}}
+    arrays, by_digest, report = {}, {}, {}
+
+    def add(name, model):
+        kind, spec, base, variants = _compile(model)
+        expected = model.predict_proba(Xs)[:, 1]
+        for field, dtype, value in variants:
+            candidate = dict(base, **({field: value} if field else {}))
+            compiled = _Trees(candidate) if kind in ('forest', 'boosting') else candidate
+            deviation = float(np.abs(_score(kind, spec, compiled, Xs) - expected).max())
+            if deviation <= resolution:
+                break
+        digest = _digest(candidate)
+        key = by_digest.setdefault(digest, f'm{len(by_digest)}')
+        if key not in {k.split('/')[0] for k in arrays}:
+            arrays.update({f'{key}/{k}': v for k, v in candidate.items()})
+        header['models'][name] = {'kind': kind, 'key': key, **spec, 'dtype': dtype}
+        report[name] = {'dtype': dtype, 'compact_bytes': int(sum(v.nbytes for v in candidate.values())),
+                        'max_probability_deviation': deviation}
+
+    for name, model in models.items():
+        if isinstance(model, VotingClassifier):
+            continue
+        add(name, model)
+    for name, model in models.items():
+        if not isinstance(model, VotingClassifier):
+            continue
+        if model.voting != 'soft':
+            raise ValueError("Only soft-voting ensembles can be exported")
+        members, weights = [], model.weights or [1] * len(model.estimators_)
+        for (short, _), est, w in zip(model.estimators, model.estimators_, weights):
+            member = f"{name}/{ENSEMBLE_MEMBERS.get(short, short)}"
+            if w:
+                add(member, est)       # shares its arrays with the suite's copy when they are identical
+                header['models'][member]['member_of'] = name
+            members.append(member)
+        header['models'][name] = {'kind': 'voting', 'members': members, 'weights': [float(w) for w in weights]}
+        report[name] = {'dtype': 'members', 'compact_bytes': 0}
+
+    arrays['__header__'] = np.frombuffer(json.dumps(header).encode(), dtype=np.uint8)
+
+    scorer = CompactScorer(arrays=arrays)
+    X_raw = X_check[features].to_numpy(dtype=float)
+    for name, model in models.items():
+        report[name]['max_probability_deviation'] = float(
+            np.abs(scorer.predict_proba(name, X_raw) - model.predict_proba(Xs)[:, 1]).max())
+    return arrays, {'resolution': resolution, 'check_rows': len(X_check), 'models': {n: report[n] for n in models}}
+
+
+def write_compact(arrays, report, path=COMPACT_FILE):
+    """Write arrays from ``build_compact`` to ``path``; returns the report with the file name and size."""
+    np.savez_compressed(path, **arrays)
+    return {'filename': path, 'file_bytes': os.path.getsize(path), **report}
+
+
+def export_compact(models, scaler, X_check, calibration=None, path=COMPACT_FILE, resolution=RESOLUTION):
+    """Build the compact suite and write it to ``path``; returns the export report (see ``build_compact``)."""
+    return write_compact(*build_compact(models, scaler, X_check, calibration, resolution), path)
+
+
+def benchmark(rows=10000, repeats=5):
+    """Pickle vs. compact size, deviation on held-out and synthetic rows, and scoring latency per model."""
+    import pandas as pd
+    from inference import load_engine
+    from synthetic import load_copula, sample
+    from heart_data import load_training_data, split_holdout
+    engine = load_engine()
+    X_train, X_test, _, _ = split_holdout(load_training_data(engine.metadata.get('sites')))
+    export = export_compact(engine.models, engine.scaler, pd.concat([X_train, X_test]), engine.calibration,
+                            path='models_compact_benchmark.npz')
+    scorer = CompactScorer('models_compact_benchmark.npz')
+    # float64, as patients reach the engine (a float32 column would make the scaler work in float32)
+    X_syn = sample(load_copula(engine.metadata.get('sites')), rows, np.random.default_rng(0))[scorer.features].astype(float)
+
+    def timed(fn):
+        fn()
+        t = time.perf_counter()
+        for _ in range(repeats):
+            fn()
+        return round((time.perf_counter() - t) / repeats * 1000, 2)
+
+    results = {'compact_file_bytes': export['file_bytes'], 'pickle_bytes': {}, 'models': {}}
+    for name, model in engine.models.items():
+        pickle_bytes = os.path.getsize(engine.metadata['models'][name]['filename'])
+        results['pickle_bytes'][name] = pickle_bytes
+        Xs = engine.scaler.transform(X_syn)
+        results['models'][name] = {
+            **export['models'][name],
+            'pickle_bytes': pickle_bytes,
+            f'max_deviation_{rows}_synthetic': float(np.abs(scorer.predict_proba(name, X_syn) - model.predict_proba(Xs)[:, 1]).max()),
+            'sklearn_1_row_ms': timed(lambda: model.predict_proba(engine.scaler.transform(X_syn.iloc[:1]))),
+            'compact_1_row_ms': timed(lambda: scorer.predict_proba(name, X_syn.iloc[:1].to_numpy())),
+            f'sklearn_{rows}_rows_ms': timed(lambda: model.predict_proba(engine.scaler.transform(X_syn))),
+            f'compact_{rows}_rows_ms': timed(lambda: scorer.predict_proba(name, X_syn.to_numpy())),
+        }
+    total = sum(results['pickle_bytes'].values())
+    results['size_reduction'] = f"{total} -> {export['file_bytes']} bytes ({total / export['file_bytes']:.0f}x)"
+    os.remove('models_compact_benchmark.npz')
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--export', action='store_true')
+    parser.add_argument('--benchmark', action='store_true')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        print(json.dumps(benchmark(), indent=2))
+    elif args.export:
+        from inference import load_engine
+        from heart_data import load_training_data
+        engine = load_engine()
+        X_check = load_training_data(engine.metadata.get('sites'))[engine.metadata['features']].dropna()
+        print(json.dumps(export_compact(engine.models, engine.scaler, X_check, engine.calibration), indent=2))
+    else:
+        parser.print_help()
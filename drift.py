@@ -0,0 +1,244 @@
+"""
+HeartGuard Pro - Input Drift Monitor
+Watches the features of scored patients for drift away from the training distribution
+(a new ``thal`` coding, an older age mix, different units for cholesterol).
+
+``train_models.py`` stores reference bins per feature in ``models_metadata.json``
+(``drift_reference``): decile bins for continuous features and one bin per known
+code for categorical ones, plus bins outside the training range and between known codes.
+The monitor keeps one fixed-size count array over all those bins (O(1) memory). An
+observation is offset per feature and located with a single ``searchsorted`` over the
+concatenated edges, so a request costs a few microseconds. From the counts it reports per
+feature the population stability index (PSI), a binned Kolmogorov-Smirnov statistic for
+continuous features, live quantiles and the out-of-range rate. It does this for all
+traffic and for a recent window of two tumbling blocks.
+
+    python drift.py --benchmark     per-request cost, and PSI / KS on a shifted stream
+"""
+
+import argparse
+import json
+import threading
+import time
+
+import numpy as np
+
+FEATURES = ['age', 'sex', 'cp', 'trestbps', 'chol', 'fbs', 'restecg', 'thalach', 'exang', 'oldpeak', 'slope', 'ca', 'thal']
+CATEGORICAL = ['sex', 'cp', 'fbs', 'restecg', 'exang', 'slope', 'ca', 'thal']
+QUANTILE_STEP = 10           # percent; 10 reference bins per continuous feature
+CODE_HALF_WIDTH = 0.25       # a categorical value within this of a known code counts as that code
+WINDOW = 500                 # observations per tumbling block; "recent" is the last one to two blocks
+MIN_SAMPLES = 200            # below this no drift status is given (PSI of pure noise is ~bins/n)
+PSI_MODERATE, PSI_MAJOR = 0.1, 0.25
+SMOOTHING = 1e-4
+OFFSET = 1e6                 # separates features on the shared search axis; |values| stay far below
+
+
+def reference_bins(X, features=FEATURES, categorical=CATEGORICAL):
+    """Reference bins and proportions per feature for a DataFrame of raw training rows."""
+    ref = {'n': int(len(X)), 'features': {}}
+    for f in features:
+        x = np.asarray(X[f], dtype=float)
+        x = x[~np.isnan(x)]
+        if f in categorical:
+            codes = np.unique(x)
+            edges = np.column_stack([codes - CODE_HALF_WIDTH, codes + CODE_HALF_WIDTH]).ravel()
+            entry = {'kind': 'categorical', 'codes': codes.tolist()}
+        else:
+            edges = np.unique(np.percentile(x, np.arange(0, 100 + QUANTILE_STEP, QUANTILE_STEP)))
+            edges[-1] += 1e-6    # the training maximum is in range (and survives the per-feature offset)
+            entry = {'kind': 'continuous', 'range': [float(x.min()), float(x.max())],
+                     'quantiles': dict(zip(['p10', 'p50', 'p90'], np.percentile(x, [10, 50, 90]).round(3).tolist()))}
+        counts = np.bincount(np.searchsorted(edges, x, side='right'), minlength=len(edges) + 1)
+        ref['features'][f] = {**entry, 'edges': edges.tolist(), 'proportions': (counts / len(x)).round(6).tolist()}
+    return ref
+
+
+def _in_range_mask(entry):
+    """Bins inside the training range (continuous) or on a known code (categorical)."""
+    n = len(entry['edges']) + 1
+    mask = np.zeros(n, dtype=bool)
+    if entry['kind'] == 'categorical':
+        mask[1::2] = True
+    else:
+        mask[1:-1] = True
+    return mask
+
+
+class DriftMonitor:
+    """Streaming bin counts against a ``reference_bins`` reference; thread-safe, fixed memory."""
+
+    def __init__(self, reference, window=WINDOW):
+        self.reference = reference
+        self.features = list(reference['features'])
+        self.window = window
+        entries = [reference['features'][f] for f in self.features]
+        sizes = [len(e['edges']) + 1 for e in entries]
+        self._start = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        self._slices = [slice(s, s + n) for s, n in zip(self._start, sizes)]
+        self._offsets = np.arange(len(self.features)) * OFFSET
+        # bin k of feature j is global bin start_j + k; a searchsorted over the shifted edges of
+        # every feature returns start_j + k - j (feature j has one more bin than edges)
+        self._edges = np.concatenate([np.asarray(e['edges']) + o for e, o in zip(entries, self._offsets)])
+        self._feature_index = np.arange(len(self.features))
+        self._ref = [np.asarray(e['proportions']) for e in entries]
+        self._in_range = [_in_range_mask(e) for e in entries]
+        total = int(sum(sizes))
+        self.total = np.zeros(total, dtype=np.int64)
+        self._blocks = [np.zeros(total, dtype=np.int64), np.zeros(total, dtype=np.int64)]
+        self._block_n = [0, 0]
+        self.n = 0
+        self._lock = threading.Lock()
+
+    def _bins(self, X):
+        """Global bin index for every value of the (rows, features) raw matrix ``X``."""
+        X = np.fmin(np.fmax(X, -OFFSET / 4), OFFSET / 4)    # fmax maps NaN to the bound: out of range
+        pos = np.searchsorted(self._edges, X + self._offsets, side='right')
+        return pos + self._feature_index
+
+    # ── Observing ────────────────────────────────────────────────────────────
+    def observe(self, feat):
+        """Count one patient (a dict with every feature)."""
+        idx = self._bins(np.array([[feat[f] for f in self.features]], dtype=float))[0]
+        with self._lock:
+            if self._block_n[0] >= self.window:
+                self._rotate()
+            self.total[idx] += 1
+            self._blocks[0][idx] += 1
+            self._block_n[0] += 1
+            self.n += 1
+
+    def observe_batch(self, X):
+        """Count every row of a DataFrame of patients."""
+        idx = self._bins(np.asarray(X[self.features], dtype=float))
+        counts = np.bincount(idx.ravel(), minlength=len(self.total))
+        with self._lock:
+            if self._block_n[0] >= self.window:
+                self._rotate()
+            self.total += counts
+            self._blocks[0] += counts
+            self._block_n[0] += len(idx)
+            self.n += len(idx)
+
+    def _rotate(self):
+        self._blocks = [self._blocks[1], self._blocks[0]]
+        self._blocks[0][:] = 0
+        self._block_n = [0, self._block_n[0]]
+
+    def reset(self):
+        with self._lock:
+            self.total[:] = 0
+            for b in self._blocks:
+                b[:] = 0
+            self._block_n, self.n = [0, 0], 0
+
+    # ── Reporting ────────────────────────────────────────────────────────────
+    def _feature_state(self, j, counts):
+        f = self.features[j]
+        entry = self.reference['features'][f]
+        c = counts[self._slices[j]].astype(float)
+        n = c.sum()
+        out = {'n': int(n), 'out_of_range_rate': round(float(c[~self._in_range[j]].sum() / n), 4) if n else None}
+        if not n:
+            return out
+        live, ref = c / n, self._ref[j]
+        p, q = live + SMOOTHING, ref + SMOOTHING
+        out['psi'] = round(float(np.sum((p - q) * np.log(p / q))), 4)
+        if entry['kind'] == 'continuous':
+            out['ks'] = round(float(np.abs(np.cumsum(live) - np.cumsum(ref)).max()), 4)
+            out['quantiles'] = {k: self._quantile(j, live, int(k[1:]) / 100) for k in ('p10', 'p50', 'p90')}
+            out['reference_quantiles'] = entry['quantiles']
+        else:
+            codes = entry['codes']
+            out['shares'] = {str(int(k) if float(k).is_integer() else k): round(float(v), 4)
+                             for k, v in zip(codes, live[1::2])}
+            out['reference_shares'] = {str(int(k) if float(k).is_integer() else k): round(float(v), 4)
+                                       for k, v in zip(codes, ref[1::2])}
+        if n >= MIN_SAMPLES:
+            out['status'] = 'major' if out['psi'] >= PSI_MAJOR else 'moderate' if out['psi'] >= PSI_MODERATE else 'stable'
+        return out
+
+    def _quantile(self, j, live, q):
+        """Quantile by linear interpolation within the reference bins (outer bins clamp to the range)."""
+        edges = np.asarray(self.reference['features'][self.features[j]]['edges'])
+        cdf = np.cumsum(live)
+        k = int(np.searchsorted(cdf, q))
+        if k == 0 or k >= len(edges):
+            return float(edges[min(k, len(edges) - 1)])
+        below = cdf[k - 1]
+        frac = (q - below) / max(live[k], 1e-12)
+        return round(float(edges[k - 1] + frac * (edges[k] - edges[k - 1])), 3)
+
+    def state(self, window='all'):
+        """Per-feature drift statistics for all traffic (``'all'``) or the recent window (``'recent'``)."""
+        with self._lock:
+            counts = self.total.copy() if window == 'all' else self._blocks[0] + self._blocks[1]
+            n = self.n if window == 'all' else sum(self._block_n)
+        features = {f: self._feature_state(j, counts) for j, f in enumerate(self.features)}
+        flagged = sorted((f for f, s in features.items() if s.get('status') in ('moderate', 'major')),
+                         key=lambda f: -features[f]['psi'])
+        return {'window': window, 'observations': int(n), 'reference_size': self.reference['n'],
+                'min_samples': MIN_SAMPLES, 'drifting_features': flagged, 'features': features}
+
+    def memory_bytes(self):
+        return self.total.nbytes + sum(b.nbytes for b in self._blocks) + self._edges.nbytes
+
+
+def load_reference(metadata):
+    """Reference from the exported metadata, or computed from the training split for older exports."""
+    if metadata.get('drift_reference'):
+        return metadata['drift_reference']
+    from heart_data import load_training_data, split_holdout
+    X_train, _, _, _ = split_holdout(load_training_data(metadata.get('sites')))
+    return reference_bins(X_train)
+
+
+def benchmark(n=20000):
+    """
+    Cost per observation and per batch row; PSI / KS for a stream resampled from the training
+    rows, for the held-out patients, and for a shifted stream (older, higher cholesterol,
+    ``thal`` 7 recoded as 4).
+    """
+    from heart_data import load_training_data, split_holdout
+    X_train, X_test, _, _ = split_holdout(load_training_data())
+    monitor = DriftMonitor(reference_bins(X_train))
+    rows = X_train.sample(n, replace=True, random_state=0)
+    dicts = rows.to_dict('records')
+
+    t = time.perf_counter()
+    for d in dicts:
+        monitor.observe(d)
+    per_request_us = (time.perf_counter() - t) / n * 1e6
+    steady = monitor.state()
+    monitor.reset()
+    monitor.observe_batch(X_test)
+    held_out = monitor.state()
+
+    shifted = rows.copy()
+    shifted['age'] += 12
+    shifted['chol'] *= 1.15
+    shifted['thal'] = shifted['thal'].replace({7: 4})     # a different coding for reversible defect
+    monitor.reset()
+    t = time.perf_counter()
+    monitor.observe_batch(shifted)
+    per_row_batch_us = (time.perf_counter() - t) / n * 1e6
+    drifted = monitor.state()
+
+    pick = lambda s: {f: {k: s['features'][f].get(k) for k in ('psi', 'ks', 'out_of_range_rate', 'status')}
+                      for f in ('age', 'chol', 'thal', 'trestbps')}
+    return {'observations': n, 'observe_us': round(per_request_us, 2), 'observe_batch_us_per_row': round(per_row_batch_us, 3),
+            'memory_bytes': monitor.memory_bytes(),
+            'training_resample_stream': {'drifting': steady['drifting_features'], **pick(steady)},
+            'held_out_patients': {'n': held_out['observations'], **pick(held_out)},
+            'shifted_stream': {'drifting': drifted['drifting_features'], **pick(drifted)}}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--benchmark', action='store_true')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        print(json.dumps(benchmark(), indent=2))
+    else:
+        parser.print_help()
@@ -0,0 +1,305 @@
+"""
+HeartGuard Pro - Shadow Scoring & A/B Traffic Splits
+Trials registered model versions (model_registry.py) on live /predict traffic.
+
+    shadow   a version that scores every request after the response has been computed, on a
+             background worker; its output is only logged, never returned
+    split    {version: percent} of requests served by other versions; a request with a
+             patient_id always lands in the same arm, the rest are assigned at random
+
+The experiment lives in ``model_registry/EXPERIMENT.json`` so every API worker follows it;
+arms are loaded and warmed by the registry watch thread (or by the admin call that sets
+them), never on the /predict path. An arm that fails to load is left out, with its error
+in ``status()``, until the file changes; registry pruning never deletes an arm. Each
+served and shadow score (version, model, probability, prediction, latency) is written to the
+``experiment_scores`` table of a local SQLite file by the same background worker.
+
+    python experiments.py --report [--hours 24]   served arms and shadow agreement / probability deltas
+    python experiments.py --benchmark             client latency with no experiment, a shadow and a split
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from model_registry import EXPERIMENT_FILE, _write_atomic, warm_engine
+
+EXPERIMENT_DB = 'experiment_log.db'
+MAX_BACKLOG = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS experiment_scores (
+    request_id  TEXT NOT NULL,
+    ts          REAL NOT NULL,
+    role        TEXT NOT NULL,     -- 'active' / 'split' (served) or 'shadow'
+    version     TEXT NOT NULL,
+    model       TEXT NOT NULL,
+    probability REAL,
+    prediction  INTEGER,
+    latency_ms  REAL
+);
+CREATE INDEX IF NOT EXISTS idx_experiment_scores_ts ON experiment_scores (ts);
+CREATE INDEX IF NOT EXISTS idx_experiment_scores_request ON experiment_scores (request_id, role);
+"""
+
+
+def _bucket(patient_id):
+    """Stable 0-100 bucket for a patient, so repeat visits stay in one arm."""
+    if patient_id is None:
+        return random.uniform(0, 100)
+    return int(hashlib.sha1(str(patient_id).encode()).hexdigest()[:8], 16) % 10000 / 100
+
+
+class ExperimentRouter:
+    """
+    Routes requests between the active version and split arms, and queues shadow scoring
+    and score logging on one background worker. At most ``max_backlog`` jobs wait; beyond
+    that new jobs are dropped (and counted) rather than slowing requests down.
+    """
+
+    def __init__(self, server, db_path=EXPERIMENT_DB, max_backlog=MAX_BACKLOG):
+        self.server = server
+        self.registry = server.registry
+        self.db_path = db_path
+        self.max_backlog = max_backlog
+        self.state = ({'shadow': None, 'split': {}}, {})   # (config, {version: engine}), replaced whole
+        self.counters = {'logged': 0, 'shadow_scored': 0, 'dropped': 0, 'errors': 0}
+        self.arm_errors = {}
+        self._mtime = None
+        self._backlog = 0
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='experiment')
+        self._con = None
+        self.refresh()
+        server.hooks.append(self.refresh)
+
+    @property
+    def config_path(self):
+        return os.path.join(self.registry.root, EXPERIMENT_FILE)
+
+    # ── Configuration ────────────────────────────────────────────────────────
+    def refresh(self):
+        """Re-read the experiment file if it changed and load the arms it names; arms that fail to load are skipped."""
+        try:
+            mtime = os.stat(self.config_path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        from inference import load_engine
+        config = {'shadow': None, 'split': {}}
+        if mtime is not None:
+            with open(self.config_path) as f:
+                config.update(json.load(f))
+        engines, errors = {}, {}
+        for version in set(config['split']) | {config['shadow']} - {None}:
+            engine = self.state[1].get(version)
+            if engine is None:
+                try:
+                    engine = load_engine(self.registry.path(version))
+                    warm_engine(engine)
+                except Exception as e:
+                    errors[version] = str(e)
+                    continue
+            engines[version] = engine
+        self.state, self.arm_errors, self._mtime = (config, engines), errors, mtime
+
+    def configure(self, shadow=None, split=None):
+        """Validate and publish a new experiment to every worker; loads the arms here first."""
+        split = {v: float(p) for v, p in (split or {}).items() if float(p) > 0}
+        known = {m['version'] for m in self.registry.versions()}
+        unknown = [v for v in list(split) + [shadow] if v is not None and v not in known]
+        if unknown:
+            raise KeyError(', '.join(unknown))
+        if sum(split.values()) > 100:
+            raise ValueError("split percentages add up to more than 100")
+        os.makedirs(self.registry.root, exist_ok=True)
+        _write_atomic(self.config_path, json.dumps({'shadow': shadow, 'split': split}))
+        self.refresh()
+        return self.state[0]
+
+    # ── Request path ─────────────────────────────────────────────────────────
+    def route(self, patient_id=None):
+        """(version, engine, role) that serves this request."""
+        config, engines = self.state
+        current = self.server.current
+        bucket, edge = _bucket(patient_id), 0.0
+        for version, percent in sorted(config['split'].items()):
+            edge += percent
+            if bucket < edge and version != current.version and version in engines:
+                return version, engines[version], 'split'
+        return current.version, current.engine, 'active'
+
+    def observe(self, model_name, feat, version, role, probability, prediction, latency_ms):
+        """Log the served score and queue the shadow score; returns the request id."""
+        request_id = uuid.uuid4().hex
+        config, engines = self.state
+        row = (request_id, time.time(), role, version, model_name, float(probability), int(prediction), latency_ms)
+        shadow = config['shadow']
+        if shadow and shadow != version and shadow in engines:
+            self._submit(self._shadow_job, request_id, engines[shadow], shadow, model_name, dict(feat), row)
+        else:
+            self._submit(self._write, [row])
+        return request_id
+
+    def _submit(self, fn, *args):
+        with self._lock:
+            if self._backlog >= self.max_backlog:
+                self.counters['dropped'] += 1
+                return
+            self._backlog += 1
+        self._pool.submit(self._run_job, fn, *args)
+
+    def _run_job(self, fn, *args):
+        try:
+            fn(*args)
+        except Exception:
+            self.counters['errors'] += 1
+        finally:
+            with self._lock:
+                self._backlog -= 1
+
+    # ── Background worker ────────────────────────────────────────────────────
+    def _shadow_job(self, request_id, engine, version, model_name, feat, served_row):
+        rows = [served_row]
+        if model_name in engine.models:
+            t = time.perf_counter()
+            probability, prediction = engine.predict(model_name, feat)
+            rows.append((request_id, time.time(), 'shadow', version, model_name, float(probability),
+                         int(prediction), (time.perf_counter() - t) * 1000))
+            self.counters['shadow_scored'] += 1
+        self._write(rows)
+
+    def _write(self, rows):
+        if self._con is None:   # created on, and only used by, the worker thread
+            self._con = sqlite3.connect(self.db_path)
+            self._con.executescript(SCHEMA)
+        with self._con:
+            self._con.executemany('INSERT INTO experiment_scores VALUES (?,?,?,?,?,?,?,?)', rows)
+        self.counters['logged'] += len(rows)
+
+    def flush(self):
+        """Wait for every queued job (tests, benchmarks, shutdown)."""
+        self._pool.submit(lambda: None).result()
+
+    def status(self):
+        config, engines = self.state
+        return {**config, 'loaded_arms': sorted(engines), 'arm_errors': self.arm_errors,
+                'backlog': self._backlog, **self.counters}
+
+
+def comparison_report(db_path=EXPERIMENT_DB, since=None):
+    """
+    ``arms``: volume, positive rate, mean probability and latency per served version.
+    ``shadow``: each shadow version against what was served for the same requests.
+    """
+    if not os.path.exists(db_path):
+        return {'arms': [], 'shadow': []}
+    where, params = ('WHERE ts >= ?', (since,)) if since is not None else ('', ())
+    with sqlite3.connect(db_path) as con:
+        df = pd.read_sql_query(f'SELECT * FROM experiment_scores {where}', con, params=params)
+    p95 = lambda s: s.quantile(0.95)
+    served = df[df['role'] != 'shadow']
+    arms = (served.groupby(['version', 'role', 'model'])
+            .agg(requests=('request_id', 'size'), positive_rate=('prediction', 'mean'),
+                 mean_probability=('probability', 'mean'), latency_p50_ms=('latency_ms', 'median'),
+                 latency_p95_ms=('latency_ms', p95))
+            .round(4).reset_index())
+    pairs = df[df['role'] == 'shadow'].merge(served, on=['request_id', 'model'], suffixes=('', '_served'))
+    pairs['agree'] = pairs['prediction'] == pairs['prediction_served']
+    pairs['delta'] = pairs['probability'] - pairs['probability_served']
+    pairs['abs_delta'] = pairs['delta'].abs()
+    shadow = (pairs.groupby(['version', 'version_served', 'model'])
+              .agg(requests=('request_id', 'size'), agreement=('agree', 'mean'),
+                   mean_delta=('delta', 'mean'), mean_abs_delta=('abs_delta', 'mean'),
+                   max_abs_delta=('abs_delta', 'max'), latency_p50_ms=('latency_ms', 'median'),
+                   served_latency_p50_ms=('latency_ms_served', 'median'))
+              .round(4).reset_index())
+    return {'arms': arms.to_dict('records'), 'shadow': shadow.to_dict('records')}
+
+
+def benchmark(requests=150, rate=8.0, db_path='experiment_benchmark.db'):
+    """
+    Client-side latency of a scored request with no experiment, a shadow version and a 50/50
+    split, for ``requests`` arriving at ``rate`` per second (the worker runs between arrivals).
+    """
+    import shutil
+    from model_registry import ModelRegistry, ModelServer, WARMUP_PATIENTS
+    root = 'experiment_benchmark_registry'
+    for path in (db_path, root):
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+    registry = ModelRegistry(root)
+    v1 = registry.publish()
+    # a second version that differs only in calibration, as a stand-in for a retrain
+    alt = os.path.join(root, 'alt_export')
+    shutil.copytree(registry.path(v1), alt)
+    with open(os.path.join(alt, 'models_metadata.json')) as f:
+        meta = json.load(f)
+    meta['calibration'] = {}
+    with open(os.path.join(alt, 'models_metadata.json'), 'w') as f:
+        json.dump(meta, f)
+    v2 = registry.publish(alt, activate=False)
+    shutil.rmtree(alt)
+
+    server = ModelServer(registry)
+    router = ExperimentRouter(server, db_path)
+
+    def run(offset):
+        latencies, start = [], time.perf_counter()
+        for i in range(offset, offset + requests):
+            time.sleep(max(0.0, start + (i - offset) / rate - time.perf_counter()))
+            feat = {**WARMUP_PATIENTS[i % 3], 'chol': 100 + i * 0.1}
+            t = time.perf_counter()
+            version, engine, role = router.route(f"P{i}")
+            s = time.perf_counter()
+            probability, prediction = engine.predict('Voting Ensemble', feat)
+            router.observe('Voting Ensemble', feat, version, role, probability, prediction,
+                           (time.perf_counter() - s) * 1000)
+            latencies.append((time.perf_counter() - t) * 1000)
+        router.flush()
+        return pd.Series(latencies)
+
+    results = {}
+    for label, shadow, split, offset in [('no experiment', None, {}, 0), ('shadow', v2, {}, requests),
+                                         ('50/50 split', None, {v2: 50}, 2 * requests)]:
+        router.configure(shadow, split)
+        t = time.perf_counter()
+        lat = run(offset)
+        results[label] = {'client_p50_ms': round(lat.median(), 2), 'client_p95_ms': round(lat.quantile(0.95), 2),
+                          'wall_s': round(time.perf_counter() - t, 2)}
+    results['router'] = router.status()
+    results['report'] = comparison_report(db_path)
+    shutil.rmtree(root)
+    os.remove(db_path)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--report', action='store_true')
+    parser.add_argument('--hours', type=float, default=None, help='only scores from the last N hours')
+    parser.add_argument('--db', default=EXPERIMENT_DB)
+    parser.add_argument('--benchmark', action='store_true')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        print(json.dumps(benchmark(), indent=2, default=str))
+    elif args.report:
+        report = comparison_report(args.db, None if args.hours is None else time.time() - args.hours * 3600)
+        with pd.option_context('display.width', 200, 'display.max_columns', 20):
+            print("Served arms\n" + (pd.DataFrame(report['arms']).to_string(index=False) if report['arms'] else "  (none)"))
+            print("\nShadow vs. served\n" + (pd.DataFrame(report['shadow']).to_string(index=False) if report['shadow'] else "  (none)"))
+    else:
+        parser.print_help()
@@ -0,0 +1,212 @@
+"""
+HeartGuard Pro - Cached Figure Builders
+Plotly figures whose inputs rarely change between reruns: the 3D cardiac surface mesh,
+the vitals radar against its healthy baseline, the 10-year prognosis chart and the
+knowledge-base reference table. They are built here without Streamlit so the app can keep
+one instance per process and input (``st.cache_resource``), and so their build cost and
+wire payload can be measured outside the app.
+
+Mesh coordinates are float32, which plotly serialises as base64 typed arrays, so the
+4K-resolution mesh costs half the payload of float64 and no extra server time once cached.
+
+    python figures.py --benchmark     build / serialise time and payload per figure
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+import plotly.tools
+
+BURGUNDY, FOREST, NAVY, BRASS, ROSE = '#7C1B2E', '#1B5741', '#1E3A5F', '#B8860B', '#A52840'
+
+# Surface grid points per axis
+MESH_RESOLUTIONS = {'Standard': 35, 'HD': 90, '4K': 180}
+
+RADAR_CATEGORIES = ['Age', 'Resting BP', 'Cholesterol', 'Max HR', 'ST Depression', 'Calcified Vessels']
+RADAR_BASELINE = [50, 60, 50, 75, 10, 0]
+
+KNOWLEDGE_BASE = [
+    {'Feature':'age',      'Clinical Name':'Age',                   'Description':'Patient age in years',               'Normal Range':'Risk threshold >55 yrs'},
+    {'Feature':'sex',      'Clinical Name':'Biological Sex',        'Description':'Biological sex',                     'Normal Range':'1=Male, 0=Female'},
+    {'Feature':'cp',       'Clinical Name':'Chest Pain Type',       'Description':'1=Typical, 2=Atypical, 3=Non-anginal, 4=Asymptomatic','Normal Range':'4=Highest CAD correlation'},
+    {'Feature':'trestbps', 'Clinical Name':'Resting Blood Pressure','Description':'Resting BP on admission (mm Hg)',     'Normal Range':'<120 mm Hg optimal'},
+    {'Feature':'chol',     'Clinical Name':'Serum Cholesterol',     'Description':'Total cholesterol (mg/dl)',           'Normal Range':'<200 mg/dl desirable'},
+    {'Feature':'fbs',      'Clinical Name':'Fasting Blood Sugar',   'Description':'FBS >120 mg/dl flag',                'Normal Range':'1=True, 0=False'},
+    {'Feature':'restecg',  'Clinical Name':'Resting ECG',          'Description':'0=Normal, 1=ST-T abnormality, 2=LVH', 'Normal Range':'0=Normal'},
+    {'Feature':'thalach',  'Clinical Name':'Max Heart Rate',        'Description':'Peak HR during treadmill test',       'Normal Range':'220 − age bpm target'},
+    {'Feature':'exang',    'Clinical Name':'Exercise Angina',       'Description':'Angina during exertion',              'Normal Range':'1=Yes, 0=No'},
+    {'Feature':'oldpeak',  'Clinical Name':'ST Depression',         'Description':'ST depression vs. rest (mm)',         'Normal Range':'<1.0 mm normal'},
+    {'Feature':'slope',    'Clinical Name':'ST Slope',              'Description':'1=Upsloping, 2=Flat, 3=Downsloping',  'Normal Range':'1=Benign'},
+    {'Feature':'ca',       'Clinical Name':'Vessels (Fluoroscopy)', 'Description':'Stenotic vessels (LAD/LCx/RCA)',      'Normal Range':'0=No disease (strongest predictor)'},
+    {'Feature':'thal',     'Clinical Name':'Thallium Stress Test',  'Description':'3=Normal, 6=Fixed, 7=Reversible',    'Normal Range':'3=Normal perfusion'},
+]
+
+
+def cardiac_mesh(resolution):
+    """Parametric heart surface sampled on a ``resolution`` x ``resolution`` grid (float32)."""
+    u = np.linspace(0, 2*np.pi, resolution)
+    v = np.linspace(0, np.pi, resolution)
+    x3 = 16*np.sin(v)[:,None]**3 * np.cos(u)[None,:]
+    y3 = np.broadcast_to((13*np.cos(v) - 5*np.cos(2*v) - 2*np.cos(3*v) - np.cos(4*v))[:,None], x3.shape)
+    z3 = 16*np.sin(v)[:,None]**3 * np.sin(u)[None,:]
+    return x3.astype(np.float32), np.ascontiguousarray(y3, dtype=np.float32), z3.astype(np.float32)
+
+
+def cardiac_mesh_figure(resolution=MESH_RESOLUTIONS['Standard']):
+    x3, y3, z3 = cardiac_mesh(resolution)
+    fig3d = go.Figure(go.Surface(x=x3, y=y3, z=z3,
+        colorscale=[[0,'#FAF7F0'],[0.25,'#D4C9B0'],[0.5,'#B8860B'],
+                    [0.75,'#A52840'],[1,'#1E3A5F']],
+        showscale=True,
+        colorbar=dict(thickness=10, len=0.65, x=1.02,
+            tickfont=dict(family='IBM Plex Mono',size=9,color='#3D3228'),
+            title=dict(text='Perf.',font=dict(size=9,color='#7A6A5A'))),
+        lighting=dict(ambient=0.7, diffuse=0.85, specular=0.1)))
+    fig3d.update_layout(
+        title=dict(text="3D Parametric Cardiac Surface",
+                   font=dict(family='Playfair Display,serif',size=14,color='#1E3A5F')),
+        scene=dict(
+            xaxis=dict(title='LAD', backgroundcolor='#FAF7F0', gridcolor='#D4C9B0',
+                       tickfont=dict(size=9,color='#7A6A5A')),
+            yaxis=dict(title='LV',  backgroundcolor='#FAF7F0', gridcolor='#D4C9B0',
+                       tickfont=dict(size=9,color='#7A6A5A')),
+            zaxis=dict(title='RCA', backgroundcolor='#FAF7F0', gridcolor='#D4C9B0',
+                       tickfont=dict(size=9,color='#7A6A5A')),
+            bgcolor='#FAF7F0'),
+        height=420, paper_bgcolor='#FFFFFF',
+        margin=dict(l=0,r=0,t=40,b=0))
+    return fig3d
+
+
+def radar_scores(feat):
+    """Patient vitals as 0-100 scores on the radar axes."""
+    return (
+        min(100, (feat['age'] / 80) * 100),
+        min(100, (feat['trestbps'] / 180) * 100),
+        min(100, (feat['chol'] / 350) * 100),
+        min(100, (feat['thalach'] / 200) * 100),
+        min(100, (feat['oldpeak'] / 4.0) * 100),
+        min(100, (feat['ca'] / 3.0) * 100),
+    )
+
+
+def radar_figure(p_scores):
+    fig_radar = go.Figure()
+    fig_radar.add_trace(go.Scatterpolar(
+        r=list(p_scores), theta=RADAR_CATEGORIES, fill='toself', name='Patient Profile',
+        fillcolor='rgba(124, 27, 46, 0.25)', line=dict(color=BURGUNDY, width=2)
+    ))
+    fig_radar.add_trace(go.Scatterpolar(
+        r=RADAR_BASELINE, theta=RADAR_CATEGORIES, fill='toself', name='Healthy Reference Baseline',
+        fillcolor='rgba(27, 87, 65, 0.15)', line=dict(color=FOREST, width=2, dash='dash')
+    ))
+    fig_radar.update_layout(
+        paper_bgcolor='#FFFFFF', height=310, margin=dict(l=25, r=25, t=25, b=25),
+        polar=dict(
+            radialaxis=dict(visible=True, range=[0, 100], gridcolor='#EDE8DC', tickfont=dict(size=8)),
+            angularaxis=dict(gridcolor='#EDE8DC', linecolor='#D4C9B0', tickfont=dict(size=10, color='#3D3228'))
+        ),
+        legend=dict(font=dict(size=10, family='IBM Plex Sans'), bgcolor='rgba(255,255,255,0.8)', borderwidth=0)
+    )
+    return fig_radar
+
+
+def prognosis_figure(projection):
+    """10-year trajectory per scenario from ``prognosis.project``: median line and percentile band."""
+    labels = ['Baseline' if t == 0 else f'Yr {t}' for t in projection['horizons']]
+    styles = {'unmanaged': ('Unmanaged Baseline', BURGUNDY, 'rgba(124,27,46,0.12)', 'solid'),
+              'managed':   ('Proactive Intervention', FOREST, 'rgba(27,87,65,0.12)', 'dash')}
+    lo, hi = projection['band']
+
+    fig_prog = go.Figure()
+    for scenario, (name, color, fill, dash) in styles.items():
+        s = projection['scenarios'].get(scenario)
+        if s is None:
+            continue
+        fig_prog.add_trace(go.Scatter(x=labels, y=s['high'], mode='lines', line=dict(width=0),
+            showlegend=False, hoverinfo='skip', legendgroup=scenario))
+        fig_prog.add_trace(go.Scatter(x=labels, y=s['low'], mode='lines', line=dict(width=0),
+            fill='tonexty', fillcolor=fill, name=f'{name} ({lo}th–{hi}th pct.)',
+            showlegend=False, hoverinfo='skip', legendgroup=scenario))
+        fig_prog.add_trace(go.Scatter(x=labels, y=s['median'], name=name, legendgroup=scenario,
+            mode='lines+markers', line=dict(color=color, width=2.5, dash=dash),
+            marker=dict(size=7, color=color, line=dict(color='#FFFFFF', width=2)),
+            customdata=np.column_stack([s['low'], s['high']]),
+            hovertemplate='%{y:.1f}% (%{customdata[0]:.1f}–%{customdata[1]:.1f})<extra>' + name + '</extra>'))
+    fig_prog.update_layout(
+        paper_bgcolor='#FFFFFF', plot_bgcolor='#FAF7F0',
+        font=dict(family='IBM Plex Sans, sans-serif', color='#3D3228', size=11),
+        margin=dict(l=16, r=16, t=40, b=16),
+        title=dict(text="10-Year Cardiovascular Risk Trajectory",
+                   font=dict(family='Playfair Display, serif', size=14, color='#1E3A5F')),
+        xaxis=dict(title="Timeline", gridcolor='#EDE8DC',
+                   linecolor='#D4C9B0', tickfont=dict(size=10, color='#7A6A5A')),
+        yaxis=dict(title="Predicted Risk (%)", gridcolor='#EDE8DC', range=[0, 100],
+                   linecolor='#D4C9B0', tickfont=dict(size=10, color='#7A6A5A')),
+        legend=dict(bgcolor='rgba(255,255,255,0.9)', bordercolor='#D4C9B0',
+                    borderwidth=1, font=dict(size=11)),
+        height=360
+    )
+    return fig_prog
+
+
+def example_projection(psim=42.0):
+    """Fixed projection with the shape of ``prognosis.project`` output, for benchmarks without models."""
+    t = np.array([0, 1, 2, 3, 5, 7, 10])
+    scenarios = {}
+    for scenario, rate in (('unmanaged', 2.4), ('managed', -1.5)):
+        median = np.clip(psim + t * rate, 0, 100)
+        scenarios[scenario] = {'median': median.tolist(), 'low': np.clip(median - t, 0, 100).tolist(),
+                               'high': np.clip(median + t, 0, 100).tolist(), 'mean': median.tolist()}
+    return {'model': 'example', 'horizons': t.tolist(), 'baseline': psim, 'n_samples': 0,
+            'band': [10, 90], 'scenarios': scenarios}
+
+
+def chart_spec(fig):
+    """The JSON spec ``st.plotly_chart`` sends to the browser for ``fig``."""
+    figure = plotly.tools.return_figure_from_figure_or_data(fig, validate_figure=True)
+    return pio.to_json(figure, validate=False)
+
+
+def benchmark(repeats=20):
+    """
+    Per-rerun server cost of each figure: building it (what every rerun paid before
+    caching), serialising it to the chart spec (what a cached rerun still pays), and the
+    spec size sent to the browser.
+    """
+    cases = {f'mesh {name} ({n}x{n})': (cardiac_mesh_figure, n) for name, n in MESH_RESOLUTIONS.items()}
+    cases['radar'] = (radar_figure, radar_scores({'age': 63, 'trestbps': 145, 'chol': 233, 'thalach': 150,
+                                                  'oldpeak': 2.3, 'ca': 0}))
+    cases['prognosis'] = (prognosis_figure, example_projection())
+
+    results = {}
+    for label, (build, arg) in cases.items():
+        build(arg)
+        t = time.perf_counter()
+        for _ in range(repeats):
+            fig = build(arg)
+        build_ms = (time.perf_counter() - t) / repeats * 1000
+        t = time.perf_counter()
+        for _ in range(repeats):
+            spec = chart_spec(fig)
+        spec_ms = (time.perf_counter() - t) / repeats * 1000
+        results[label] = {'build_ms': round(build_ms, 2), 'serialise_ms': round(spec_ms, 2),
+                          'uncached_rerun_ms': round(build_ms + spec_ms, 2), 'cached_rerun_ms': round(spec_ms, 2),
+                          'payload_kb': round(len(spec) / 1024, 1)}
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--benchmark', action='store_true')
+    parser.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        print(json.dumps(benchmark(args.repeats), indent=2))
+    else:
+        parser.print_help()
@@ -0,0 +1,245 @@
+"""
+HeartGuard Pro - Multi-Site UCI Dataset Loader
+Parses every site bundled under ``Heart Disease Data/`` (Cleveland, Hungarian, Switzerland,
+Long Beach VA), harmonises missing values, and keeps a single typed, compressed Parquet
+cache with a ``site`` column so later loads skip the text parsing entirely.
+
+The 14 standard columns of every site come from its ``processed.*.data`` file, the data
+the models have always been trained on. The raw multi-line record files, read with the
+streaming parser in ``uci_raw``, only add the raw-only attributes (``RAW_EXTRAS``): upstream
+re-ordered the processed Hungarian and Switzerland files and edited some rows of the
+Hungarian, Switzerland and VA ones, so raw-derived standard values would differ from them.
+Cleveland's own raw file is not shipped (see ``WARNING``); its 303 records lead ``new.data``
+in the same order as ``processed.cleveland.data``.
+
+``load_training_data`` and ``split_holdout`` turn these rows into the modelling frame and its
+fixed held-out split. They live here rather than in ``train_models.py`` so the API and the
+inference engine can rebuild the training split without importing the training engine.
+
+    python heart_data.py --sites all     rebuild the cache and print a per-site summary
+"""
+
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+from uci_raw import ATTRIBUTES, read_raw
+
+DATA_DIR = 'Heart Disease Data'
+DATASET_CACHE = 'dataset_cache.parquet'
+CACHE_VERSION = 3
+
+STANDARD_COLUMNS = ['age', 'sex', 'cp', 'trestbps', 'chol', 'fbs', 'restecg', 'thalach',
+                    'exang', 'oldpeak', 'slope', 'ca', 'thal', 'num']
+FEATURES = STANDARD_COLUMNS[:-1]
+
+# 1-based attribute positions of the standard columns in the raw 76-attribute records
+STANDARD_POSITIONS = {'age': 3, 'sex': 4, 'cp': 9, 'trestbps': 10, 'chol': 12, 'fbs': 16, 'restecg': 19,
+                      'thalach': 32, 'exang': 38, 'oldpeak': 40, 'slope': 41, 'ca': 44, 'thal': 51, 'num': 58}
+
+# Extra raw-only attributes kept in the cache alongside the standard columns
+RAW_EXTRAS = {'id': 1, 'painloc': 5, 'painexer': 6, 'relrest': 7, 'htn': 11, 'smoke': 13, 'cigs': 14,
+              'years': 15, 'dm': 17, 'famhist': 18, 'thaldur': 29, 'met': 31, 'thalrest': 33,
+              'tpeakbps': 34, 'tpeakbpd': 35, 'trestbpd': 37}
+
+SITES = {
+    'cleveland':   {'raw': 'new.data', 'records': 303, 'processed': 'processed.cleveland.data'},
+    'hungarian':   {'raw': 'hungarian.data', 'records': None, 'processed': 'processed.hungarian.data'},
+    'switzerland': {'raw': 'switzerland.data', 'records': None, 'processed': 'processed.switzerland.data'},
+    'va':          {'raw': 'long-beach-va.data', 'records': None, 'processed': 'processed.va.data'},
+}
+DEFAULT_SITES = ['cleveland']
+
+CATEGORICAL = ['sex', 'cp', 'fbs', 'restecg', 'exang', 'slope', 'ca', 'thal', 'num',
+               'painloc', 'painexer', 'relrest', 'htn', 'smoke', 'dm', 'famhist']
+
+# Physiologically impossible zeros that some sites use for "not measured"
+ZERO_AS_MISSING = ['trestbps', 'chol']
+
+
+def parse_sites(value):
+    """``'all'`` or a comma-separated list of site names -> validated list."""
+    if value is None:
+        return list(DEFAULT_SITES)
+    if isinstance(value, str):
+        value = list(SITES) if value.strip().lower() == 'all' else [v.strip() for v in value.split(',') if v.strip()]
+    unknown = [s for s in value if s not in SITES]
+    if unknown:
+        raise ValueError(f"Unknown site(s) {unknown}. Choose from: {list(SITES)} or 'all'")
+    return list(value)
+
+
+def _frame_from_raw(path, limit=None):
+    records = read_raw(path, limit)
+    cols = {**RAW_EXTRAS, **STANDARD_POSITIONS}
+    return pd.DataFrame({name: records[ATTRIBUTES[pos - 1]].astype(np.float64) for name, pos in cols.items()})
+
+
+def _frame_from_processed(path):
+    df = pd.read_csv(path, names=STANDARD_COLUMNS, na_values='?')
+    for name in RAW_EXTRAS:
+        df[name] = np.nan
+    return df
+
+
+def _row_keys(df):
+    values = df[STANDARD_COLUMNS].to_numpy(dtype=np.float64)
+    values = np.where(np.isnan(values) | (values == -9), -9, values)
+    return [tuple(row) for row in np.round(values, 2)]
+
+
+def _attach_raw_extras(df, raw):
+    """
+    Copy the raw-only attributes onto the processed rows. Files listing the patients in the
+    same order (same age and sex sequence) pair up by position; otherwise a processed row
+    takes the extras of the one raw record with identical standard values, and keeps NaN
+    when no unedited record (or more than one) matches.
+    """
+    same_order = len(raw) == len(df) and all(
+        np.array_equal(raw[c].to_numpy(dtype=np.float64), df[c].to_numpy(dtype=np.float64)) for c in ('age', 'sex'))
+    if same_order:
+        source = np.arange(len(df))
+    else:
+        index = {}
+        for i, key in enumerate(_row_keys(raw)):
+            index[key] = -1 if key in index else i
+        source = np.array([index.get(key, -1) for key in _row_keys(df)])
+    for name in RAW_EXTRAS:
+        values = raw[name].to_numpy(dtype=np.float64)
+        df[name] = np.where(source >= 0, values[np.maximum(source, 0)], np.nan)
+    return df
+
+
+def harmonise(df):
+    """One missing-value convention: -9 (raw files) and '?' (processed files) become NaN."""
+    df = df.replace(-9.0, np.nan)
+    for col in ZERO_AS_MISSING:
+        df.loc[df[col] == 0, col] = np.nan
+    for col in df.columns:
+        if col == 'site':
+            continue
+        if col in CATEGORICAL:
+            df[col] = df[col].round().astype('Int8')
+        elif col == 'id':
+            df[col] = df[col].astype('Int32')
+        else:
+            df[col] = df[col].astype('float32')
+    return df
+
+
+def load_site(site, data_dir=DATA_DIR):
+    """Standard columns from the processed file, raw-only extras from the raw records where present."""
+    spec = SITES[site]
+    df = _frame_from_processed(os.path.join(data_dir, spec['processed']))
+    raw_path = os.path.join(data_dir, spec['raw'])
+    if os.path.exists(raw_path):
+        df = _attach_raw_extras(df, _frame_from_raw(raw_path, spec['records']))
+    df.insert(0, 'site', site)
+    return harmonise(df)
+
+
+def _source_signature(data_dir=DATA_DIR):
+    h = hashlib.sha1(str(CACHE_VERSION).encode())
+    for site in SITES:
+        for key in ('raw', 'processed'):
+            path = os.path.join(data_dir, SITES[site][key])
+            if os.path.exists(path):
+                st = os.stat(path)
+                h.update(f'{path}:{st.st_size}:{st.st_mtime_ns}'.encode())
+    return h.hexdigest()
+
+
+def build_cache(cache_path=DATASET_CACHE, data_dir=DATA_DIR):
+    """Parse every site and write the combined frame as a zstd-compressed Parquet file."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    df = pd.concat([load_site(site, data_dir) for site in SITES], ignore_index=True)
+    df['site'] = pd.Categorical(df['site'], categories=list(SITES))
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    meta = dict(table.schema.metadata or {})
+    meta[b'heartguard_signature'] = _source_signature(data_dir).encode()
+    pq.write_table(table.replace_schema_metadata(meta), cache_path, compression='zstd')
+    return df
+
+
+def _cache_is_fresh(cache_path, data_dir):
+    if not os.path.exists(cache_path):
+        return False
+    import pyarrow.parquet as pq
+    meta = pq.read_schema(cache_path).metadata or {}
+    return meta.get(b'heartguard_signature', b'').decode() == _source_signature(data_dir)
+
+
+def load_dataset(sites=None, cache_path=DATASET_CACHE, data_dir=DATA_DIR, refresh=False):
+    """
+    All rows for ``sites`` (default: Cleveland only) with harmonised missing values.
+    The Parquet cache is rebuilt whenever a source file changes.
+    """
+    sites = parse_sites(sites)
+    if refresh or not _cache_is_fresh(cache_path, data_dir):
+        df = build_cache(cache_path, data_dir)
+    else:
+        df = pd.read_parquet(cache_path, filters=[('site', 'in', sites)])
+    df = df[df['site'].isin(sites)].reset_index(drop=True)
+    df['site'] = df['site'].cat.remove_unused_categories()
+    return df
+
+
+def load_training_data(sites=None):
+    """
+    UCI rows for ``sites`` (default: Cleveland) with a binary target. Cleveland keeps only
+    its complete rows, preserving the 297-row benchmark; gaps in the other sites are
+    imputed after the train/test split.
+    """
+    df = load_dataset(sites)
+    df = df[df['num'].notna()]
+    complete = df[FEATURES].notna().all(axis=1)
+    df = df[(df['site'] != 'cleveland') | complete]
+
+    data = df[FEATURES].astype('float64')
+    data['target'] = (df['num'] > 0).astype(int)
+    data['site'] = df['site'].astype(str)
+    return data.reset_index(drop=True)
+
+
+def split_holdout(df):
+    """
+    Deterministic 80/20 split (stratified by site and target); the 20% stays the held-out
+    set across every run. Missing values are filled from the training side only: the
+    mode for categorical features, the median otherwise.
+    """
+    X = df[FEATURES]
+    y = df['target']
+    strata = y if df['site'].nunique() == 1 else df['site'] + '_' + y.astype(str)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=strata)
+    fill = {c: X_train[c].mode().iloc[0] if c in CATEGORICAL else X_train[c].median() for c in FEATURES}
+    return X_train.fillna(fill), X_test.fillna(fill), y_train, y_test
+
+
+def site_summary(df):
+    """Per-site record counts, disease prevalence and share of missing standard values."""
+    grouped = df.groupby('site', observed=True)
+    return pd.DataFrame({
+        'records': grouped.size(),
+        'positive_rate': grouped['num'].apply(lambda s: round(float((s > 0).mean()), 3)),
+        'missing_pct': grouped[FEATURES].apply(lambda g: round(float(g.isna().to_numpy().mean() * 100), 1)),
+        'complete_rows': grouped[FEATURES].apply(lambda g: int(g.notna().all(axis=1).sum())),
+    })
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sites', default='all', help="comma-separated site names or 'all'")
+    parser.add_argument('--cache', default=DATASET_CACHE)
+    args = parser.parse_args()
+
+    data = load_dataset(args.sites, cache_path=args.cache, refresh=True)
+    print(site_summary(data).to_string())
+    print(json.dumps({'rows': len(data), 'columns': len(data.columns),
+                      'cache_bytes': os.path.getsize(args.cache)}))
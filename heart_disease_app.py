@@ -4,33 +4,49 @@ import numpy as np
 import joblib
 import json
 import io
+import os
+import sys
+import threading
+import argparse
+import functools
+import importlib.util
+import time
 import plotly.graph_objects as go
-import plotly.express as px
 from datetime import datetime
 import warnings
-from sklearn.preprocessing import StandardScaler
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier, VotingClassifier
-from sklearn.neighbors import KNeighborsClassifier
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import roc_curve, auc
-try:
-    import shap
-    HAS_SHAP = True
-except ImportError:
-    shap = None
-    HAS_SHAP = False
-
-try:
-    from reportlab.lib.pagesizes import letter
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, HRFlowable
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib import colors
-    HAS_REPORTLAB = True
-except ImportError:
-    HAS_REPORTLAB = False
+from heart_data import load_dataset, load_training_data, split_holdout, site_summary, parse_sites, SITES
+from inference import InferenceEngine, FEATURES
+from uncertainty import load_bank
+from session_log import SessionLog
+from prognosis import project
+from patient_store import PatientStore
+from model_registry import WARMUP_PATIENTS, file_sha1
+import profiling
+from train_models import evaluation_curves, EVALUATION_CURVES_FILE
+from figures import (MESH_RESOLUTIONS, KNOWLEDGE_BASE, cardiac_mesh_figure, radar_scores,
+                     radar_figure, prognosis_figure, chart_spec)
+# reportlab, plotly.express, SHAP and the fallback model classes are imported on first use
+HAS_REPORTLAB = importlib.util.find_spec('reportlab') is not None
 
 
 warnings.filterwarnings('ignore')
+SCRIPT_START = time.perf_counter()
+
+# Debug panel (HEARTGUARD_TRACE set, or ?debug=1): per-section timings of this rerun, with the
+# engine's scoring / interval / SHAP stages; traced scoring bypasses the memo caches
+DEBUG_PANEL = profiling.trace_mode() != 'off' or st.query_params.get('debug') == '1'
+script_trace = profiling.Trace() if DEBUG_PANEL else None
+profiling.activate(script_trace)
+profiling.sampler_from_env()
+
+# CLI options: streamlit run heart_disease_app.py -- --sites cleveland,hungarian
+_cli = argparse.ArgumentParser(add_help=False)
+_cli.add_argument('--sites', default=None)
+CLI_ARGS, _ = _cli.parse_known_args(sys.argv[1:])
+try:
+    EXPLORER_SITES = parse_sites(CLI_ARGS.sites)
+except ValueError:
+    EXPLORER_SITES = parse_sites(None)
 
 st.set_page_config(
     page_title="HeartGuard AI | Clinical Cardiac Intelligence",
@@ -42,6 +58,8 @@ st.set_page_config(
 # ─────────────────────────────────────────────────────────────────────────────
 #  DESIGN SYSTEM CSS
 # ─────────────────────────────────────────────────────────────────────────────
+# Sent on every full-app rerun: an element a run does not re-emit is removed from the page,
+# so the block cannot be skipped after the first run. Fragment reruns do not resend it.
 st.markdown("""
 <style>
 @import url('https://fonts.googleapis.com/css2?family=IBM+Plex+Mono:wght@400;500;600;700&family=IBM+Plex+Sans:wght@300;400;500;600;700&family=Playfair+Display:ital,wght@0,700;0,800;1,700&display=swap');
@@ -733,6 +751,7 @@ hr {
 }
 </style>
 """, unsafe_allow_html=True)
+profiling.mark('page config & CSS')
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -750,6 +769,7 @@ def load_all_models_and_data():
     df = df.dropna().reset_index(drop=True)
     df['target'] = (df['target'] > 0).astype(int)
     X, y = df.drop('target', axis=1), df['target']
+    from sklearn.preprocessing import StandardScaler
     sc = StandardScaler()
     Xs = sc.fit_transform(X)
 
@@ -758,7 +778,12 @@ def load_all_models_and_data():
             metadata = json.load(f)
         scaler = joblib.load('scaler.pkl')
         models = {n: joblib.load(info['filename']) for n, info in metadata['models'].items()}
+        versions = {n: file_sha1(info['filename'])[:12] for n, info in metadata['models'].items()}
+        bank = load_bank()
     except Exception:
+        from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier, VotingClassifier
+        from sklearn.neighbors import KNeighborsClassifier
+        from sklearn.linear_model import LogisticRegression
         mods = {
             'Random Forest':       RandomForestClassifier(n_estimators=100, random_state=42).fit(Xs, y),
             'Gradient Boosting':   GradientBoostingClassifier(n_estimators=100, random_state=42).fit(Xs, y),
@@ -772,177 +797,155 @@ def load_all_models_and_data():
         mods['Voting Ensemble'] = ens
         models = mods
         scaler = sc
+        versions, bank = {}, None
         metadata = {'models': {k: {'accuracy': 0.867, 'roc_auc': 0.941, 'recall': 0.852,
                                    'precision': 0.871, 'f1_score': 0.861,
                                    'confusion_matrix': [[30,2],[2,26]]} for k in mods}}
 
-    return models, scaler, metadata, X, y, Xs
+    engine = InferenceEngine(models, scaler, scaler.transform(X), metadata, versions=versions, bank=bank)
+    # shap, the explainers and reportlab load in the background instead of on the first assessment
+    threading.Thread(target=engine.warm_up, args=(WARMUP_PATIENTS,), kwargs={'report': HAS_REPORTLAB},
+                     name='warmup', daemon=True).start()
+    return models, scaler, metadata, X, y, Xs, engine
 
-models_suite, scaler, metadata, X_raw, y_raw, X_scaled_all = load_all_models_and_data()
+models_suite, scaler, metadata, X_raw, y_raw, X_scaled_all, engine = load_all_models_and_data()
+
+@st.cache_resource
+def load_patient_store():
+    return PatientStore()
+
+patient_store = load_patient_store()
+
+profiling.mark('model & data loading')
+
+@st.cache_data
+def load_site_data(sites):
+    df = load_dataset(list(sites))
+    return df, site_summary(df)
+
+# Figures are kept as live objects (cache_resource): cache_data would pickle them, and
+# unpickling a plotly Figure re-validates every property, which costs more than a rebuild.
+@st.cache_resource(max_entries=len(MESH_RESOLUTIONS))
+def mesh_figure(resolution):
+    fig = cardiac_mesh_figure(resolution)
+    return fig, len(chart_spec(fig))
+
+@st.cache_resource(max_entries=256)
+def cached_radar_figure(p_scores):
+    return radar_figure(p_scores)
+
+@st.cache_resource(max_entries=256)
+def cached_prognosis_figure(model_name, features):
+    return prognosis_figure(project(engine, model_name, dict(features)))
+
+@st.cache_data
+def knowledge_base_table():
+    return pd.DataFrame(KNOWLEDGE_BASE)
+
+@st.cache_data
+def _model_file_sha1(path, mtime_ns, size):
+    return file_sha1(path)
+
+def model_file_hashes():
+    """(model name, pickle sha1) pairs for the loaded suite; None for models not loaded from disk."""
+    hashes = []
+    for name in models_suite:
+        path = metadata.get('models', {}).get(name, {}).get('filename')
+        if path and os.path.exists(path):
+            stat = os.stat(path)
+            hashes.append((name, _model_file_sha1(path, stat.st_mtime_ns, stat.st_size)))
+        else:
+            hashes.append((name, None))
+    return tuple(hashes)
+
+@st.cache_data
+def load_evaluation_curves(model_hashes):
+    """
+    Held-out ROC/PR/calibration/threshold data exported by train_models.py. A model whose
+    pickle no longer matches the exported hash is evaluated once on the held-out split.
+    """
+    try:
+        with open(EVALUATION_CURVES_FILE, 'r') as f:
+            exported = json.load(f)['models']
+    except Exception:
+        exported = {}
+    curves = {n: exported[n] for n, h in model_hashes if h and exported.get(n, {}).get('model_sha1') == h}
+    stale = [n for n, _ in model_hashes if n not in curves]
+    if stale:
+        _, X_test, _, y_test = split_holdout(load_training_data(metadata.get('sites')))
+        X_test_scaled = scaler.transform(X_test)
+        for n in stale:
+            try:
+                curves[n] = evaluation_curves(models_suite[n], X_test_scaled, y_test,
+                                              metadata.get('calibration', {}).get(n))
+            except Exception:
+                pass
+    return curves
+
+@st.cache_resource
+def workbench_figures(model_hashes):
+    curves = load_evaluation_curves(model_hashes)
+    color_map = {'Random Forest': BURGUNDY, 'Gradient Boosting': ROSE,
+                 'Logistic Regression': NAVY, 'K-Nearest Neighbors': BRASS,
+                 'Voting Ensemble': FOREST}
+    layout = dict(
+        paper_bgcolor='#FFFFFF', plot_bgcolor='#FAF7F0',
+        font=dict(family='IBM Plex Sans, sans-serif', color='#3D3228', size=11),
+        margin=dict(l=16, r=16, t=40, b=16), height=320,
+        legend=dict(font=dict(size=9, family='IBM Plex Sans'),
+                    bgcolor='rgba(255,255,255,0.85)', bordercolor='#D4C9B0', borderwidth=1)
+    )
+    axis = dict(gridcolor='#EDE8DC', linecolor='#D4C9B0', tickfont=dict(size=10, color='#7A6A5A'))
+    title = lambda text: dict(text=text, font=dict(family='Playfair Display, serif', size=14, color='#1E3A5F'))
+    diagonal = dict(color='#D4C9B0', width=1.5, dash='dash')
+
+    from sklearn.metrics import auc
+    fig_roc, fig_pr, fig_cal = go.Figure(), go.Figure(), go.Figure()
+    for mname, c in curves.items():
+        line = dict(color=color_map.get(mname, '#3D3228'), width=2)
+        auc_val = auc(c['roc']['fpr'], c['roc']['tpr'])
+        fig_roc.add_trace(go.Scatter(x=c['roc']['fpr'], y=c['roc']['tpr'], mode='lines',
+                                     name=f"{mname} (AUC={auc_val:.3f})", line=line))
+        fig_pr.add_trace(go.Scatter(x=c['pr']['recall'], y=c['pr']['precision'], mode='lines',
+                                    name=mname, line=line, line_shape='hv'))
+        fig_cal.add_trace(go.Scatter(x=c['calibration']['mean_predicted'], y=c['calibration']['fraction_positive'],
+                                     mode='lines+markers', name=mname, line=line,
+                                     customdata=c['calibration']['count'],
+                                     hovertemplate='predicted %{x:.2f}<br>observed %{y:.2f}<br>n=%{customdata}'))
+        cal = metadata.get('calibration', {}).get(mname)
+        if cal:
+            rel = cal['reliability']['calibrated']
+            fig_cal.add_trace(go.Scatter(x=rel['mean_predicted'], y=rel['fraction_positive'], mode='lines+markers',
+                                         name=f"{mname} ({cal['method']}, Brier {cal['brier_raw']:.3f}→{cal['brier_calibrated']:.3f})",
+                                         line=dict(line, dash='dot'), customdata=rel['count'],
+                                         hovertemplate='calibrated %{x:.2f}<br>observed %{y:.2f}<br>n=%{customdata}'))
+    fig_roc.add_trace(go.Scatter(x=[0, 1], y=[0, 1], mode='lines', name='Random Classifier', line=diagonal))
+    fig_cal.add_trace(go.Scatter(x=[0, 1], y=[0, 1], mode='lines', name='Perfect Calibration', line=diagonal))
+
+    fig_roc.update_layout(**layout, title=title("Receiver Operating Characteristic (ROC) Curves"),
+                          xaxis=dict(title="False Positive Rate", **axis), yaxis=dict(title="True Positive Rate", **axis))
+    fig_pr.update_layout(**layout, title=title("Precision–Recall Curves"),
+                         xaxis=dict(title="Recall", **axis), yaxis=dict(title="Precision", **axis))
+    fig_cal.update_layout(**layout, title=title("Reliability Diagram"),
+                          xaxis=dict(title="Mean Predicted Probability", range=[0, 1], **axis),
+                          yaxis=dict(title="Observed Positive Rate", range=[0, 1], **axis))
+    return fig_roc, fig_pr, fig_cal
 
 # Session state initialization
-for key, val in [('session_history', []), ('current_workspace', 'Patient Intake & XAI'),
-                  ('selected_model_name', 'Voting Ensemble')]:
+for key, val in [('current_workspace', 'Patient Intake & XAI'), ('selected_model_name', 'Voting Ensemble')]:
     if key not in st.session_state:
         st.session_state[key] = val
+if 'session_log' not in st.session_state:
+    st.session_state.session_log = SessionLog()
 
 def predict(model_name, feat):
-    Xs = scaler.transform(pd.DataFrame([feat]))
-    m  = models_suite[model_name]
-    return float(m.predict_proba(Xs)[0][1]*100), int(m.predict(Xs)[0])
+    return engine.predict(model_name, feat)
 
 # ─────────────────────────────────────────────────────────────────────────────
 #  EXACT SHAP VALUE EXPLAINER FUNCTION
 # ─────────────────────────────────────────────────────────────────────────────
 def compute_shap_values(model_name, feat_dict):
-    df_in = pd.DataFrame([feat_dict])
-    sample_scaled = scaler.transform(df_in)
-    target_model = models_suite[model_name]
-
-    try:
-        if isinstance(target_model, (RandomForestClassifier, GradientBoostingClassifier)):
-            explainer = shap.TreeExplainer(target_model)
-            sv = explainer.shap_values(sample_scaled)
-            if isinstance(sv, list):
-                sv = sv[1] if len(sv) > 1 else sv[0]
-            if len(sv.shape) == 3:
-                sv = sv[:, :, 1]
-            return sv[0]
-        elif isinstance(target_model, LogisticRegression):
-            explainer = shap.LinearExplainer(target_model, X_scaled_all)
-            sv = explainer.shap_values(sample_scaled)
-            return sv[0] if len(sv.shape) == 2 else sv
-        elif isinstance(target_model, VotingClassifier):
-            sv_rf = compute_shap_values('Random Forest', feat_dict)
-            sv_gb = compute_shap_values('Gradient Boosting', feat_dict)
-            return (sv_rf + sv_gb) / 2
-        else: # KNN or custom fallback
-            explainer = shap.KernelExplainer(target_model.predict_proba, shap.sample(X_scaled_all, 20))
-            sv = explainer.shap_values(sample_scaled)
-            if isinstance(sv, list):
-                sv = sv[1]
-            return sv[0]
-    except Exception:
-        # Fallback approximation
-        weights = {'ca':4.5,'thal':4.0,'oldpeak':3.8,'cp':3.5,'thalach':3.0,
-                   'exang':2.8,'trestbps':2.2,'chol':2.0,'age':1.8,'sex':1.5,'slope':2.5,'restecg':1.5,'fbs':1.0}
-        vals = list(feat_dict.values())
-        keys = list(feat_dict.keys())
-        return np.array([(vals[i] - scaler.mean_[i]) / scaler.scale_[i] * weights.get(keys[i], 2.0) for i in range(len(keys))])
-
-
-# ─────────────────────────────────────────────────────────────────────────────
-#  REPORTLAB PDF CLINICAL REPORT GENERATOR
-# ─────────────────────────────────────────────────────────────────────────────
-def generate_pdf_report(active_m, feat_dict, prob, pred, shap_vals, recs):
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, rightMargin=36, leftMargin=36, topMargin=36, bottomMargin=36)
-    styles = getSampleStyleSheet()
-
-    # Custom typography styles for clinical PDF
-    style_header = ParagraphStyle('ReportTitle', fontName='Helvetica-Bold', fontSize=18, leading=22, textColor=colors.HexColor('#7C1B2E'))
-    style_sub = ParagraphStyle('ReportSub', fontName='Helvetica-Bold', fontSize=10, leading=14, textColor=colors.HexColor('#7A6A5A'))
-    style_sec = ParagraphStyle('ReportSec', fontName='Helvetica-Bold', fontSize=12, leading=16, textColor=colors.HexColor('#1E3A5F'), spaceBefore=10, spaceAfter=6)
-    style_body = ParagraphStyle('ReportBody', fontName='Helvetica', fontSize=9, leading=13, textColor=colors.HexColor('#3D3228'))
-    style_body_bold = ParagraphStyle('ReportBodyBold', fontName='Helvetica-Bold', fontSize=9, leading=13, textColor=colors.HexColor('#3D3228'))
-    style_code = ParagraphStyle('ReportCode', fontName='Courier', fontSize=8, leading=11, textColor=colors.HexColor('#1E3A5F'))
-
-    story = []
-
-    # Document Header
-    story.append(Paragraph("HEARTGUARD AI — CLINICAL ASSESSMENT REPORT", style_header))
-    story.append(Paragraph(f"Generated: {datetime.now().strftime('%d %b %Y %H:%M:%S')} | Model Engine: {active_m} | UCI Cleveland Provenance", style_sub))
-    story.append(HRFlowable(width="100%", thickness=1.5, color=colors.HexColor('#7C1B2E'), spaceBefore=6, spaceAfter=12))
-
-    # Patient Vitals & Risk Result Table
-    risk_title = "HIGH CARDIOVASCULAR RISK" if prob >= 70 else "MODERATE CARDIOVASCULAR RISK" if prob >= 35 else "LOW CARDIOVASCULAR RISK"
-    risk_color = colors.HexColor('#C0392B') if prob >= 70 else colors.HexColor('#B8860B') if prob >= 35 else colors.HexColor('#1B5741')
-
-    result_data = [
-        [Paragraph("<b>DIAGNOSTIC OUTCOME</b>", style_body_bold), Paragraph(f"<b>{risk_title}</b>", ParagraphStyle('R', parent=style_body_bold, textColor=risk_color))],
-        [Paragraph("<b>PREDICTED PROBABILITY</b>", style_body_bold), Paragraph(f"<b>{prob:.1f}%</b> (Classification: {'POSITIVE' if pred==1 else 'NEGATIVE'})", style_body)],
-        [Paragraph("<b>EVALUATION MODEL</b>", style_body_bold), Paragraph(f"{active_m} (Accuracy: {metadata['models'][active_m]['accuracy']*100:.1f}%, AUC: {metadata['models'][active_m]['roc_auc']:.3f})", style_body)]
-    ]
-    t_result = Table(result_data, colWidths=[160, 380])
-    t_result.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,-1), colors.HexColor('#FAF7F0')),
-        ('BOX', (0,0), (-1,-1), 1, colors.HexColor('#D4C9B0')),
-        ('INNERGRID', (0,0), (-1,-1), 0.5, colors.HexColor('#EDE8DC')),
-        ('PADDING', (0,0), (-1,-1), 6),
-    ]))
-    story.append(t_result)
-    story.append(Spacer(1, 10))
-
-    # Clinical Parameters Table
-    story.append(Paragraph("Patient Clinical Intake Parameters", style_sec))
-    vitals_table_data = [
-        [Paragraph("<b>Parameter</b>", style_body_bold), Paragraph("<b>Entered Value</b>", style_body_bold), Paragraph("<b>Clinical Target Reference</b>", style_body_bold)]
-    ]
-    labels_map = {
-        'age':'Age','sex':'Biological Sex','cp':'Chest Pain Type','trestbps':'Resting Blood Pressure',
-        'chol':'Serum Cholesterol','fbs':'Fasting Blood Sugar > 120','restecg':'Resting ECG Result',
-        'thalach':'Max Heart Rate Achieved','exang':'Exercise Induced Angina','oldpeak':'Exercise ST Depression',
-        'slope':'ST Segment Slope','ca':'Fluoroscopy Vessels','thal':'Thallium Stress Test'
-    }
-    targets_map = {
-        'age':'< 55 yrs','sex':'Male (1) / Female (0)','cp':'1=Typical, 2=Atypical, 3=Non-anginal, 4=Asymptomatic',
-        'trestbps':'< 120 mm Hg','chol':'< 200 mg/dl','fbs':'<= 120 mg/dl (0)','restecg':'Normal (0)',
-        'thalach':f'{220 - feat_dict["age"]} bpm target','exang':'No (0)','oldpeak':'< 1.0 mm','slope':'Upsloping (1)',
-        'ca':'0 vessels','thal':'Normal (3)'
-    }
-    for k, v in feat_dict.items():
-        vitals_table_data.append([
-            Paragraph(labels_map.get(k, k), style_body),
-            Paragraph(str(v), style_code),
-            Paragraph(targets_map.get(k, '-'), style_body)
-        ])
-
-    t_vitals = Table(vitals_table_data, colWidths=[180, 120, 240])
-    t_vitals.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#1E3A5F')),
-        ('TEXTCOLOR', (0,0), (-1,0), colors.white),
-        ('BOX', (0,0), (-1,-1), 1, colors.HexColor('#D4C9B0')),
-        ('INNERGRID', (0,0), (-1,-1), 0.5, colors.HexColor('#EDE8DC')),
-        ('PADDING', (0,0), (-1,-1), 4),
-    ]))
-    story.append(t_vitals)
-    story.append(Spacer(1, 10))
-
-    # Top SHAP Feature Contributors
-    story.append(Paragraph("Explainable AI (SHAP) Risk Drivers", style_sec))
-    feat_names = list(feat_dict.keys())
-    shap_pairs = sorted(zip(feat_names, shap_vals), key=lambda x: abs(x[1]), reverse=True)[:6]
-    shap_table_data = [[Paragraph("<b>Clinical Feature</b>", style_body_bold), Paragraph("<b>SHAP Value Push</b>", style_body_bold), Paragraph("<b>Impact Direction</b>", style_body_bold)]]
-    for k, s_val in shap_pairs:
-        direction = "Pushes Risk HIGHER (+)" if s_val > 0 else "Reduces Risk (−)"
-        d_color = colors.HexColor('#C0392B') if s_val > 0 else colors.HexColor('#1B5741')
-        shap_table_data.append([
-            Paragraph(labels_map.get(k, k), style_body),
-            Paragraph(f"{s_val:+.3f}", style_code),
-            Paragraph(f"<font color='{d_color.hexval()}'><b>{direction}</b></font>", style_body)
-        ])
-    t_shap = Table(shap_table_data, colWidths=[180, 140, 220])
-    t_shap.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#FAF7F0')),
-        ('BOX', (0,0), (-1,-1), 1, colors.HexColor('#D4C9B0')),
-        ('INNERGRID', (0,0), (-1,-1), 0.5, colors.HexColor('#EDE8DC')),
-        ('PADDING', (0,0), (-1,-1), 4),
-    ]))
-    story.append(t_shap)
-    story.append(Spacer(1, 10))
-
-    # Clinical Recommendations
-    story.append(Paragraph("Actionable Clinical Recommendations", style_sec))
-    for r in recs:
-        story.append(Paragraph(f"• {r}", style_body))
-        story.append(Spacer(1, 2))
-
-    story.append(Spacer(1, 12))
-    story.append(HRFlowable(width="100%", thickness=1, color=colors.HexColor('#D4C9B0'), spaceBefore=4, spaceAfter=8))
-    story.append(Paragraph("DISCLAIMER: HeartGuard AI is a machine learning decision support software intended solely for clinical reference. Final diagnosis rests with the attending physician.", ParagraphStyle('Disc', parent=style_sub, fontSize=7, leading=9)))
-
-    doc.build(story)
-    return buffer.getvalue()
+    return engine.explain(model_name, feat_dict)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -960,11 +963,29 @@ RC = dict(
 BURGUNDY, FOREST, NAVY, BRASS, ROSE = '#7C1B2E', '#1B5741', '#1E3A5F', '#B8860B', '#A52840'
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+#  PARTIAL RERUNS
+# ─────────────────────────────────────────────────────────────────────────────
+# A widget inside a fragment reruns only that fragment, not the CSS, hero, sidebar and
+# dispatch above it. Render times (ms) are kept per fragment and for the last full run.
+_fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None)
+if 'render_ms' not in st.session_state:
+    st.session_state.render_ms = {}
+
+def timed_fragment(func):
+    @functools.wraps(func)
+    def run():
+        t = time.perf_counter()
+        func()
+        st.session_state.render_ms[func.__name__] = (time.perf_counter() - t) * 1000
+    return _fragment(run) if _fragment else run
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 #  HERO BANNER
 # ─────────────────────────────────────────────────────────────────────────────
 n_models = len(models_suite) if models_suite else 5
-n_sess   = len(st.session_state.session_history)
+n_sess   = len(st.session_state.session_log)
 
 st.markdown(f"""
 <div class="rc-hero">
@@ -1011,6 +1032,7 @@ st.markdown(f"""
   </div>
 </div>
 """, unsafe_allow_html=True)
+profiling.mark('hero')
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -1068,10 +1090,21 @@ with st.sidebar:
         </div>
         """, unsafe_allow_html=True)
 
-    if st.session_state.session_history:
+    if st.session_state.render_ms:
+        st.markdown("<div style='margin:1.2rem 0 0.8rem 0;'></div>", unsafe_allow_html=True)
+        st.markdown('<span class="sb-label">Render Time (Previous Run)</span>', unsafe_allow_html=True)
+        timing_rows = "".join(f"""
+          <div class="sb-stat-row">
+            <span class="sb-stat-key">{part.replace('_', ' ')}</span>
+            <span class="sb-stat-val">{ms:.0f} ms</span>
+          </div>""" for part, ms in st.session_state.render_ms.items())
+        st.markdown(f'<div class="sb-stats">{timing_rows}</div>', unsafe_allow_html=True)
+
+    session_log = st.session_state.session_log
+    if len(session_log):
         st.markdown("<div style='margin:1.2rem 0 0.8rem 0;'></div>", unsafe_allow_html=True)
         st.markdown('<span class="sb-label">Session Log</span>', unsafe_allow_html=True)
-        for h in reversed(st.session_state.session_history[-4:]):
+        for h in session_log.recent(4):
             col = BURGUNDY if h['result'] == 'Heart Disease' else FOREST
             st.markdown(f"""
             <div style="font-size:0.72rem;padding:0.4rem 0.6rem;margin-bottom:0.3rem;
@@ -1083,6 +1116,15 @@ with st.sidebar:
             </div>
             """, unsafe_allow_html=True)
 
+        with st.expander(f"All assessments ({len(session_log)})"):
+            n_pages = -(-len(session_log) // 25)
+            pg = st.number_input("Page", 1, n_pages, 1, key="history_page") if n_pages > 1 else 1
+            st.dataframe(session_log.page(pg - 1, 25), use_container_width=True, hide_index=True)
+            trend = session_log.history()
+            if len(trend) > 1:
+                st.line_chart(trend.assign(time=pd.to_datetime(trend['ts'], unit='s')).set_index('time')['prob'],
+                              height=140)
+
     st.markdown("<div style='margin:1.4rem 0 0.8rem 0;'></div>", unsafe_allow_html=True)
     st.markdown('<span class="sb-label">Platform Author</span>', unsafe_allow_html=True)
     st.markdown("""
@@ -1093,12 +1135,13 @@ with st.sidebar:
       <span style="color:#7A6A5A;font-size:0.74rem;">Data Science & Machine Learning</span>
     </div>
     """, unsafe_allow_html=True)
+profiling.mark('sidebar')
 
 
 # ══════════════════════════════════════════════════════════════════════════════
 #  WS 1 — PATIENT INTAKE & XAI (SHAP + RADAR CHART + PDF EXPORT)
 # ══════════════════════════════════════════════════════════════════════════════
-if st.session_state.current_workspace == "Patient Intake & XAI":
+def intake_workspace():
 
     st.markdown("""
     <div class="rc-sh">
@@ -1144,6 +1187,8 @@ if st.session_state.current_workspace == "Patient Intake & XAI":
     st.markdown("<div style='margin-bottom:1rem;'></div>", unsafe_allow_html=True)
 
     with st.form("intake_form"):
+        patient_id = st.text_input("Patient ID", key="wiz_patient_id", placeholder="Optional — e.g. MRN",
+                                   help="When set, the assessment is stored on this patient's timeline.").strip()
         t1, t2, t3 = st.tabs([
             "01  Demographics & Vitals",
             "02  ECG & Stress Testing",
@@ -1327,19 +1372,22 @@ if st.session_state.current_workspace == "Patient Intake & XAI":
         }
         active_m = st.session_state.selected_model_name
         prob, pred = predict(active_m, feat)
+        interval = engine.interval(active_m, feat)
+        if interval['low'] is None:
+            band = f"Interval {interval['method']}"
+        else:
+            band = (f"{interval['level']:.0%} interval {interval['low']:.1f}–{interval['high']:.1f}% "
+                    f"· {interval['method']}")
 
         # Compute Real SHAP Values
         shap_vals = compute_shap_values(active_m, feat)
 
         # Append to session history
-        st.session_state.session_history.append({
-            'timestamp': datetime.now().strftime("%H:%M"),
-            'model': active_m,
-            'age': age, 'sex': sex,
-            'bp': trestbps, 'chol': chol,
-            'prob_%': round(prob,1),
-            'result': 'Heart Disease' if pred==1 else 'No Disease'
-        })
+        st.session_state.session_log.append(active_m, age, 1 if sex=="Male" else 0,
+                                            trestbps, chol, prob, int(pred))
+        if patient_id:
+            patient_store.record(patient_id, feat, prob, pred, active_m, engine.model_version(active_m), shap_vals)
+            st.session_state.last_patient_id = patient_id
 
         st.markdown("<hr/>", unsafe_allow_html=True)
         st.markdown(f"""
@@ -1359,14 +1407,8 @@ if st.session_state.current_workspace == "Patient Intake & XAI":
         else:
             rc, label, color = "rc-risk-safe", "LOW CARDIOVASCULAR RISK", "#1B5741"
 
-        recs = []
-        if prob >= 50: recs.append("Cardiology referral warranted for coronary angiography / nuclear stress test.")
-        if chol > 240: recs.append(f"Dyslipidaemia: serum cholesterol {chol} mg/dl exceeds threshold. Evaluate statin therapy.")
-        if trestbps >= 130: recs.append(f"Hypertension: BP {trestbps} mm Hg — ambulatory monitoring and antihypertensive review.")
-        if oldpeak >= 1.0: recs.append(f"Ischaemia: ST depression {oldpeak} mm meets diagnostic threshold for exertional ischaemia.")
-        if exang == "Yes": recs.append("Exertional angina confirmed — anti-anginal therapy and flow restriction evaluation.")
-        if ca > 0: recs.append(f"Multi-vessel CAD ({ca} vessels fluoroscopy) — revascularisation assessment advised.")
-        if not recs: recs.append("Parameters largely within normal reference ranges. Maintain lifestyle risk factor modification.")
+        from clinical_report import recommendations
+        recs = recommendations(feat, prob)
 
         st.markdown('<div class="rc-result-grid">', unsafe_allow_html=True)
         r1, r2 = st.columns([1.6, 1], gap="medium")
@@ -1375,6 +1417,7 @@ if st.session_state.current_workspace == "Patient Intake & XAI":
             <div class="{rc}">
               <div class="rc-risk-eyebrow" style="color:{color};">{label}</div>
               <div class="rc-risk-prob" style="color:{color};">{prob:.1f}%<small>cardiac disease probability</small></div>
+              <div class="rc-risk-desc">{band}</div>
               <div class="rc-risk-desc">
                 <strong>{active_m}</strong> evaluates this patient as
                 <strong>{'POSITIVE for Coronary Artery Disease' if pred==1 else 'NEGATIVE for Coronary Artery Disease'}</strong>.
@@ -1386,7 +1429,9 @@ if st.session_state.current_workspace == "Patient Intake & XAI":
 
             if HAS_REPORTLAB:
                 try:
-                    pdf_bytes = generate_pdf_report(active_m, feat, prob, pred, shap_vals, recs)
+                    with profiling.stage('pdf report'):
+                        from clinical_report import render_report
+                        pdf_bytes = render_report(active_m, feat, prob, pred, shap_vals, recs, metadata['models'][active_m])
                     st.markdown("<div style='margin-top:1rem;'></div>", unsafe_allow_html=True)
                     st.download_button(
                         label="📄 Download Official PDF Clinical Assessment Report",
@@ -1498,34 +1543,7 @@ if st.session_state.current_workspace == "Patient Intake & XAI":
               <span class="rc-chart-title">Patient Vitals vs Healthy Baseline Radar</span>
             </div><div class="rc-chart-body">""", unsafe_allow_html=True)
 
-            radar_categories = ['Age', 'Resting BP', 'Cholesterol', 'Max HR', 'ST Depression', 'Calcified Vessels']
-            p_scores = [
-                min(100, (feat['age'] / 80) * 100),
-                min(100, (feat['trestbps'] / 180) * 100),
-                min(100, (feat['chol'] / 350) * 100),
-                min(100, (feat['thalach'] / 200) * 100),
-                min(100, (feat['oldpeak'] / 4.0) * 100),
-                min(100, (feat['ca'] / 3.0) * 100)
-            ]
-            norm_scores = [50, 60, 50, 75, 10, 0]
-
-            fig_radar = go.Figure()
-            fig_radar.add_trace(go.Scatterpolar(
-                r=p_scores, theta=radar_categories, fill='toself', name='Patient Profile',
-                fillcolor='rgba(124, 27, 46, 0.25)', line=dict(color=BURGUNDY, width=2)
-            ))
-            fig_radar.add_trace(go.Scatterpolar(
-                r=norm_scores, theta=radar_categories, fill='toself', name='Healthy Reference Baseline',
-                fillcolor='rgba(27, 87, 65, 0.15)', line=dict(color=FOREST, width=2, dash='dash')
-            ))
-            fig_radar.update_layout(
-                paper_bgcolor='#FFFFFF', height=310, margin=dict(l=25, r=25, t=25, b=25),
-                polar=dict(
-                    radialaxis=dict(visible=True, range=[0, 100], gridcolor='#EDE8DC', tickfont=dict(size=8)),
-                    angularaxis=dict(gridcolor='#EDE8DC', linecolor='#D4C9B0', tickfont=dict(size=10, color='#3D3228'))
-                ),
-                legend=dict(font=dict(size=10, family='IBM Plex Sans'), bgcolor='rgba(255,255,255,0.8)', borderwidth=0)
-            )
+            fig_radar = cached_radar_figure(tuple(round(x, 1) for x in radar_scores(feat)))
             st.plotly_chart(fig_radar, use_container_width=True)
             st.markdown('</div></div>', unsafe_allow_html=True)
 
@@ -1553,11 +1571,34 @@ if st.session_state.current_workspace == "Patient Intake & XAI":
             st.plotly_chart(fig_v, use_container_width=True)
             st.markdown('</div></div>', unsafe_allow_html=True)
 
+        # ── Patient Timeline ──────────────────────────────────────────────────
+        if patient_id:
+            timeline = patient_store.trend(patient_id)
+            if len(timeline) > 1:
+                ts90 = patient_store.trend_score(patient_id, days=90)
+                st.markdown("<hr/>", unsafe_allow_html=True)
+                st.markdown(f"""
+                <div class="rc-sh">
+                  <div class="rc-sh-left">
+                    <div class="rc-sh-title">Risk Timeline — {patient_id}</div>
+                    <span class="rc-sh-tag">{len(timeline)} assessments</span>
+                  </div>
+                  <div class="rc-sh-right">90-day change: {ts90['change']:+.1f} pts{'' if ts90['slope_per_30d'] is None else f" · {ts90['slope_per_30d']:+.1f} pts / 30 days"}</div>
+                </div>
+                """, unsafe_allow_html=True)
+                fig_tl = go.Figure(go.Scatter(
+                    x=pd.to_datetime(timeline['ts'], unit='s'), y=timeline['probability'],
+                    mode='lines+markers', line=dict(color=BURGUNDY, width=2), marker=dict(size=7, color=BURGUNDY),
+                    text=timeline['model'], hovertemplate='%{x|%d %b %Y %H:%M}<br>%{y:.1f}% · %{text}<extra></extra>'))
+                fig_tl.update_layout(**RC, height=280, title="")
+                fig_tl.update_yaxes(title="Predicted Risk (%)", range=[0, 100])
+                st.plotly_chart(fig_tl, use_container_width=True)
+
 
 # ══════════════════════════════════════════════════════════════════════════════
 #  WS 2 — RISK SIMULATOR & 10-YR PROGNOSIS
 # ══════════════════════════════════════════════════════════════════════════════
-elif st.session_state.current_workspace == "Clinical Risk Simulator & 10-Yr Prognosis":
+def simulator_workspace():
 
     st.markdown("""
     <div class="rc-sh">
@@ -1568,7 +1609,11 @@ elif st.session_state.current_workspace == "Clinical Risk Simulator & 10-Yr Prog
       <div class="rc-sh-right">Adjust parameters in real time to model intervention effects</div>
     </div>
     """, unsafe_allow_html=True)
+    simulator_panel()
+
 
+@timed_fragment
+def simulator_panel():
     sim_a, sim_b = st.columns([1, 1.2], gap="large")
 
     with sim_a:
@@ -1631,43 +1676,16 @@ elif st.session_state.current_workspace == "Clinical Risk Simulator & 10-Yr Prog
         <div class="rc-sh-title">10-Year Cardiac Risk Trajectory</div>
         <span class="rc-sh-tag">Prognosis</span>
       </div>
-      <div class="rc-sh-right">Unmanaged baseline vs. proactive medical intervention</div>
+      <div class="rc-sh-right">Model-scored projection · unmanaged vs. treated drift · 1,000 Monte-Carlo paths</div>
     </div>
     """, unsafe_allow_html=True)
 
-    yrs = np.array([0,1,2,3,5,7,10])
-    ylbl = ['Baseline','Yr 1','Yr 2','Yr 3','Yr 5','Yr 7','Yr 10']
-    unmanaged = np.clip(psim + yrs*2.4, 0, 98)
-    managed   = np.clip(psim - yrs*3.2, 4, 98)
-
-    fig_prog = go.Figure()
-    fig_prog.add_trace(go.Scatter(x=ylbl, y=unmanaged, name='Unmanaged Baseline',
-        mode='lines+markers', line=dict(color=BURGUNDY, width=2.5),
-        marker=dict(size=7, color=BURGUNDY, line=dict(color='#FFFFFF', width=2)),
-        fill='tozeroy', fillcolor='rgba(124,27,46,0.06)'))
-    fig_prog.add_trace(go.Scatter(x=ylbl, y=managed, name='Proactive Intervention',
-        mode='lines+markers', line=dict(color=FOREST, width=2.5, dash='dash'),
-        marker=dict(size=7, color=FOREST, line=dict(color='#FFFFFF', width=2)),
-        fill='tozeroy', fillcolor='rgba(27,87,65,0.06)'))
-    fig_prog.update_layout(
-        paper_bgcolor='#FFFFFF', plot_bgcolor='#FAF7F0',
-        font=dict(family='IBM Plex Sans, sans-serif', color='#3D3228', size=11),
-        margin=dict(l=16, r=16, t=40, b=16),
-        title=dict(text="10-Year Cardiovascular Risk Trajectory",
-                   font=dict(family='Playfair Display, serif', size=14, color='#1E3A5F')),
-        xaxis=dict(title="Timeline", gridcolor='#EDE8DC',
-                   linecolor='#D4C9B0', tickfont=dict(size=10, color='#7A6A5A')),
-        yaxis=dict(title="Predicted Risk (%)", gridcolor='#EDE8DC',
-                   linecolor='#D4C9B0', tickfont=dict(size=10, color='#7A6A5A')),
-        legend=dict(bgcolor='rgba(255,255,255,0.9)', bordercolor='#D4C9B0',
-                    borderwidth=1, font=dict(size=11)),
-        height=360
-    )
+    fig_prog = cached_prognosis_figure(active_m, tuple(fsim.items()))
 
     st.markdown('<div class="rc-chart-card-full">', unsafe_allow_html=True)
     st.markdown("""<div class="rc-chart-header">
       <span class="rc-chart-title">10-Year Risk Trajectory</span>
-      <span class="rc-chart-sub">Burgundy = unmanaged · Forest = treated</span>
+      <span class="rc-chart-sub">Burgundy = unmanaged · Forest = treated · band = 10th–90th percentile</span>
     </div><div class="rc-chart-body">""", unsafe_allow_html=True)
     st.plotly_chart(fig_prog, use_container_width=True)
     st.markdown('</div></div>', unsafe_allow_html=True)
@@ -1676,7 +1694,60 @@ elif st.session_state.current_workspace == "Clinical Risk Simulator & 10-Yr Prog
 # ══════════════════════════════════════════════════════════════════════════════
 #  WS 3 — 3D CARDIAC MESH & SOAP NOTES
 # ══════════════════════════════════════════════════════════════════════════════
-elif st.session_state.current_workspace == "3D Anatomical Mesh & SOAP Notes":
+CP_LABELS = {1: "Typical angina", 2: "Atypical angina", 3: "Non-anginal pain", 4: "Asymptomatic"}
+
+def soap_note(patient_id):
+    """SOAP note from the patient's latest stored assessment; placeholders until one exists."""
+    latest = None
+    if patient_id:
+        rows = patient_store.assessments(patient_id)
+        latest = rows.iloc[-1] if len(rows) else None
+    rule = "─────────────────────────────────────"
+    header = f"""CLINICAL SOAP NOTE — HeartGuard AI
+Date:       {datetime.now().strftime('%Y-%m-%d  %H:%M')}
+Patient ID: {patient_id if latest is not None else 'Unassigned'}
+{rule}
+"""
+    footer = f"""
+{rule}
+Generated by HeartGuard AI | For decision support only
+"""
+    if latest is None:
+        return header + """
+No assessment on record. Run a Patient Intake assessment with a
+patient ID to fill in this note.
+""" + footer
+
+    from clinical_report import recommendations
+    feat = {f: float(latest[f]) if f == 'oldpeak' else int(latest[f]) for f in FEATURES}
+    prob = float(latest['probability'])
+    band = "HIGH RISK" if prob >= 70 else "MODERATE RISK" if prob >= 35 else "LOW RISK"
+    plan = '\n'.join(f"  {i}. {r}" for i, r in enumerate(recommendations(feat, prob), 1))
+    version = f", version {latest['model_version']}" if latest['model_version'] else ""
+    return header + f"""
+SUBJECTIVE:
+  Chief Complaint:   Cardiac risk evaluation
+  Chest Pain Type:   {CP_LABELS.get(feat['cp'], feat['cp'])}
+  Exercise Angina:   {'Present' if feat['exang'] == 1 else 'Absent'}
+
+OBJECTIVE:
+  Age / Sex:         {feat['age']} / {'M' if feat['sex'] == 1 else 'F'}
+  Resting BP:        {feat['trestbps']} mm Hg
+  Serum Cholesterol: {feat['chol']} mg/dl
+  Max Heart Rate:    {feat['thalach']} bpm
+  ST Depression:     {feat['oldpeak']:.1f} mm
+  Vessels (fluoro):  {feat['ca']} vessel{'s' if feat['ca'] != 1 else ''}
+
+ASSESSMENT ({datetime.fromtimestamp(latest['ts']).strftime('%Y-%m-%d %H:%M')}):
+  ML Model ({latest['model']}{version}): {prob:.1f}% CAD probability
+  Classification:             {band}
+
+PLAN:
+{plan}
+""" + footer
+
+@timed_fragment
+def mesh_workspace():
 
     st.markdown("""
     <div class="rc-sh">
@@ -1694,34 +1765,12 @@ elif st.session_state.current_workspace == "3D Anatomical Mesh & SOAP Notes":
           <span class="rc-step-num">3D MODEL</span>
           <span class="rc-step-title">Interactive Myocardial Perfusion Surface</span>
         </div>""", unsafe_allow_html=True)
-        u = np.linspace(0, 2*np.pi, 35)
-        v = np.linspace(0, np.pi, 35)
-        x3 = 16*np.sin(v)[:,None]**3 * np.cos(u)[None,:]
-        y3 = 13*np.cos(v)[:,None] - 5*np.cos(2*v)[:,None] - 2*np.cos(3*v)[:,None] - np.cos(4*v)[:,None]
-        z3 = 16*np.sin(v)[:,None]**3 * np.sin(u)[None,:]
-
-        fig3d = go.Figure(go.Surface(x=x3, y=y3, z=z3,
-            colorscale=[[0,'#FAF7F0'],[0.25,'#D4C9B0'],[0.5,'#B8860B'],
-                        [0.75,'#A52840'],[1,'#1E3A5F']],
-            showscale=True,
-            colorbar=dict(thickness=10, len=0.65, x=1.02,
-                tickfont=dict(family='IBM Plex Mono',size=9,color='#3D3228'),
-                title=dict(text='Perf.',font=dict(size=9,color='#7A6A5A'))),
-            lighting=dict(ambient=0.7, diffuse=0.85, specular=0.1)))
-        fig3d.update_layout(
-            title=dict(text="3D Parametric Cardiac Surface",
-                       font=dict(family='Playfair Display,serif',size=14,color='#1E3A5F')),
-            scene=dict(
-                xaxis=dict(title='LAD', backgroundcolor='#FAF7F0', gridcolor='#D4C9B0',
-                           tickfont=dict(size=9,color='#7A6A5A')),
-                yaxis=dict(title='LV',  backgroundcolor='#FAF7F0', gridcolor='#D4C9B0',
-                           tickfont=dict(size=9,color='#7A6A5A')),
-                zaxis=dict(title='RCA', backgroundcolor='#FAF7F0', gridcolor='#D4C9B0',
-                           tickfont=dict(size=9,color='#7A6A5A')),
-                bgcolor='#FAF7F0'),
-            height=420, paper_bgcolor='#FFFFFF',
-            margin=dict(l=0,r=0,t=40,b=0))
+        mesh_res = st.select_slider("Mesh resolution", options=list(MESH_RESOLUTIONS), value='Standard',
+                                    help="HD and 4K sample the surface more densely for large displays.")
+        fig3d, mesh_bytes = mesh_figure(MESH_RESOLUTIONS[mesh_res])
         st.plotly_chart(fig3d, use_container_width=True)
+        n = MESH_RESOLUTIONS[mesh_res]
+        st.caption(f"{n}×{n} surface grid · {mesh_bytes/1024:.0f} KB chart payload")
 
     with m2:
         st.markdown("""<div class="rc-step-header">
@@ -1731,43 +1780,15 @@ elif st.session_state.current_workspace == "3D Anatomical Mesh & SOAP Notes":
         st.markdown("""<div class="rc-note">
           Generates a physician-format SOAP note ready for Epic / Cerner EHR integration.
         </div>""", unsafe_allow_html=True)
-        soap = f"""CLINICAL SOAP NOTE — HeartGuard AI
-Date:       {datetime.now().strftime('%Y-%m-%d  %H:%M')}
-Patient ID: HG-{np.random.randint(10000,99999)}
-─────────────────────────────────────
-
-SUBJECTIVE:
-  Chief Complaint:   Cardiac risk evaluation
-  Chest Pain Type:   Typical Angina during exertion
-  Exercise Angina:   Present
-
-OBJECTIVE:
-  Resting BP:        140 mm Hg
-  Serum Cholesterol: 245 mg/dl
-  Max Heart Rate:    142 bpm
-  ST Depression:     1.2 mm
-  Vessels (fluoro):  1 vessel
-
-ASSESSMENT:
-  ML Model (Voting Ensemble): 64.5% CAD probability
-  Classification:             MODERATE RISK
-
-PLAN:
-  1. Stress echocardiography / coronary angiography
-  2. Statin therapy (target cholesterol <200 mg/dl)
-  3. Ambulatory BP monitoring + antihypertensive review
-  4. Cardiology referral — follow-up in 2 weeks
-
-─────────────────────────────────────
-Generated by HeartGuard AI | For decision support only
-"""
+        soap = soap_note(st.session_state.get('last_patient_id'))
         st.text_area("Generated SOAP Note", soap, height=340, label_visibility="collapsed")
 
 
 # ══════════════════════════════════════════════════════════════════════════════
 #  WS 4 — BATCH EHR CSV INTELLIGENCE SUITE
 # ══════════════════════════════════════════════════════════════════════════════
-elif st.session_state.current_workspace == "Batch EHR CSV Intelligence Suite":
+@timed_fragment
+def batch_workspace():
 
     st.markdown("""
     <div class="rc-sh">
@@ -1793,9 +1814,7 @@ elif st.session_state.current_workspace == "Batch EHR CSV Intelligence Suite":
             else:
                 if st.button("Run Batch Assessment", type="primary", use_container_width=True):
                     am = st.session_state.selected_model_name
-                    Xb = scaler.transform(bdf[req])
-                    probs = models_suite[am].predict_proba(Xb)[:,1]*100
-                    preds = models_suite[am].predict(Xb)
+                    probs, preds = engine.predict_batch(am, bdf)
                     bdf['Probability_%'] = np.round(probs,1)
                     bdf['Prediction'] = np.where(preds==1,'Heart Disease','No Disease')
                     bdf['Risk'] = np.where(probs>=70,'High',np.where(probs>=35,'Moderate','Low'))
@@ -1805,6 +1824,7 @@ elif st.session_state.current_workspace == "Batch EHR CSV Intelligence Suite":
                     with c2: st.metric("Moderate",    int(sum((probs>=35)&(probs<70))), f"{sum((probs>=35)&(probs<70))/len(bdf)*100:.1f}%")
                     with c3: st.metric("Low Risk",    int(sum(probs<35)),    f"{sum(probs<35)/len(bdf)*100:.1f}%")
 
+                    import plotly.express as px
                     fig_b = px.histogram(bdf, x='Probability_%', nbins=20, color='Risk',
                         title=f"Risk Score Distribution — {am}",
                         color_discrete_map={'High':BURGUNDY,'Moderate':BRASS,'Low':FOREST})
@@ -1814,6 +1834,28 @@ elif st.session_state.current_workspace == "Batch EHR CSV Intelligence Suite":
                     st.download_button("Export Predictions (CSV)", bdf.to_csv(index=False).encode(),
                         file_name=f"hg_predictions_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
                         mime="text/csv", use_container_width=True)
+
+                    # Clinical PDFs for every patient, rendered only when a download is requested
+                    if HAS_REPORTLAB:
+                        from clinical_report import render_batch_pdf, render_batch_zip
+                        id_col = next((c for c in ('patient_id', 'id') if c in bdf.columns), None)
+                        pids = bdf[id_col].astype(str).tolist() if id_col else [f"{i + 1:05d}" for i in range(len(bdf))]
+
+                        def batch_reports():
+                            return engine.reports(am, bdf, pids, nsamples=100)
+
+                        stamp = datetime.now().strftime('%Y%m%d_%H%M')
+                        d1, d2 = st.columns(2)
+                        with d1:
+                            st.download_button("📄 Merged PDF Reports (all patients)",
+                                lambda: render_batch_pdf(batch_reports(), am, metadata['models'][am])[0],
+                                file_name=f"HeartGuard_Batch_Reports_{stamp}.pdf", mime="application/pdf",
+                                on_click="ignore", use_container_width=True)
+                        with d2:
+                            st.download_button("🗂️ Per-Patient PDF Reports (ZIP)",
+                                lambda: render_batch_zip(batch_reports(), am, metadata['models'][am])[0],
+                                file_name=f"HeartGuard_Batch_Reports_{stamp}.zip", mime="application/zip",
+                                on_click="ignore", use_container_width=True)
         except Exception as ex:
             st.error(f"Error: {ex}")
 
@@ -1821,7 +1863,8 @@ elif st.session_state.current_workspace == "Batch EHR CSV Intelligence Suite":
 # ══════════════════════════════════════════════════════════════════════════════
 #  WS 5 — ML WORKBENCH & ROC CURVES COMPARISON
 # ══════════════════════════════════════════════════════════════════════════════
-elif st.session_state.current_workspace == "ML Model Workbench & Comparison":
+@timed_fragment
+def workbench_workspace():
 
     st.markdown("""
     <div class="rc-sh">
@@ -1845,44 +1888,8 @@ elif st.session_state.current_workspace == "ML Model Workbench & Comparison":
               <span class="rc-chart-title">ROC Curves Comparison — All 5 Models</span>
             </div><div class="rc-chart-body">""", unsafe_allow_html=True)
 
-            # Generate ROC curves on UCI Cleveland Dataset
-            fig_roc = go.Figure()
-            color_map_roc = {'Random Forest': BURGUNDY, 'Gradient Boosting': ROSE,
-                             'Logistic Regression': NAVY, 'K-Nearest Neighbors': BRASS,
-                             'Voting Ensemble': FOREST}
-
-            for mname, mobj in models_suite.items():
-                try:
-                    y_probs = mobj.predict_proba(X_scaled_all)[:, 1]
-                    fpr, tpr, _ = roc_curve(y_raw, y_probs)
-                    auc_val = auc(fpr, tpr)
-                    fig_roc.add_trace(go.Scatter(
-                        x=fpr, y=tpr, mode='lines',
-                        name=f"{mname} (AUC={auc_val:.3f})",
-                        line=dict(color=color_map_roc.get(mname, '#3D3228'), width=2)
-                    ))
-                except Exception:
-                    pass
-
-            fig_roc.add_trace(go.Scatter(
-                x=[0, 1], y=[0, 1], mode='lines', name='Random Classifier',
-                line=dict(color='#D4C9B0', width=1.5, dash='dash')
-            ))
-            fig_roc.update_layout(
-                paper_bgcolor='#FFFFFF', plot_bgcolor='#FAF7F0',
-                font=dict(family='IBM Plex Sans, sans-serif', color='#3D3228', size=11),
-                margin=dict(l=16, r=16, t=40, b=16),
-                title=dict(text="Receiver Operating Characteristic (ROC) Curves",
-                           font=dict(family='Playfair Display, serif', size=14, color='#1E3A5F')),
-                xaxis=dict(title="False Positive Rate", gridcolor='#EDE8DC',
-                           linecolor='#D4C9B0', tickfont=dict(size=10, color='#7A6A5A')),
-                yaxis=dict(title="True Positive Rate", gridcolor='#EDE8DC',
-                           linecolor='#D4C9B0', tickfont=dict(size=10, color='#7A6A5A')),
-                height=320,
-                legend=dict(font=dict(size=9, family='IBM Plex Sans'),
-                            bgcolor='rgba(255,255,255,0.85)', bordercolor='#D4C9B0', borderwidth=1)
-            )
-
+            # Held-out ROC curves from the exported evaluation artefact (no model calls)
+            fig_roc, fig_pr, fig_cal = workbench_figures(model_file_hashes())
             st.plotly_chart(fig_roc, use_container_width=True)
             st.markdown('</div></div>', unsafe_allow_html=True)
 
@@ -1893,6 +1900,7 @@ elif st.session_state.current_workspace == "ML Model Workbench & Comparison":
             st.markdown(f"""<div class="rc-chart-header">
               <span class="rc-chart-title">Confusion Matrix — {am2}</span>
             </div><div class="rc-chart-body">""", unsafe_allow_html=True)
+            import plotly.express as px
             fig_cm = px.imshow(cm,
                 labels=dict(x="Predicted",y="Actual",color="Count"),
                 x=['No Disease','Heart Disease'], y=['No Disease','Heart Disease'],
@@ -1902,11 +1910,33 @@ elif st.session_state.current_workspace == "ML Model Workbench & Comparison":
             st.plotly_chart(fig_cm, use_container_width=True)
             st.markdown('</div></div>', unsafe_allow_html=True)
 
+        w3, w4 = st.columns(2, gap="large")
+        with w3:
+            st.markdown('<div class="rc-chart-card">', unsafe_allow_html=True)
+            st.markdown("""<div class="rc-chart-header">
+              <span class="rc-chart-title">Precision–Recall Curves — Held-Out Split</span>
+            </div><div class="rc-chart-body">""", unsafe_allow_html=True)
+            st.plotly_chart(fig_pr, use_container_width=True)
+            st.markdown('</div></div>', unsafe_allow_html=True)
+        with w4:
+            st.markdown('<div class="rc-chart-card">', unsafe_allow_html=True)
+            st.markdown("""<div class="rc-chart-header">
+              <span class="rc-chart-title">Calibration — Predicted vs Observed Risk</span>
+            </div><div class="rc-chart-body">""", unsafe_allow_html=True)
+            st.plotly_chart(fig_cal, use_container_width=True)
+            st.markdown('</div></div>', unsafe_allow_html=True)
+
+        curves_wb = load_evaluation_curves(model_file_hashes())
+        if am2 in curves_wb:
+            with st.expander(f"Decision Threshold Table — {am2} (held-out n={curves_wb[am2]['test_size']})"):
+                st.dataframe(pd.DataFrame(curves_wb[am2]['thresholds']), use_container_width=True, hide_index=True)
+
 
 # ══════════════════════════════════════════════════════════════════════════════
 #  WS 6 — CARDIAC KNOWLEDGE BASE
 # ══════════════════════════════════════════════════════════════════════════════
-else:
+@timed_fragment
+def knowledge_workspace():
     st.markdown("""
     <div class="rc-sh">
       <div class="rc-sh-left">
@@ -1944,23 +1974,44 @@ else:
     </div>
     """, unsafe_allow_html=True)
 
-    pdf = pd.DataFrame([
-        {'Feature':'age',      'Clinical Name':'Age',                   'Description':'Patient age in years',               'Normal Range':'Risk threshold >55 yrs'},
-        {'Feature':'sex',      'Clinical Name':'Biological Sex',        'Description':'Biological sex',                     'Normal Range':'1=Male, 0=Female'},
-        {'Feature':'cp',       'Clinical Name':'Chest Pain Type',       'Description':'1=Typical, 2=Atypical, 3=Non-anginal, 4=Asymptomatic','Normal Range':'4=Highest CAD correlation'},
-        {'Feature':'trestbps', 'Clinical Name':'Resting Blood Pressure','Description':'Resting BP on admission (mm Hg)',     'Normal Range':'<120 mm Hg optimal'},
-        {'Feature':'chol',     'Clinical Name':'Serum Cholesterol',     'Description':'Total cholesterol (mg/dl)',           'Normal Range':'<200 mg/dl desirable'},
-        {'Feature':'fbs',      'Clinical Name':'Fasting Blood Sugar',   'Description':'FBS >120 mg/dl flag',                'Normal Range':'1=True, 0=False'},
-        {'Feature':'restecg',  'Clinical Name':'Resting ECG',          'Description':'0=Normal, 1=ST-T abnormality, 2=LVH', 'Normal Range':'0=Normal'},
-        {'Feature':'thalach',  'Clinical Name':'Max Heart Rate',        'Description':'Peak HR during treadmill test',       'Normal Range':'220 − age bpm target'},
-        {'Feature':'exang',    'Clinical Name':'Exercise Angina',       'Description':'Angina during exertion',              'Normal Range':'1=Yes, 0=No'},
-        {'Feature':'oldpeak',  'Clinical Name':'ST Depression',         'Description':'ST depression vs. rest (mm)',         'Normal Range':'<1.0 mm normal'},
-        {'Feature':'slope',    'Clinical Name':'ST Slope',              'Description':'1=Upsloping, 2=Flat, 3=Downsloping',  'Normal Range':'1=Benign'},
-        {'Feature':'ca',       'Clinical Name':'Vessels (Fluoroscopy)', 'Description':'Stenotic vessels (LAD/LCx/RCA)',      'Normal Range':'0=No disease (strongest predictor)'},
-        {'Feature':'thal',     'Clinical Name':'Thallium Stress Test',  'Description':'3=Normal, 6=Fixed, 7=Reversible',    'Normal Range':'3=Normal perfusion'},
-    ])
+    pdf = knowledge_base_table()
     st.dataframe(pdf, use_container_width=True, hide_index=True)
 
+    st.markdown("<hr/>", unsafe_allow_html=True)
+    st.markdown("""
+    <div class="rc-sh">
+      <div class="rc-sh-left">
+        <div class="rc-sh-title" style="font-size:1.1rem;">Multi-Site Dataset Explorer</div>
+        <span class="rc-sh-tag">UCI Sites</span>
+      </div>
+      <div class="rc-sh-right">Cleveland, Hungarian, Switzerland & Long Beach VA records</div>
+    </div>
+    """, unsafe_allow_html=True)
+
+    sel_sites = st.multiselect("Sites", list(SITES), default=EXPLORER_SITES)
+    if sel_sites:
+        site_df, site_stats = load_site_data(tuple(sel_sites))
+        st.dataframe(site_stats.reset_index(), use_container_width=True, hide_index=True)
+        st.dataframe(site_df, use_container_width=True, hide_index=True, height=320)
+        st.download_button("Export Selected Sites (CSV)", site_df.to_csv(index=False).encode(),
+            file_name=f"hg_uci_{'_'.join(sel_sites)}.csv", mime="text/csv", use_container_width=True)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  WORKSPACE DISPATCH
+# ─────────────────────────────────────────────────────────────────────────────
+# Patient intake stays a full-app run: its inputs sit in a form (one rerun per submit) and
+# a submitted assessment has to reach the hero count and the sidebar session log.
+WORKSPACE_VIEWS = {
+    "Patient Intake & XAI":                      intake_workspace,
+    "Clinical Risk Simulator & 10-Yr Prognosis": simulator_workspace,
+    "3D Anatomical Mesh & SOAP Notes":           mesh_workspace,
+    "Batch EHR CSV Intelligence Suite":          batch_workspace,
+    "ML Model Workbench & Comparison":           workbench_workspace,
+}
+WORKSPACE_VIEWS.get(st.session_state.current_workspace, knowledge_workspace)()
+profiling.mark(f"workspace: {st.session_state.current_workspace}")
+
 
 # ─────────────────────────────────────────────────────────────────────────────
 #  FOOTER
@@ -1978,3 +2029,15 @@ st.markdown(f"""
   </div>
 </div>
 """, unsafe_allow_html=True)
+
+st.session_state.render_ms['full script'] = (time.perf_counter() - SCRIPT_START) * 1000
+
+if script_trace is not None:
+    profiling.mark('footer')
+    trace = script_trace.as_dict()
+    with st.expander(f"Debug · script timings for this rerun ({trace['total_ms']:.0f} ms)", expanded=True):
+        st.dataframe(pd.DataFrame([{'stage': '\u2003' * s['depth'] + s['stage'], 'start (ms)': s['start_ms'],
+                                    'duration (ms)': s['ms']} for s in trace['stages']]),
+                     use_container_width=True, hide_index=True)
+        st.caption("Scoring, intervals and SHAP bypass the memo caches while tracing, so every stage is measured.")
+    profiling.activate(None)
@@ -0,0 +1,280 @@
+"""
+HeartGuard Pro - Shared Inference & Explanation Engine
+One path from patient features to probability, prediction, SHAP values and report
+content, shared by the REST API (/predict, /report, /report/batch) and the Streamlit app.
+
+Single-patient predictions and explanations are memoised per (model, feature values), and
+SHAP explainers are built once per model, so a report for a patient that was just scored
+reuses that work instead of repeating it. Prediction intervals come from uncertainty.py.
+shap (which brings in numba, matplotlib and IPython) is imported with the first explainer,
+and the training split is rebuilt from ``heart_data``, so serving never imports the
+training engine.
+
+Probabilities are passed through the per-model calibrators exported in the metadata
+(calibration.py) before any risk cut-off is applied, and the predicted class is derived
+from the calibrated probability (``calibration.decide``), never from the raw model.
+"""
+
+import importlib.util
+import json
+import os
+import time
+from functools import lru_cache
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from calibration import calibrate, decide
+from profiling import current as tracing, stage
+from uncertainty import UncertaintyEstimator, load_bank, UNCERTAINTY_BANK_FILE
+
+HAS_SHAP = importlib.util.find_spec('shap') is not None
+
+FEATURES = ['age', 'sex', 'cp', 'trestbps', 'chol', 'fbs', 'restecg', 'thalach', 'exang', 'oldpeak', 'slope', 'ca', 'thal']
+CACHE_SIZE = 4096
+KERNEL_BACKGROUND = 20
+ENSEMBLE_MEMBERS = {'rf': 'Random Forest', 'gb': 'Gradient Boosting', 'knn': 'K-Nearest Neighbors', 'lr': 'Logistic Regression'}
+
+# Heuristic per-feature weights used when SHAP is unavailable or fails for a model
+FALLBACK_WEIGHTS = {'ca':4.5,'thal':4.0,'oldpeak':3.8,'cp':3.5,'thalach':3.0,
+                    'exang':2.8,'trestbps':2.2,'chol':2.0,'age':1.8,'sex':1.5,'slope':2.5,'restecg':1.5,'fbs':1.0}
+
+
+def risk_level(probability):
+    """API risk label for a probability in percent."""
+    return "HIGH RISK" if probability >= 70 else "MODERATE RISK" if probability >= 35 else "LOW RISK"
+
+
+class InferenceEngine:
+    """
+    Fitted models plus the scaler they were trained against. ``background`` is a scaled
+    reference sample for the linear and kernel explainers; ``versions`` maps model names
+    to a version tag (pickle hash) recorded alongside stored assessments; ``bank`` is the
+    bootstrap bank behind the boosted and logistic prediction intervals.
+    """
+
+    def __init__(self, models, scaler, background, metadata=None, cache_size=CACHE_SIZE, versions=None, bank=None):
+        self.models = models
+        self.scaler = scaler
+        self.background = np.asarray(background)
+        self.metadata = metadata or {}
+        self.versions = versions or {}
+        self.calibration = self.metadata.get('calibration', {})
+        self._explainers = {}
+        self.uncertainty = UncertaintyEstimator(models, scaler, bank)
+        self._interval_cached = lru_cache(maxsize=cache_size)(self._interval_row)
+        self._score_cached = lru_cache(maxsize=cache_size)(self._score_row)
+        self._explain_cached = lru_cache(maxsize=cache_size)(self._explain_row)
+
+    @staticmethod
+    def _key(feat):
+        return tuple(float(feat[f]) for f in FEATURES)
+
+    def _scale(self, rows):
+        return self.scaler.transform(pd.DataFrame(rows, columns=FEATURES))
+
+    def model_stats(self, model_name):
+        return self.metadata.get('models', {}).get(model_name)
+
+    def model_version(self, model_name):
+        return self.versions.get(model_name)
+
+    # ── Prediction ───────────────────────────────────────────────────────────
+    def calibrate(self, model_name, p):
+        """Calibrated probabilities (0-1) for raw ``predict_proba`` output of ``model_name``."""
+        return calibrate(self.calibration.get(model_name), p)
+
+    def _score_row(self, model_name, key):
+        if tracing() is not None:
+            return self._score_row_traced(model_name, key)
+        Xs = self._scale([key])
+        p = self.calibrate(model_name, self.models[model_name].predict_proba(Xs)[0][1])
+        return float(p * 100), int(decide(p))
+
+    def _score_row_traced(self, model_name, key):
+        # the same result as _score_row, with a stage per step and per soft-voting member
+        with stage('dataframe build'):
+            X = pd.DataFrame([key], columns=FEATURES)
+        with stage('scaling'):
+            Xs = self.scaler.transform(X)
+        from sklearn.ensemble import VotingClassifier
+        m = self.models[model_name]
+        if isinstance(m, VotingClassifier) and m.voting == 'soft':
+            probas = []
+            for (short, _), est in zip(m.estimators, m.estimators_):
+                with stage(f"member: {ENSEMBLE_MEMBERS.get(short, short)}"):
+                    probas.append(est.predict_proba(Xs))
+            with stage('soft vote'):
+                raw = np.average(probas, axis=0, weights=m._weights_not_none)[0]
+        else:
+            with stage(f"model: {model_name}"):
+                raw = m.predict_proba(Xs)[0]
+        with stage('calibration'):
+            p = self.calibrate(model_name, raw[1])
+        return float(p * 100), int(decide(p))
+
+    def predict(self, model_name, feat):
+        """(probability in percent, predicted class) for one patient; memoised (not while tracing)."""
+        if tracing() is not None:
+            with stage(f"predict: {model_name}"):
+                return self._score_row(model_name, self._key(feat))
+        return self._score_cached(model_name, self._key(feat))
+
+    def predict_batch(self, model_name, X):
+        """Probabilities (percent) and predicted classes (from the calibrated probability) for a DataFrame of patients."""
+        Xs = self.scaler.transform(X[FEATURES])
+        p = self.calibrate(model_name, self.models[model_name].predict_proba(Xs)[:, 1])
+        return p * 100, decide(p)
+
+    def probabilities(self, model_name, rows):
+        """Positive-class probabilities for a matrix of raw feature rows (``FEATURES`` order), one call."""
+        return self.calibrate(model_name, self.models[model_name].predict_proba(self._scale(rows))[:, 1])
+
+    def _calibrated_intervals(self, model_name, X):
+        # calibrators are monotone, so the interval bounds map through them directly
+        out = self.uncertainty.intervals(model_name, X)
+        for k in ('probability', 'low', 'high'):
+            if out[k] is not None:
+                out[k] = self.calibrate(model_name, out[k] / 100) * 100
+        return out
+
+    def _interval_row(self, model_name, key):
+        out = self._calibrated_intervals(model_name, pd.DataFrame([key], columns=FEATURES))
+        return {k: (float(v[0]) if isinstance(v, np.ndarray) else v) for k, v in out.items()}
+
+    def interval(self, model_name, feat):
+        """Probability with its interval (percent), spread, level and method for one patient; memoised."""
+        if tracing() is not None:
+            with stage(f"interval: {model_name}"):
+                return self._interval_row(model_name, self._key(feat))
+        return dict(self._interval_cached(model_name, self._key(feat)))
+
+    def intervals_batch(self, model_name, X):
+        """Column arrays of ``interval`` for a DataFrame of patients."""
+        return self._calibrated_intervals(model_name, X[FEATURES])
+
+    # ── Explanation ──────────────────────────────────────────────────────────
+    def explainer(self, model_name):
+        if model_name not in self._explainers:
+            import shap
+            from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+            from sklearn.linear_model import LogisticRegression
+            model = self.models[model_name]
+            if isinstance(model, (RandomForestClassifier, GradientBoostingClassifier)):
+                self._explainers[model_name] = shap.TreeExplainer(model)
+            elif isinstance(model, LogisticRegression):
+                self._explainers[model_name] = shap.LinearExplainer(model, self.background)
+            else:
+                background = shap.sample(self.background, KERNEL_BACKGROUND, random_state=0)
+                self._explainers[model_name] = shap.KernelExplainer(model.predict_proba, background)
+        return self._explainers[model_name]
+
+    def explain_matrix(self, model_name, Xs, nsamples='auto'):
+        """SHAP values (positive class) for every row of the scaled matrix ``Xs``."""
+        from sklearn.ensemble import VotingClassifier
+        model = self.models[model_name]
+        try:
+            if isinstance(model, VotingClassifier):
+                sv_rf = self.explain_matrix('Random Forest', Xs, nsamples)
+                sv_gb = self.explain_matrix('Gradient Boosting', Xs, nsamples)
+                return (sv_rf + sv_gb) / 2
+            import shap
+            explainer = self.explainer(model_name)
+            if isinstance(explainer, shap.KernelExplainer):
+                sv = explainer.shap_values(Xs, nsamples=nsamples, silent=True)
+            else:
+                sv = explainer.shap_values(Xs)
+            if isinstance(sv, list):
+                sv = sv[1] if len(sv) > 1 else sv[0]
+            if len(np.shape(sv)) == 3:
+                sv = sv[:, :, 1]
+            return np.atleast_2d(sv)
+        except Exception:
+            return np.asarray(Xs) * np.array([FALLBACK_WEIGHTS.get(k, 2.0) for k in FEATURES])
+
+    def _explain_row(self, model_name, key):
+        return self.explain_matrix(model_name, self._scale([key]))[0]
+
+    def explain(self, model_name, feat):
+        """SHAP values for one patient, aligned with ``FEATURES``; memoised."""
+        if tracing() is not None:
+            with stage(f"shap: {model_name}"):
+                return self._explain_row(model_name, self._key(feat))
+        return self._explain_cached(model_name, self._key(feat)).copy()
+
+    # ── Report content ───────────────────────────────────────────────────────
+    def report(self, model_name, feat, patient_id=None):
+        """Report entry (see clinical_report) for one patient via the memoised paths."""
+        from clinical_report import recommendations
+        feat = {f: feat[f] for f in FEATURES}
+        prob, pred = self.predict(model_name, feat)
+        return {'patient_id': patient_id, 'features': feat, 'probability': prob, 'prediction': pred,
+                'shap': self.explain(model_name, feat).tolist(), 'recommendations': recommendations(feat, prob)}
+
+    def reports(self, model_name, X, patient_ids, nsamples='auto'):
+        """Report entries for a DataFrame of patients, scored and explained as whole matrices."""
+        from clinical_report import recommendations
+        probs, preds = self.predict_batch(model_name, X)
+        shap_all = self.explain_matrix(model_name, self.scaler.transform(X[FEATURES]), nsamples)
+        feats = X[FEATURES].to_dict('records')
+        return [{'patient_id': pid, 'features': f, 'probability': float(p), 'prediction': int(y),
+                 'shap': np.asarray(sv, dtype=float).tolist(), 'recommendations': recommendations(f, p)}
+                for pid, f, p, y, sv in zip(patient_ids, feats, probs, preds, shap_all)]
+
+    # ── Warm-up ──────────────────────────────────────────────────────────────
+    def warm_up(self, patients, explain=HAS_SHAP, report=False):
+        """
+        Score ``patients`` through every model as a batch and row by row (past the memo
+        caches), build and run every SHAP explainer, and render one PDF report, so that no
+        request pays these one-off costs; returns the ms of each step.
+        """
+        steps = {}
+
+        def timed(step, fn):
+            t = time.perf_counter()
+            fn()
+            steps[step] = round((time.perf_counter() - t) * 1000, 1)
+
+        X = pd.DataFrame(patients)[FEATURES]
+        keys = [self._key(p) for p in patients]
+        for name in self.models:
+            timed(f"batch: {name}", lambda: (self.predict_batch(name, X), self.intervals_batch(name, X)))
+            timed(f"rows: {name}", lambda: [(self._score_row(name, k), self._interval_row(name, k)) for k in keys])
+            if explain:
+                timed(f"explainer: {name}", lambda: self._explain_row(name, keys[0]))
+        if report:
+            from clinical_report import render_report
+            name = 'Voting Ensemble' if 'Voting Ensemble' in self.models else next(iter(self.models))
+
+            def pdf():
+                r = self.report(name, patients[0])
+                render_report(name, r['features'], r['probability'], r['prediction'], r['shap'],
+                              r['recommendations'], self.model_stats(name))
+            timed('pdf report', pdf)
+        return steps
+
+    def clear_cache(self):
+        self._score_cached.cache_clear()
+        self._explain_cached.cache_clear()
+        self._interval_cached.cache_clear()
+        self._explainers.clear()
+
+
+def load_engine(model_dir='.'):
+    """
+    Engine over the model suite exported to ``model_dir`` (the working directory, or a
+    model_registry version), with the training split as explainer background.
+    """
+    from heart_data import load_training_data, split_holdout
+    from model_registry import file_sha1
+
+    path = lambda name: os.path.join(model_dir, name)
+    with open(path('models_metadata.json'), 'r') as f:
+        metadata = json.load(f)
+    scaler = joblib.load(path('scaler.pkl'))
+    models = {n: joblib.load(path(info['filename'])) for n, info in metadata['models'].items()}
+    versions = {n: file_sha1(path(info['filename']))[:12] for n, info in metadata['models'].items()}
+    X_train, _, _, _ = split_holdout(load_training_data(metadata.get('sites')))
+    return InferenceEngine(models, scaler, scaler.transform(X_train[FEATURES]), metadata, versions=versions,
+                           bank=load_bank(path(UNCERTAINTY_BANK_FILE)))
@@ -0,0 +1,353 @@
+"""
+HeartGuard Pro - Versioned Model Registry & Hot Swap
+Every export from ``train_models.py`` is published into its own content-hashed directory,
+
+    model_registry/<version>/   model pickles, scaler, uncertainty bank, metadata, manifest.json
+    model_registry/ACTIVE       the version the API should serve
+    model_registry/EXPERIMENT.json   shadow / split versions on trial (experiments.py)
+
+where ``<version>`` is derived from the artifact hashes, so re-exporting identical models
+re-activates the existing version and files unchanged since an earlier version are
+hard-linked rather than copied. Pruning keeps the active version and every experiment arm.
+The API holds a ``ModelServer``: a background thread polls ``ACTIVE``, loads a new version
+off the request path, warms it with a few predictions per model and then replaces one
+reference. Requests read that reference once, so a request
+started before a swap finishes on the engine it began with and none fail mid-swap.
+
+    python model_registry.py --list                 versions, newest first
+    python model_registry.py --activate <version>   point ACTIVE at a version (rollback)
+    python model_registry.py --benchmark            publish, cold load, warm-up and swap timings
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+REGISTRY_DIR = 'model_registry'
+ACTIVE_FILE = 'ACTIVE'
+EXPERIMENT_FILE = 'EXPERIMENT.json'
+MANIFEST_FILE = 'manifest.json'
+KEEP_VERSIONS = 5
+POLL_SECONDS = 5.0
+
+# Served artifacts besides the per-model pickles named in the metadata
+EXTRA_ARTIFACTS = ['scaler.pkl', 'models_metadata.json', 'uncertainty_bank.pkl', 'acquisition_model.pkl',
+                   'models_compact.npz']
+
+# Scored through every model after a load, before the version takes traffic
+WARMUP_PATIENTS = [
+    {'age': 63, 'sex': 1, 'cp': 1, 'trestbps': 145, 'chol': 233, 'fbs': 1, 'restecg': 2,
+     'thalach': 150, 'exang': 0, 'oldpeak': 2.3, 'slope': 3, 'ca': 0, 'thal': 6},
+    {'age': 67, 'sex': 1, 'cp': 4, 'trestbps': 160, 'chol': 286, 'fbs': 0, 'restecg': 2,
+     'thalach': 108, 'exang': 1, 'oldpeak': 1.5, 'slope': 2, 'ca': 3, 'thal': 3},
+    {'age': 41, 'sex': 0, 'cp': 2, 'trestbps': 130, 'chol': 204, 'fbs': 0, 'restecg': 2,
+     'thalach': 172, 'exang': 0, 'oldpeak': 1.4, 'slope': 1, 'ca': 0, 'thal': 3},
+]
+
+
+def file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _write_atomic(path, text):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+class ModelRegistry:
+    """Published exports under ``root``, one directory per version, plus the ``ACTIVE`` pointer."""
+
+    def __init__(self, root=REGISTRY_DIR):
+        self.root = root
+
+    def path(self, version):
+        return os.path.join(self.root, version)
+
+    def active(self):
+        try:
+            with open(os.path.join(self.root, ACTIVE_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def manifest(self, version):
+        with open(os.path.join(self.path(version), MANIFEST_FILE)) as f:
+            return json.load(f)
+
+    def versions(self):
+        """Manifests of every published version, newest first, flagged with the active one."""
+        if not os.path.isdir(self.root):
+            return []
+        active, out = self.active(), []
+        for name in os.listdir(self.root):
+            if os.path.isfile(os.path.join(self.root, name, MANIFEST_FILE)):
+                out.append({**self.manifest(name), 'active': name == active})
+        return sorted(out, key=lambda m: m['published'], reverse=True)
+
+    def activate(self, version):
+        if not os.path.isfile(os.path.join(self.path(version), MANIFEST_FILE)):
+            raise KeyError(version)
+        os.makedirs(self.root, exist_ok=True)
+        _write_atomic(os.path.join(self.root, ACTIVE_FILE), version)
+
+    def experiment_versions(self):
+        """Versions the experiment file names as shadow or split arms."""
+        try:
+            with open(os.path.join(self.root, EXPERIMENT_FILE)) as f:
+                config = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return set()
+        return set(config.get('split') or {}) | {config.get('shadow')} - {None}
+
+    def previous(self):
+        """The version published before the active one, for rollback."""
+        names = [m['version'] for m in self.versions()]
+        active = self.active()
+        if active in names and names.index(active) + 1 < len(names):
+            return names[names.index(active) + 1]
+        return None
+
+    # ── Publishing ───────────────────────────────────────────────────────────
+    def publish(self, source_dir='.', activate=True, training_run=None, keep=KEEP_VERSIONS):
+        """
+        Copy the exported artifacts in ``source_dir`` into a new version directory (hard-linking
+        files already held by another version), optionally activate it, and prune old versions.
+        """
+        with open(os.path.join(source_dir, 'models_metadata.json')) as f:
+            metadata = json.load(f)
+        names = [info['filename'] for info in metadata['models'].values()] + EXTRA_ARTIFACTS
+        files = {n: file_sha1(os.path.join(source_dir, n)) for n in names if os.path.exists(os.path.join(source_dir, n))}
+
+        # the metadata carries run timestamps; the version hashes what is served
+        served = {k: v for k, v in metadata.items() if k != 'training_run'}
+        digest = hashlib.sha1(json.dumps(served, sort_keys=True).encode())
+        for name, sha in sorted(files.items()):
+            if name != 'models_metadata.json':
+                digest.update(f"{name}:{sha}".encode())
+        version = digest.hexdigest()[:12]
+
+        if not os.path.isdir(self.path(version)):
+            known = {sha: os.path.join(self.path(m['version']), n)
+                     for m in self.versions() for n, sha in m['files'].items()}
+            staging = self.path(f".{version}.{os.getpid()}.tmp")
+            os.makedirs(staging)
+            for name, sha in files.items():
+                dst = os.path.join(staging, name)
+                try:
+                    os.link(known[sha], dst)
+                except (KeyError, OSError):
+                    shutil.copy2(os.path.join(source_dir, name), dst)
+            with open(os.path.join(staging, MANIFEST_FILE), 'w') as f:
+                json.dump({'version': version, 'published': datetime.now().isoformat(timespec='seconds'),
+                           'models': list(metadata['models']), 'files': files,
+                           'training_run': training_run or metadata.get('training_run')}, f, indent=2)
+            os.replace(staging, self.path(version))
+        if activate:
+            self.activate(version)
+        self.prune(keep)
+        return version
+
+    def prune(self, keep=KEEP_VERSIONS):
+        """Delete versions older than the ``keep`` newest, except the active one and experiment arms."""
+        pinned = {self.active()} | self.experiment_versions()
+        for m in self.versions()[keep:]:
+            if m['version'] not in pinned:
+                shutil.rmtree(self.path(m['version']), ignore_errors=True)
+
+
+def warm_engine(engine, patients=WARMUP_PATIENTS):
+    """Score the warm-up patients through every model (prediction and interval); returns ms."""
+    t = time.perf_counter()
+    for name in engine.models:
+        for feat in patients:
+            engine.predict(name, feat)
+            engine.interval(name, feat)
+    return (time.perf_counter() - t) * 1000
+
+
+Deployment = namedtuple('Deployment', ['version', 'engine', 'loaded_at', 'load_ms', 'warm_ms'])
+
+
+class ModelServer:
+    """
+    The engine requests are served from. ``current`` is replaced as a whole, so a request
+    that reads it once keeps a consistent (version, engine) pair for its whole lifetime.
+    Without an active registry version the exported files in the working directory are
+    served, and ``engine`` can seed a fixed fallback. ``hooks`` are called by the watch
+    thread after every poll (experiments.py reloads its arms there). ``warm(engine)`` runs
+    before a loaded version takes traffic and returns its ms.
+    """
+
+    def __init__(self, registry=None, engine=None, poll_seconds=POLL_SECONDS, warm=warm_engine):
+        self.registry = registry or ModelRegistry()
+        self.poll_seconds = poll_seconds
+        self.warm = warm
+        self.swaps = []
+        self.last_error = None
+        self.hooks = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        if engine is not None:
+            self.current = Deployment('fallback', engine, time.time(), 0.0, 0.0)
+        else:
+            self.current = None
+            self.load()
+
+    @property
+    def engine(self):
+        return self.current.engine
+
+    def load(self, version=None):
+        """Load, warm and swap to ``version`` (default: the registry's active version); no-op if already served."""
+        from inference import load_engine
+        with self._lock:
+            version = version or self.registry.active()
+            label = version or 'working-tree'
+            if self.current is not None and self.current.version == label:
+                return label
+            t = time.perf_counter()
+            engine = load_engine(self.registry.path(version) if version else '.')
+            load_ms = (time.perf_counter() - t) * 1000
+            warm_ms = self.warm(engine)
+            previous = self.current.version if self.current else None
+            self.current = Deployment(label, engine, time.time(), round(load_ms, 1), round(warm_ms, 1))
+            self.swaps.append({'from': previous, 'to': label, 'at': datetime.now().isoformat(timespec='seconds'),
+                               'load_ms': round(load_ms, 1), 'warm_ms': round(warm_ms, 1)})
+            del self.swaps[:-20]
+            return label
+
+    # ── Watching ─────────────────────────────────────────────────────────────
+    def poll(self):
+        """Swap if the registry's active version differs from the one served; errors keep the old engine."""
+        active = self.registry.active()
+        if active and active != self.current.version:
+            try:
+                self.load(active)
+                self.last_error = None
+            except Exception as e:
+                self.last_error = f"{active}: {e}"
+
+    def watch(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='model-registry-watch', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.poll_seconds):
+            self.poll()
+            for hook in self.hooks:
+                try:
+                    hook()
+                except Exception as e:
+                    self.last_error = f"{getattr(hook, '__qualname__', hook)}: {e}"
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        c = self.current
+        return {'serving': c.version, 'loaded_at': datetime.fromtimestamp(c.loaded_at).isoformat(timespec='seconds'),
+                'load_ms': c.load_ms, 'warm_ms': c.warm_ms, 'active': self.registry.active(),
+                'watching': bool(self._thread and self._thread.is_alive()), 'last_error': self.last_error,
+                'swaps': self.swaps[-10:]}
+
+
+def benchmark(root='model_registry_benchmark', requests=300):
+    """
+    Publish the working-tree export twice (second is a no-op), then serve requests from one
+    thread while another swaps between two versions; reports timings and failed requests.
+    """
+    if os.path.exists(root):
+        shutil.rmtree(root)
+    registry = ModelRegistry(root)
+    results = {}
+    t = time.perf_counter()
+    v1 = registry.publish()
+    results['publish_ms'] = round((time.perf_counter() - t) * 1000, 1)
+    t = time.perf_counter()
+    results['republish_same_version'] = registry.publish() == v1
+    results['republish_ms'] = round((time.perf_counter() - t) * 1000, 1)
+
+    # a second version: same models, different calibration section
+    alt = os.path.join(root, 'alt_export')
+    shutil.copytree(registry.path(v1), alt)
+    with open(os.path.join(alt, 'models_metadata.json')) as f:
+        meta = json.load(f)
+    meta['calibration'] = {}
+    with open(os.path.join(alt, 'models_metadata.json'), 'w') as f:
+        json.dump(meta, f)
+    v2 = registry.publish(alt, activate=False)
+    shutil.rmtree(alt)
+    results['second_version_new_bytes'] = sum(
+        os.path.getsize(os.path.join(registry.path(v2), n)) for n in os.listdir(registry.path(v2))
+        if os.stat(os.path.join(registry.path(v2), n)).st_nlink == 1)
+
+    server = ModelServer(registry)
+    results['cold_load_ms'], results['warm_ms'] = server.current.load_ms, server.current.warm_ms
+
+    failures, served, latencies = [], set(), []
+
+    def traffic(offset=0):
+        latencies.clear()
+        for i in range(offset, offset + requests):   # distinct patients, so the prediction cache never answers
+            d = server.current
+            t = time.perf_counter()
+            try:
+                d.engine.predict('Voting Ensemble', {**WARMUP_PATIENTS[i % 3], 'chol': 100 + i * 0.1})
+                served.add(d.version)
+            except Exception as e:
+                failures.append(repr(e))
+            latencies.append((time.perf_counter() - t) * 1000)
+
+    traffic()
+    baseline = sorted(latencies)
+    client = threading.Thread(target=traffic, args=(requests,))
+    client.start()
+    swaps = 0
+    while client.is_alive():
+        registry.activate(v2 if server.current.version == v1 else v1)
+        server.poll()
+        swaps += 1
+    client.join()
+    shutil.rmtree(root)
+    results.update({'requests': requests, 'swaps_during_traffic': swaps, 'failed_requests': len(failures),
+                    'versions_served': len(served),
+                    'request_p50_ms_no_swaps': round(float(baseline[len(baseline) // 2]), 2),
+                    'request_p50_ms': round(float(sorted(latencies)[len(latencies) // 2]), 2),
+                    'request_max_ms': round(max(latencies), 2), 'swap_history': server.swaps[-3:]})
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--list', action='store_true')
+    parser.add_argument('--activate', metavar='VERSION')
+    parser.add_argument('--benchmark', action='store_true')
+    args = parser.parse_args()
+
+    registry = ModelRegistry()
+    if args.benchmark:
+        print(json.dumps(benchmark(), indent=2))
+    elif args.activate:
+        registry.activate(args.activate)
+        print(f"Active version: {args.activate}")
+    elif args.list:
+        for m in registry.versions():
+            print(f"{'*' if m['active'] else ' '} {m['version']}  {m['published']}  "
+                  f"{(m.get('training_run') or {}).get('mode', '?')}")
+    else:
+        parser.print_help()
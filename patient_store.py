@@ -0,0 +1,284 @@
+"""
+HeartGuard Pro - Patient Timeline Store
+Embedded SQLite store of every assessment made for an identified patient, written by both
+the REST API and the Streamlit app: inputs, model and model version, probability,
+prediction and the SHAP vector, keyed by (patient_id, ts).
+
+Assessments are clustered on (patient_id, ts), so a patient's trend is one contiguous
+index range. A per-patient summary row (first/last visit, latest risk, visit count) is
+kept by an insert trigger for cohort counts. Window queries across the
+whole cohort ("risk rose by more than 15 points in 90 days") run over an in-process
+columnar copy of (patient, ts, probability), refreshed incrementally from a write sequence
+number, instead of seeking once per patient.
+
+    python patient_store.py --benchmark     load 1M assessments, time trend and cohort queries
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+PATIENT_DB = 'patient_timeline.db'
+FEATURES = ['age', 'sex', 'cp', 'trestbps', 'chol', 'fbs', 'restecg', 'thalach', 'exang', 'oldpeak', 'slope', 'ca', 'thal']
+DAY = 86400.0
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS assessments (
+    patient_id    TEXT NOT NULL,
+    ts            REAL NOT NULL,
+    model         TEXT NOT NULL,
+    model_version TEXT,
+    probability   REAL NOT NULL,
+    prediction    INTEGER NOT NULL,
+    {', '.join(f'{f} REAL' for f in FEATURES)},
+    shap          BLOB,
+    seq           INTEGER NOT NULL,
+    PRIMARY KEY (patient_id, ts, model)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_assessments_seq ON assessments (seq, patient_id, ts, probability);
+CREATE TABLE IF NOT EXISTS patients (
+    patient_id       TEXT PRIMARY KEY,
+    first_ts         REAL NOT NULL,
+    last_ts          REAL NOT NULL,
+    last_probability REAL NOT NULL,
+    n_assessments    INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_patients_last ON patients (last_ts, last_probability, n_assessments);
+CREATE TRIGGER IF NOT EXISTS trg_assessments_summary AFTER INSERT ON assessments BEGIN
+    INSERT INTO patients VALUES (new.patient_id, new.ts, new.ts, new.probability, 1)
+    ON CONFLICT(patient_id) DO UPDATE SET
+        first_ts         = MIN(first_ts, excluded.first_ts),
+        last_probability = CASE WHEN excluded.last_ts >= last_ts THEN excluded.last_probability ELSE last_probability END,
+        last_ts          = MAX(last_ts, excluded.last_ts),
+        n_assessments    = n_assessments + 1;
+END;
+CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT OR IGNORE INTO store_meta VALUES ('seq', 0);
+"""
+
+# A repeated (patient_id, ts, model) is ignored rather than replaced, so rows are only ever
+# appended and the columnar copy can be refreshed by sequence number alone.
+INSERT_ASSESSMENT = (f"INSERT OR IGNORE INTO assessments VALUES "
+                     f"({', '.join('?' * (8 + len(FEATURES)))})")
+
+
+def _row(patient_id, ts, model, model_version, probability, prediction, features, shap_values):
+    shap_blob = None if shap_values is None else np.asarray(shap_values, dtype=np.float32).tobytes()
+    return (str(patient_id), float(ts), model, model_version, float(probability), int(prediction),
+            *(float(features[f]) for f in FEATURES), shap_blob)
+
+
+class PatientStore:
+    """Thread-safe handle on the timeline database; one SQLite connection per thread."""
+
+    def __init__(self, path=PATIENT_DB):
+        self.path = path
+        self._local = threading.local()
+        self._timeline_lock = threading.Lock()
+        self._seq = 0
+        self._ids = pd.Index([], dtype=object)
+        self._cols = {'code': np.zeros(0, np.int32), 'ts': np.zeros(0), 'prob': np.zeros(0)}
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self):
+        con = getattr(self._local, 'con', None)
+        if con is None:
+            con = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            con.execute('PRAGMA journal_mode=WAL')
+            con.execute('PRAGMA synchronous=NORMAL')
+            self._local.con = con
+        return con
+
+    # ── Writing ──────────────────────────────────────────────────────────────
+    def record(self, patient_id, features, probability, prediction, model, model_version=None,
+               shap_values=None, ts=None):
+        """Store one assessment (``probability`` in percent) and update the patient's summary."""
+        self.record_many([(patient_id, time.time() if ts is None else ts, model, model_version,
+                           probability, prediction, features, shap_values)])
+
+    def record_many(self, rows):
+        """Bulk insert of ``(patient_id, ts, model, model_version, probability, prediction, features, shap)`` tuples."""
+        con = self._conn()
+        # IMMEDIATE takes the write lock before the sequence number is read, so concurrent
+        # writers (API workers, app sessions) never share one
+        con.execute('BEGIN IMMEDIATE')
+        try:
+            seq = con.execute("SELECT value + 1 FROM store_meta WHERE key = 'seq'").fetchone()[0]
+            cur = con.executemany(INSERT_ASSESSMENT, [_row(*r) + (seq,) for r in rows])
+            if cur.rowcount:
+                con.execute("UPDATE store_meta SET value = ? WHERE key = 'seq'", (seq,))
+            con.execute('COMMIT')
+        except BaseException:
+            con.execute('ROLLBACK')
+            raise
+
+    # ── Per-patient ──────────────────────────────────────────────────────────
+    @staticmethod
+    def _nullable_version(frame):
+        # assessments by an unversioned (fallback) engine store NULL; keep it None, not NaN,
+        # so the rows stay JSON-serialisable next to versioned ones
+        frame['model_version'] = frame['model_version'].astype(object).where(frame['model_version'].notna(), None)
+        return frame
+
+    def trend(self, patient_id, since=None):
+        """(ts, model, model_version, probability, prediction) for one patient, oldest first."""
+        return self._nullable_version(pd.read_sql_query(
+            'SELECT ts, model, model_version, probability, prediction FROM assessments '
+            'WHERE patient_id = ? AND ts >= ? ORDER BY ts',
+            self._conn(), params=(str(patient_id), -np.inf if since is None else since)))
+
+    def assessments(self, patient_id):
+        """Full rows for one patient, with inputs and SHAP vectors decoded."""
+        frame = pd.read_sql_query('SELECT * FROM assessments WHERE patient_id = ? ORDER BY ts',
+                                  self._conn(), params=(str(patient_id),))
+        frame['shap'] = [None if b is None else np.frombuffer(b, dtype=np.float32) for b in frame['shap']]
+        return self._nullable_version(frame)
+
+    def trend_score(self, patient_id, days=90, now=None):
+        """
+        Change in risk over the last ``days``: first and latest probability in the window,
+        their difference in points and the least-squares slope in points per 30 days (None
+        when the assessments span less than a day).
+        """
+        now = time.time() if now is None else now
+        t = self.trend(patient_id, since=now - days * DAY)
+        t = t[t['ts'] <= now]
+        if t.empty:
+            return None
+        span = t['ts'].iloc[-1] - t['ts'].iloc[0]
+        slope = float(np.polyfit(t['ts'] / (30 * DAY), t['probability'], 1)[0]) if span >= DAY else None
+        return {'patient_id': str(patient_id), 'assessments': len(t),
+                'start_probability': float(t['probability'].iloc[0]),
+                'latest_probability': float(t['probability'].iloc[-1]),
+                'change': float(t['probability'].iloc[-1] - t['probability'].iloc[0]),
+                'slope_per_30d': slope}
+
+    # ── Cohort ───────────────────────────────────────────────────────────────
+    def _timeline(self):
+        """
+        Columnar (patient code, ts, probability) copy of every assessment, ordered by ts and
+        topped up with rows written since the last call. Live writes arrive in time order and
+        are appended; a backfilled batch re-sorts the copy.
+        """
+        with self._timeline_lock:
+            con = self._conn()
+            seq = con.execute("SELECT value FROM store_meta WHERE key = 'seq'").fetchone()[0]
+            if seq != self._seq:
+                new = pd.read_sql_query('SELECT patient_id, ts, probability FROM assessments '
+                                        'WHERE seq > ? AND seq <= ? ORDER BY ts',
+                                        con, params=(self._seq, seq))
+                ids = self._ids.append(pd.Index(new['patient_id'].unique()).difference(self._ids))
+                in_order = not len(self._cols['ts']) or new['ts'].iloc[0] >= self._cols['ts'][-1]
+                cols = {'code': np.concatenate([self._cols['code'], ids.get_indexer(new['patient_id']).astype(np.int32)]),
+                        'ts': np.concatenate([self._cols['ts'], new['ts'].to_numpy(float)]),
+                        'prob': np.concatenate([self._cols['prob'], new['probability'].to_numpy(float)])}
+                if not in_order:
+                    order = np.argsort(cols['ts'], kind='stable')
+                    cols = {c: a[order] for c, a in cols.items()}
+                self._cols, self._ids, self._seq = cols, ids, seq
+            return self._ids, self._cols
+
+    def rising(self, points=15.0, days=90, now=None, limit=None):
+        """
+        Patients whose risk rose by more than ``points`` between their first and latest
+        assessment within the ``days`` before ``now``, largest rise first.
+        """
+        now = time.time() if now is None else now
+        ids, cols = self._timeline()
+        window = slice(np.searchsorted(cols['ts'], now - days * DAY, side='left'),
+                       np.searchsorted(cols['ts'], now, side='right'))
+        # stable sort by patient keeps each patient's rows in time order
+        order = np.argsort(cols['code'][window], kind='stable')
+        code, prob = cols['code'][window][order], cols['prob'][window][order]
+        first = np.flatnonzero(np.r_[True, code[1:] != code[:-1]])
+        last = np.r_[first[1:] - 1, len(code) - 1]
+        rise = prob[last] - prob[first]
+        hit = np.flatnonzero(rise > points)
+        hit = hit[np.argsort(-rise[hit], kind='stable')][:limit]
+        return pd.DataFrame({'patient_id': ids[code[first[hit]]], 'start_probability': prob[first[hit]],
+                             'latest_probability': prob[last[hit]], 'rise': rise[hit]})
+
+    def cohort_summary(self, since=None):
+        """Patient counts and latest-risk distribution, optionally for patients seen since ``since``."""
+        row = self._conn().execute(
+            'SELECT COUNT(*), SUM(n_assessments), AVG(last_probability), '
+            'SUM(last_probability >= 70), SUM(last_probability >= 35 AND last_probability < 70), '
+            'SUM(last_probability < 35) FROM patients WHERE last_ts >= ?',
+            (-np.inf if since is None else since,)).fetchone()
+        keys = ['patients', 'assessments', 'mean_latest_probability', 'high_risk', 'moderate_risk', 'low_risk']
+        return dict(zip(keys, [v or 0 for v in row]))
+
+    def close(self):
+        con = getattr(self._local, 'con', None)
+        if con is not None:
+            con.close()
+            self._local.con = None
+
+
+def benchmark(n_patients=50000, visits=20, path='patient_store_benchmark.db', repeats=5):
+    """Load ``n_patients * visits`` synthetic assessments and time trend and cohort queries."""
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    rng = np.random.default_rng(0)
+    store = PatientStore(path)
+    now = 1.8e9
+    feats = {f: 1.0 for f in FEATURES}
+    shap_values = np.zeros(len(FEATURES))
+
+    t = time.perf_counter()
+    for block in range(0, n_patients, 5000):
+        rows = []
+        for p in range(block, min(block + 5000, n_patients)):
+            ts = np.sort(now - rng.uniform(0, 730, visits) * DAY)
+            prob = np.clip(rng.uniform(5, 60) + np.cumsum(rng.normal(0, 4, visits)), 0, 100)
+            rows.extend((f'P{p:07d}', ts[v], 'Voting Ensemble', 'bench', prob[v], int(prob[v] >= 50), feats, shap_values)
+                        for v in range(visits))
+        store.record_many(rows)
+    load_s = time.perf_counter() - t
+
+    def timed(fn):
+        t = time.perf_counter()
+        for _ in range(repeats):
+            out = fn()
+        return round((time.perf_counter() - t) / repeats * 1000, 2), out
+
+    trend_ms, trend = timed(lambda: store.trend('P0012345'))
+    score_ms, _ = timed(lambda: store.trend_score('P0012345', now=now))
+    cohort_ms, _ = timed(lambda: store.cohort_summary())
+    t = time.perf_counter()
+    store._timeline()
+    snapshot_s = time.perf_counter() - t
+    rising_ms, rising = timed(lambda: store.rising(15, 90, now=now))
+    store.record('P0000001', feats, 50.0, 0, 'Voting Ensemble', 'bench', ts=now)
+    t = time.perf_counter()
+    store.rising(15, 90, now=now)
+    topup_ms = round((time.perf_counter() - t) * 1000, 2)
+    store.close()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    return {'assessments': n_patients * visits, 'patients': n_patients, 'load_s': round(load_s, 1),
+            'trend_ms': trend_ms, 'trend_rows': len(trend), 'trend_score_ms': score_ms,
+            'cohort_summary_ms': cohort_ms, 'columnar_load_s': round(snapshot_s, 2),
+            'rising_15pts_90d_ms': rising_ms, 'rising_matches': len(rising),
+            'rising_after_one_write_ms': topup_ms}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--benchmark', action='store_true')
+    parser.add_argument('--patients', type=int, default=50000)
+    parser.add_argument('--visits', type=int, default=20)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        print(json.dumps(benchmark(args.patients, args.visits), indent=2))
+    else:
+        parser.print_help()
@@ -0,0 +1,321 @@
+"""
+HeartGuard Pro - Request Tracing & Sampling Profiler
+Opt-in timing of where a slow ``/predict`` or intake submit spends its time.
+
+A trace collects per-stage timings for one API request or one app rerun. The API adds it
+to traced responses as a ``Server-Timing`` header and, on ``/predict``, as a ``trace``
+field. The app shows it in a debug panel. Stages are marked with ``stage(name)`` or
+``mark(name)``; with no active trace these return at once, and the API only installs its
+tracing middleware when tracing is switched on. Traced scoring bypasses the engine's
+memo caches, so every stage is actually measured.
+
+The sampler records every thread's Python stack at a fixed interval and writes
+collapsed-stack profiles (``frame;frame;frame count``, the input of flamegraph.pl and
+speedscope) to ``profiles/``.
+
+    HEARTGUARD_TRACE=1          trace every API request and app rerun
+    HEARTGUARD_TRACE=header     trace API requests sent with ``X-HeartGuard-Trace: 1``
+    HEARTGUARD_PROFILE=60       sample stacks every 10 ms; write a profile every 60 s
+
+    python profiling.py --benchmark     cost of a stage with tracing off / on, and of the sampler
+"""
+
+import argparse
+import contextlib
+import contextvars
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+TRACE_ENV = 'HEARTGUARD_TRACE'
+PROFILE_ENV = 'HEARTGUARD_PROFILE'
+TRACE_HEADER = 'X-HeartGuard-Trace'
+PROFILE_DIR = 'profiles'
+SAMPLE_INTERVAL = 0.01
+# leaf frames of threads parked in a wait; left out so profiles show work, not idling
+IDLE_FRAMES = {'threading.py:wait', 'selectors.py:select', 'queue.py:get', 'base_events.py:_run_once',
+               'thread.py:_worker', 'profiling.py:profile_for'}
+
+_active = contextvars.ContextVar('heartguard_trace', default=None)
+_NULL_STAGE = contextlib.nullcontext()
+
+
+def trace_mode():
+    """``'off'``, ``'all'`` or ``'header'`` from ``HEARTGUARD_TRACE``."""
+    value = os.environ.get(TRACE_ENV, '').strip().lower()
+    if value in ('', '0', 'off', 'false', 'no'):
+        return 'off'
+    return 'header' if value == 'header' else 'all'
+
+
+class Trace:
+    """Stage spans of one request or rerun, in milliseconds from its start."""
+
+    def __init__(self):
+        self.t0 = self._lap = time.perf_counter()
+        self.spans = []
+
+    def add(self, name, start, end):
+        self.spans.append((name, (start - self.t0) * 1000, (end - start) * 1000))
+
+    def mark(self, name):
+        """Span from the previous mark (or the start) to now."""
+        now = time.perf_counter()
+        self.add(name, self._lap, now)
+        self._lap = now
+
+    def ordered(self):
+        """Spans by start (enclosing spans first), each with its nesting depth."""
+        spans = sorted(self.spans, key=lambda span: (span[1], -span[2]))
+        return [(n, s, d, sum(1 for _, s2, d2 in spans[:i] if s2 <= s and s + d <= s2 + d2))
+                for i, (n, s, d) in enumerate(spans)]
+
+    def as_dict(self):
+        return {'total_ms': round((time.perf_counter() - self.t0) * 1000, 3),
+                'stages': [{'stage': n, 'start_ms': round(s, 3), 'ms': round(d, 3), 'depth': k}
+                           for n, s, d, k in self.ordered()]}
+
+    def server_timing(self):
+        """``Server-Timing`` header value: one metric per stage."""
+        return ', '.join(f'{i}-{re.sub(r"[^A-Za-z0-9_-]+", "-", n).strip("-")};dur={d:.3f};desc="{n}"'
+                         for i, (n, _, d, _) in enumerate(self.ordered()))
+
+
+class _Span:
+    __slots__ = ('trace', 'name', 'start')
+
+    def __init__(self, trace, name):
+        self.trace, self.name = trace, name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.trace.add(self.name, self.start, time.perf_counter())
+
+
+def current():
+    """The active trace, or None."""
+    return _active.get()
+
+
+def activate(trace):
+    """Make ``trace`` (or None) the active trace of this context; returns the reset token."""
+    return _active.set(trace)
+
+
+def deactivate(token):
+    _active.reset(token)
+
+
+def stage(name):
+    """Context manager timing ``name`` into the active trace; a shared no-op when none is active."""
+    trace = _active.get()
+    return _NULL_STAGE if trace is None else _Span(trace, name)
+
+
+def mark(name):
+    trace = _active.get()
+    if trace is not None:
+        trace.mark(name)
+
+
+# ── Sampling profiler ────────────────────────────────────────────────────────
+class StackSampler:
+    """
+    Samples every other thread's stack each ``interval`` seconds into collapsed-stack
+    counts; with ``period`` set, writes them to ``out_dir`` and starts afresh every
+    ``period`` seconds.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL, period=None, out_dir=PROFILE_DIR):
+        self.interval = interval
+        self.period = period
+        self.out_dir = out_dir
+        self.counts = Counter()
+        self.samples = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        me = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        stacks = []
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(f'{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}')
+                frame = frame.f_back
+            if stack and stack[0] not in IDLE_FRAMES:
+                stack.append(names.get(ident, f'thread-{ident}'))
+                stacks.append(';'.join(reversed(stack)))
+        with self._lock:
+            self.counts.update(stacks)
+            self.samples += 1
+
+    def _run(self):
+        next_flush = time.monotonic() + (self.period or float('inf'))
+        while not self._stop.wait(self.interval):
+            self.sample()
+            if time.monotonic() >= next_flush:
+                self.flush()
+                next_flush += self.period
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self, reset=False):
+        """The profile as collapsed-stack text, most frequent stack first."""
+        with self._lock:
+            text = '\n'.join(f'{stack} {n}' for stack, n in self.counts.most_common())
+            if reset:
+                self.counts.clear()
+                self.samples = 0
+        return text + '\n' if text else ''
+
+    def flush(self):
+        """Write the profile so far to ``out_dir`` and start a new one; returns the path (None if empty)."""
+        text = self.collapsed(reset=True)
+        if not text:
+            return None
+        os.makedirs(self.out_dir, exist_ok=True)
+        path = os.path.join(self.out_dir, f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}.collapsed")
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+
+_env_sampler = None
+_env_lock = threading.Lock()
+
+
+def sampler_from_env():
+    """The process-wide periodic sampler when ``HEARTGUARD_PROFILE`` is set (started once), else None."""
+    global _env_sampler
+    value = os.environ.get(PROFILE_ENV, '').strip()
+    if not value or value == '0':
+        return None
+    with _env_lock:
+        if _env_sampler is None:
+            _env_sampler = StackSampler(period=float(value)).start()
+    return _env_sampler
+
+
+def profile_for(seconds, interval=SAMPLE_INTERVAL):
+    """Collapsed-stack profile of the whole process over the next ``seconds`` seconds."""
+    sampler = StackSampler(interval).start()
+    time.sleep(seconds)
+    sampler.stop()
+    return sampler.collapsed()
+
+
+def benchmark(calls=200000, rows=2000, repeats=20):
+    """
+    Cost of a ``stage`` with no trace active and inside a trace; /predict-path scoring of one
+    patient untraced vs. traced; a batch scoring loop with and without the sampler running.
+    """
+    # the module inference.py imports, not this __main__ copy: the trace must be in its context variable
+    from profiling import Trace, activate, deactivate, stage
+    from inference import load_engine
+    from heart_data import load_training_data, split_holdout
+
+    def per_call_ns(fn):
+        t = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        return round((time.perf_counter() - t) / calls * 1e9, 1)
+
+    def null():
+        with stage('x'):
+            pass
+
+    results = {'stage_ns': {'baseline_empty_call': per_call_ns(lambda: None), 'tracing_off': per_call_ns(null)}}
+    token = activate(Trace())
+    results['stage_ns']['tracing_on'] = per_call_ns(null)
+    deactivate(token)
+
+    engine = load_engine()
+    _, X_test, _, _ = split_holdout(load_training_data(engine.metadata.get('sites')))
+    patients = X_test.to_dict('records')
+    name = 'Voting Ensemble'
+
+    def score_all():
+        for p in patients:
+            engine._score_row(name, engine._key(p))
+
+    def timed_once(fn):
+        t = time.perf_counter()
+        fn()
+        return time.perf_counter() - t
+
+    def timed(fn):
+        fn()
+        t = time.perf_counter()
+        for _ in range(repeats):
+            fn()
+        return (time.perf_counter() - t) / repeats
+
+    def score_all_traced():
+        for p in patients:
+            token = activate(Trace())
+            engine._score_row(name, engine._key(p))
+            deactivate(token)
+
+    untraced = timed(score_all) / len(patients) * 1000
+    traced = timed(score_all_traced) / len(patients) * 1000
+    stages = Trace()
+    token = activate(stages)
+    engine.predict(name, patients[0])
+    engine.interval(name, patients[0])
+    engine.explain(name, patients[0])
+    deactivate(token)
+    results['score_one_patient_ms'] = {'untraced': round(untraced, 3), 'traced': round(traced, 3),
+                                       'example_trace': stages.as_dict()}
+
+    X = X_test.sample(rows, replace=True, random_state=0)
+    batch = lambda: [engine.predict_batch(m, X) for m in engine.models]
+    sampler = StackSampler()
+    plain, sampled = [], []
+    for _ in range(repeats):      # alternate, so drift in machine load hits both sides
+        plain.append(timed_once(batch))
+        sampler.start()
+        sampled.append(timed_once(batch))
+        sampler.stop()
+    t = time.perf_counter()
+    for _ in range(1000):
+        sampler.sample()
+    sample_us = (time.perf_counter() - t) / 1000 * 1e6
+    plain, sampled = sorted(plain)[len(plain) // 2], sorted(sampled)[len(sampled) // 2]
+    results['sampler'] = {'interval_ms': SAMPLE_INTERVAL * 1000, 'cost_per_sample_us': round(sample_us, 1),
+                          'implied_overhead_pct': round(sample_us / (SAMPLE_INTERVAL * 1e6) * 100, 3),
+                          'batch_loop_median_ms': round(plain * 1000, 2), 'batch_loop_sampled_median_ms': round(sampled * 1000, 2),
+                          'top_stacks': sampler.collapsed().splitlines()[:3]}
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--benchmark', action='store_true')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        print(json.dumps(benchmark(), indent=2))
+    else:
+        parser.print_help()
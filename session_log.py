@@ -0,0 +1,216 @@
+"""
+HeartGuard Pro - Session Assessment Log
+Bounded record of the intake assessments made in one app session. The most recent
+entries live in a fixed-size ring buffer of typed NumPy columns; when it fills, the oldest
+block is appended to a local SQLite file, so memory stays flat over a long clinic shift
+while the sidebar can still page back through every assessment and the history view can
+query all sessions at once.
+
+    python session_log.py --benchmark     append / page / query timings and memory per entry
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+import uuid
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+SESSION_DB = 'session_history.db'
+RING_CAPACITY = 256
+SPILL_BLOCK = 64
+
+COLUMNS = {
+    'ts': np.float64,     # epoch seconds
+    'model': np.int8,     # index into SessionLog.models
+    'age': np.int16,
+    'sex': np.int8,       # 1 = male
+    'bp': np.int16,
+    'chol': np.int16,
+    'prob': np.float32,   # percent
+    'result': np.int8,    # 1 = heart disease
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS session_history (
+    session_id TEXT NOT NULL,
+    ts         REAL NOT NULL,
+    model      TEXT NOT NULL,
+    age        INTEGER, sex INTEGER, bp INTEGER, chol INTEGER,
+    prob       REAL, result INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_session_history_session_ts ON session_history (session_id, ts);
+CREATE INDEX IF NOT EXISTS idx_session_history_ts ON session_history (ts);
+"""
+
+
+class SessionLog:
+    """
+    Assessment history for one session. ``capacity`` rows are held in memory; older rows
+    are spilled to ``db_path`` in blocks of ``spill_block``. ``db_path=None`` keeps only the
+    ring buffer (oldest rows are dropped).
+    """
+
+    def __init__(self, capacity=RING_CAPACITY, db_path=SESSION_DB, session_id=None, spill_block=SPILL_BLOCK):
+        self.capacity = capacity
+        self.db_path = db_path
+        self.session_id = session_id or uuid.uuid4().hex
+        self.spill_block = min(spill_block, capacity)
+        self.models = []
+        self._cols = {c: np.zeros(capacity, dtype=t) for c, t in COLUMNS.items()}
+        self._start = 0
+        self._size = 0
+        self._spilled = 0
+        if db_path:
+            with self._connect() as con:
+                con.executescript(SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path)
+
+    def __len__(self):
+        return self._spilled + self._size
+
+    def _model_code(self, name):
+        if name not in self.models:
+            self.models.append(name)
+        return self.models.index(name)
+
+    # ── Writing ──────────────────────────────────────────────────────────────
+    def append(self, model, age, sex, bp, chol, prob, result, ts=None):
+        """Record one assessment; ``sex`` and ``result`` are 0/1 flags, ``prob`` in percent."""
+        if self._size == self.capacity:
+            self._spill(self.spill_block)
+        i = (self._start + self._size) % self.capacity
+        row = dict(ts=time.time() if ts is None else ts, model=self._model_code(model),
+                   age=age, sex=sex, bp=bp, chol=chol, prob=prob, result=result)
+        for c, v in row.items():
+            self._cols[c][i] = v
+        self._size += 1
+
+    def _ordered(self, start, n):
+        """Ring positions of ``n`` rows starting ``start`` rows after the oldest in memory."""
+        return (self._start + start + np.arange(n)) % self.capacity
+
+    def _spill(self, n):
+        idx = self._ordered(0, n)
+        if self.db_path:
+            frame = self._decode(idx)
+            frame.insert(0, 'session_id', self.session_id)
+            with self._connect() as con:
+                con.executemany('INSERT INTO session_history VALUES (?,?,?,?,?,?,?,?,?)',
+                                frame.itertuples(index=False, name=None))
+            self._spilled += n
+        self._start = (self._start + n) % self.capacity
+        self._size -= n
+
+    # ── Reading ──────────────────────────────────────────────────────────────
+    def _decode(self, idx):
+        frame = pd.DataFrame({c: self._cols[c][idx] for c in COLUMNS})
+        frame['model'] = np.array(self.models, dtype=object)[frame['model']] if self.models else ''
+        return frame.astype({'ts': float, 'age': int, 'sex': int, 'bp': int, 'chol': int,
+                             'prob': float, 'result': int})
+
+    def recent(self, n=4):
+        """Newest ``n`` in-memory entries, newest first, as display dicts."""
+        n = min(n, self._size)
+        frame = self._decode(self._ordered(self._size - n, n)[::-1])
+        return [entry(row) for row in frame.to_dict('records')]
+
+    def page(self, page, page_size=25):
+        """Page ``page`` (0 = newest) of this session's assessments, newest first."""
+        lo, hi = page * page_size, (page + 1) * page_size
+        parts = []
+        if lo < self._size:
+            take = min(hi, self._size) - lo
+            parts.append(self._decode(self._ordered(self._size - lo - take, take)[::-1]))
+        if hi > self._size and self._spilled and self.db_path:
+            offset, limit = max(0, lo - self._size), hi - max(lo, self._size)
+            with self._connect() as con:
+                parts.append(pd.read_sql_query(
+                    'SELECT ts, model, age, sex, bp, chol, prob, result FROM session_history '
+                    'WHERE session_id = ? ORDER BY ts DESC LIMIT ? OFFSET ?',
+                    con, params=(self.session_id, limit, offset)))
+        frame = pd.concat(parts, ignore_index=True) if parts else self._decode(np.arange(0))
+        return display_frame(frame)
+
+    def history(self, all_sessions=False, since=None):
+        """Every stored assessment (this session, or all sessions), oldest first, for trend views."""
+        frame = self._decode(self._ordered(0, self._size))
+        frame.insert(0, 'session_id', self.session_id)
+        if self.db_path:
+            where, params = ([], [])
+            if not all_sessions:
+                where.append('session_id = ?'); params.append(self.session_id)
+            if since is not None:
+                where.append('ts >= ?'); params.append(since)
+            sql = 'SELECT * FROM session_history' + (' WHERE ' + ' AND '.join(where) if where else '') + ' ORDER BY ts'
+            with self._connect() as con:
+                frame = pd.concat([pd.read_sql_query(sql, con, params=params), frame], ignore_index=True)
+        if since is not None:
+            frame = frame[frame['ts'] >= since]
+        return frame.reset_index(drop=True)
+
+    def memory_bytes(self):
+        return sum(a.nbytes for a in self._cols.values())
+
+
+def entry(row):
+    """Display dict for one decoded row (the keys the sidebar session log reads)."""
+    return {'timestamp': datetime.fromtimestamp(row['ts']).strftime("%H:%M"), 'model': row['model'],
+            'age': row['age'], 'sex': 'Male' if row['sex'] else 'Female', 'bp': row['bp'], 'chol': row['chol'],
+            'prob_%': round(float(row['prob']), 1), 'result': 'Heart Disease' if row['result'] else 'No Disease'}
+
+
+def display_frame(frame):
+    return pd.DataFrame([entry(r) for r in frame.to_dict('records')],
+                        columns=['timestamp', 'model', 'age', 'sex', 'bp', 'chol', 'prob_%', 'result'])
+
+
+def benchmark(n=20000, db_path='session_log_benchmark.db'):
+    """Append ``n`` assessments, then time paging and a full-history query against a list of dicts."""
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    rng = np.random.default_rng(0)
+    rows = [dict(model=['Voting Ensemble', 'Random Forest'][i % 2], age=int(rng.integers(29, 78)), sex=int(i % 2),
+                 bp=int(rng.integers(94, 200)), chol=int(rng.integers(126, 564)), prob=float(rng.uniform(0, 100)),
+                 result=int(rng.integers(0, 2)), ts=1.7e9 + i * 60) for i in range(n)]
+    log = SessionLog(db_path=db_path)
+
+    t = time.perf_counter()
+    for r in rows:
+        log.append(**r)
+    append_us = (time.perf_counter() - t) / n * 1e6
+
+    timings = {}
+    for label, fn in [('recent(4)', lambda: log.recent(4)), ('page 0', lambda: log.page(0)),
+                      ('page 100', lambda: log.page(100)), ('history', lambda: log.history())]:
+        t = time.perf_counter()
+        for _ in range(5):
+            out = fn()
+        timings[label] = round((time.perf_counter() - t) / 5 * 1000, 2)
+    assert len(out) == n
+
+    dicts = [entry({**r, 'model': r['model']}) for r in rows]
+    list_bytes = sys.getsizeof(dicts) + sum(sys.getsizeof(d) + sum(sys.getsizeof(v) for v in d.values()) for d in dicts)
+    os.remove(db_path)
+    return {'entries': n, 'append_us': round(append_us, 2), 'query_ms': timings,
+            'ring_memory_kb': round(log.memory_bytes() / 1024, 1),
+            'list_of_dicts_memory_kb': round(list_bytes / 1024, 1)}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--benchmark', action='store_true')
+    parser.add_argument('--entries', type=int, default=20000)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        print(json.dumps(benchmark(args.entries), indent=2))
+    else:
+        parser.print_help()
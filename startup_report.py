@@ -0,0 +1,135 @@
+"""
+HeartGuard Pro - Start-up Report
+Wall time, peak RSS and ``python -X importtime`` breakdown of each entry point's start-up,
+measured in fresh interpreters, to keep worker spawns and autoscale events cheap.
+
+Each entry runs ``--runs`` times in a new ``python -X importtime`` process; the run with the
+median wall time is reported. Imports made by the measuring harness itself (e.g. Streamlit's
+AppTest, which ``streamlit run`` has also loaded before the script starts) are not counted.
+Import time is attributed by top-level package (sum of self times), and the slowest imports
+made directly by the entry point are listed with their cumulative time.
+
+    python startup_report.py                                   every entry point
+    python startup_report.py --only api --runs 5
+    python startup_report.py --output before.json              save for a later comparison
+    python startup_report.py --baseline before.json            deltas against a saved report
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+MARKER = '-- startup_report: measuring --'
+RUNS = 3
+TOP_N = 12
+
+# entry point: (harness set-up, measured statement)
+ENTRY_POINTS = {
+    'api': ('', 'import api'),
+    'app': ("from streamlit.testing.v1 import AppTest\n"
+            "at = AppTest.from_file('heart_disease_app.py', default_timeout=600)",
+            "at.run()\nassert not at.exception, at.exception"),
+    'train_models': ('', 'import train_models'),
+    'compact': ('', 'import compact'),
+}
+
+_CHILD = """
+import json, resource, sys, time
+{setup}
+sys.stderr.write({marker!r} + '\\n')
+t = time.perf_counter()
+{statement}
+wall = time.perf_counter() - t
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 ** 2 if sys.platform == 'darwin' else 1024)
+print(json.dumps({{'wall_ms': wall * 1000, 'peak_rss_mb': rss}}))
+"""
+
+
+def parse_importtime(text, marker=MARKER):
+    """``(module, self_us, cumulative_us, depth)`` for every import logged after ``marker``."""
+    if marker in text:
+        text = text.split(marker, 1)[1]
+    records = []
+    for line in text.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        records.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return records
+
+
+def _run_once(entry):
+    setup, statement = ENTRY_POINTS[entry]
+    code = _CHILD.format(setup=setup, statement=statement, marker=MARKER)
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT, capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(f"{entry} failed to start:\n{out.stderr[-2000:]}")
+    return json.loads(out.stdout.strip().splitlines()[-1]), parse_importtime(out.stderr)
+
+
+def measure(entry, runs=RUNS):
+    """Start-up of one entry point: wall time, peak RSS and its import breakdown."""
+    samples = sorted((_run_once(entry) for _ in range(runs)), key=lambda s: s[0]['wall_ms'])
+    stats, records = samples[len(samples) // 2]
+    by_package = Counter()
+    for module, self_us, _, _ in records:
+        by_package[module.split('.')[0]] += self_us
+    top = [r for r in records if r[3] == 0]
+    if len(top) == 1:         # ``import x``: list what x imports
+        top = [r for r in records if r[3] == 1]
+    direct = sorted(top, key=lambda r: -r[2])
+    return {'wall_ms': round(stats['wall_ms'], 1),
+            'wall_ms_runs': [round(s[0]['wall_ms'], 1) for s in samples],
+            'import_ms': round(sum(r[1] for r in records) / 1000, 1),
+            'peak_rss_mb': round(statistics.median(s[0]['peak_rss_mb'] for s in samples), 1),
+            'modules_imported': len(records),
+            'packages_ms': {p: round(us / 1000, 1) for p, us in by_package.most_common(TOP_N)},
+            'packages': sorted(by_package),
+            'slowest_imports_ms': {m: round(c / 1000, 1) for m, _, c, _ in direct[:TOP_N]}}
+
+
+def report(entries=None, runs=RUNS):
+    return {entry: measure(entry, runs) for entry in (entries or ENTRY_POINTS)}
+
+
+def compare(current, baseline):
+    """Per entry point, the change in wall time, import time and peak RSS against ``baseline``."""
+    deltas = {}
+    for entry, cur in current.items():
+        base = baseline.get(entry)
+        if base is None:
+            continue
+        deltas[entry] = {k: {'before': base[k], 'after': cur[k], 'change': round(cur[k] - base[k], 1),
+                             'change_pct': round((cur[k] - base[k]) / base[k] * 100, 1) if base[k] else None}
+                         for k in ('wall_ms', 'import_ms', 'peak_rss_mb', 'modules_imported')}
+        deltas[entry]['packages_no_longer_imported'] = sorted(set(base['packages']) - set(cur['packages']))
+    return deltas
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', help=f"comma-separated entry points ({', '.join(ENTRY_POINTS)})")
+    parser.add_argument('--runs', type=int, default=RUNS)
+    parser.add_argument('--output', help='write the report to this JSON file')
+    parser.add_argument('--baseline', help='earlier report (--output) to compare against')
+    args = parser.parse_args()
+
+    entries = args.only.split(',') if args.only else list(ENTRY_POINTS)
+    unknown = [e for e in entries if e not in ENTRY_POINTS]
+    if unknown:
+        parser.error(f"unknown entry point(s): {', '.join(unknown)}")
+
+    result = report(entries, args.runs)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            result = {'report': result, 'compared_to_baseline': compare(result, json.load(f))}
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,304 @@
+"""
+HeartGuard Pro - Synthetic Cohort Generator
+Synthetic patients at any scale for load testing: the batch path, the KNN index and the
+drift monitor need far more rows than the 297 Cleveland patients.
+
+A Gaussian copula is fitted per class (disease absent / present): every feature's
+empirical marginal, plus the correlation of the features' normal scores. Sampling draws
+correlated normals and maps them back through each marginal. Discrete features (``sex``,
+``cp``, ``fbs``, ``restecg``, ``exang``, ``slope``, ``ca``, ``thal``) invert onto their
+observed codes only. Continuous features interpolate between observed values, clamped to
+the observed range and rounded to the recorded resolution. Rows are generated in
+vectorised chunks. Each shard has its own seed, so a cohort is reproducible shard by
+shard.
+
+The same generator drives an HTTP load test against a running ``api.py``. Worker threads
+with keep-alive connections send a weighted mix of ``/predict``, ``/report``,
+``/report/batch`` and ``/predict/staged`` requests, and latency percentiles are reported
+per endpoint.
+
+    python synthetic.py --rows 10000000 --out synthetic_cohort --format parquet
+    python synthetic.py --load-test http://127.0.0.1:8000 --requests 2000 --concurrency 16 --mix predict=8,report=1,staged=1
+    python synthetic.py --benchmark     generation rate, shard write rate and fidelity to the real cohort
+"""
+
+import argparse
+import http.client
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr, ndtri
+from scipy.stats import rankdata
+
+FEATURES = ['age', 'sex', 'cp', 'trestbps', 'chol', 'fbs', 'restecg', 'thalach', 'exang', 'oldpeak', 'slope', 'ca', 'thal']
+DISCRETE = ['sex', 'cp', 'fbs', 'restecg', 'exang', 'slope', 'ca', 'thal']
+RESOLUTION = {'oldpeak': 0.1}          # continuous features not listed are recorded in whole units
+CHUNK_ROWS = 1_000_000
+SHARD_ROWS = 1_000_000
+OUTPUT_DIR = 'synthetic_cohort'
+RIDGE = 1e-6                           # keeps the normal-score correlation positive definite
+MODEL_NAMES = ['Random Forest', 'Gradient Boosting', 'K-Nearest Neighbors', 'Logistic Regression', 'Voting Ensemble']
+DEFAULT_MIX = {'predict': 8, 'report': 1, 'staged': 1}
+BATCH_PATIENTS = 20
+STAGED_INTAKE = ['age', 'sex', 'cp', 'trestbps']
+
+
+# ── Fitting ──────────────────────────────────────────────────────────────────
+def _fit_class(X):
+    """Marginals and normal-score Cholesky factor for the rows of one class."""
+    n = len(X)
+    scores = ndtri(rankdata(X, axis=0) / (n + 1))
+    corr = np.corrcoef(scores, rowvar=False) + RIDGE * np.eye(X.shape[1])
+    marginals = {}
+    for j, f in enumerate(FEATURES):
+        if f in DISCRETE:
+            codes, counts = np.unique(X[:, j], return_counts=True)
+            marginals[f] = {'codes': codes, 'cdf': np.cumsum(counts) / n}
+        else:
+            marginals[f] = {'values': np.sort(X[:, j]), 'grid': (np.arange(n) + 0.5) / n}
+    return {'n': n, 'cholesky': np.linalg.cholesky(corr), 'marginals': marginals}
+
+
+def fit_copula(df):
+    """Per-class Gaussian copula for a DataFrame of complete rows with ``FEATURES`` and ``target``."""
+    df = df.dropna(subset=FEATURES + ['target'])
+    X = df[FEATURES].to_numpy(dtype=float)
+    X[:, FEATURES.index('oldpeak')] = X[:, FEATURES.index('oldpeak')].round(1)   # float32 cache artefacts
+    y = df['target'].to_numpy(dtype=int)
+    return {'prevalence': float(y.mean()), 'classes': {c: _fit_class(X[y == c]) for c in (0, 1)}}
+
+
+def load_copula(sites=None):
+    from heart_data import parse_sites
+    from heart_data import load_training_data
+    return fit_copula(load_training_data(parse_sites(sites)))
+
+
+# ── Sampling ─────────────────────────────────────────────────────────────────
+def sample(copula, n, rng):
+    """``n`` synthetic patients with a ``target`` column, as a DataFrame."""
+    target = rng.random(n) < copula['prevalence']
+    z = rng.standard_normal((n, len(FEATURES)))
+    u = np.empty_like(z)
+    for c, mask in ((0, ~target), (1, target)):
+        u[mask] = ndtr(z[mask] @ copula['classes'][c]['cholesky'].T)
+    cols = {}
+    for j, f in enumerate(FEATURES):
+        out = np.empty(n)
+        for c, mask in ((0, ~target), (1, target)):
+            m = copula['classes'][c]['marginals'][f]
+            if f in DISCRETE:
+                k = np.minimum(np.searchsorted(m['cdf'], u[mask, j], side='right'), len(m['codes']) - 1)
+                out[mask] = m['codes'][k]
+            else:
+                out[mask] = np.interp(u[mask, j], m['grid'], m['values'])
+        if f in RESOLUTION:
+            cols[f] = (np.round(out / RESOLUTION[f]) * RESOLUTION[f]).astype(np.float32)
+        else:
+            cols[f] = np.round(out).astype(np.int16)
+    cols['target'] = target.astype(np.int8)
+    return pd.DataFrame(cols)
+
+
+def generate(copula, n, seed=0, chunk=CHUNK_ROWS):
+    """Chunks of synthetic patients totalling ``n`` rows."""
+    rng = np.random.default_rng(seed)
+    for start in range(0, n, chunk):
+        yield sample(copula, min(chunk, n - start), rng)
+
+
+def write_shards(copula, n, out_dir=OUTPUT_DIR, fmt='parquet', shard_rows=SHARD_ROWS, seed=0):
+    """Write ``n`` rows as ``synthetic-NNNNN.<fmt>`` shards; returns the shard paths."""
+    import pyarrow as pa
+    import pyarrow.csv as pcsv
+    import pyarrow.parquet as pq
+    os.makedirs(out_dir, exist_ok=True)
+    seeds = np.random.SeedSequence(seed).spawn((n + shard_rows - 1) // shard_rows)
+    paths = []
+    for i, ss in enumerate(seeds):
+        table = pa.Table.from_pandas(sample(copula, min(shard_rows, n - i * shard_rows), np.random.default_rng(ss)),
+                                     preserve_index=False)
+        path = os.path.join(out_dir, f'synthetic-{i:05d}.{fmt}')
+        if fmt == 'parquet':
+            pq.write_table(table, path, compression='zstd')
+        else:
+            pcsv.write_csv(table, path)
+        paths.append(path)
+    return paths
+
+
+# ── HTTP load generation ─────────────────────────────────────────────────────
+def parse_mix(text):
+    """``'predict=8,report=1'`` -> request weights."""
+    mix = {}
+    for part in text.split(','):
+        kind, _, weight = part.partition('=')
+        if kind not in ('predict', 'report', 'batch', 'staged'):
+            raise ValueError(f"Unknown request kind '{kind}' (predict, report, batch, staged)")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+def _patients(copula, n, seed):
+    rows = sample(copula, n, np.random.default_rng(seed)).drop(columns='target')
+    return [{f: (round(float(v), 1) if f == 'oldpeak' else int(v)) for f, v in row.items()} for row in rows.to_dict('records')]
+
+
+def _request(kind, patients, rng, models, batch_size):
+    patient = patients[rng.integers(len(patients))]
+    model = models[rng.integers(len(models))]
+    if kind == 'predict':
+        return 'POST', '/predict?' + urlencode({'model_name': model}), patient
+    if kind == 'report':
+        return 'POST', '/report?' + urlencode({'model_name': model}), patient
+    if kind == 'batch':
+        picks = rng.integers(len(patients), size=batch_size)
+        return 'POST', '/report/batch?' + urlencode({'model_name': model}), {'patients': [patients[i] for i in picks]}
+    known = STAGED_INTAKE + [f for f in FEATURES if f not in STAGED_INTAKE and rng.random() < 0.5]
+    return 'POST', '/predict/staged', {f: patient[f] for f in known}
+
+
+def load_test(url, requests=1000, concurrency=8, mix=None, models=None, batch_size=BATCH_PATIENTS, seed=0,
+              copula=None):
+    """
+    Send ``requests`` requests from ``concurrency`` threads with keep-alive connections.
+    Returns throughput, and per request kind the count, errors and latency percentiles.
+    """
+    mix = mix or DEFAULT_MIX
+    models = models or MODEL_NAMES
+    patients = _patients(copula or load_copula(), 10000, seed)
+    rng = np.random.default_rng(seed)
+    kinds = rng.choice(list(mix), size=requests, p=np.array(list(mix.values())) / sum(mix.values()))
+    plan = [(kind, *_request(kind, patients, rng, models, batch_size)) for kind in kinds]
+    target = urlsplit(url)
+    local = threading.local()
+    latencies = {k: [] for k in mix}
+    errors = {k: 0 for k in mix}
+    lock = threading.Lock()
+
+    def send(item):
+        kind, method, path, body = item
+        if getattr(local, 'conn', None) is None:
+            local.conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=120)
+        t = time.perf_counter()
+        try:
+            local.conn.request(method, path, json.dumps(body), {'Content-Type': 'application/json'})
+            resp = local.conn.getresponse()
+            resp.read()
+            ok = resp.status < 400
+        except (OSError, http.client.HTTPException):
+            local.conn.close()
+            local.conn, ok = None, False
+        ms = (time.perf_counter() - t) * 1000
+        with lock:
+            latencies[kind].append(ms)
+            errors[kind] += not ok
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(send, plan))
+    wall = time.perf_counter() - t0
+
+    per_kind = {}
+    for kind, ms in latencies.items():
+        if ms:
+            p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+            per_kind[kind] = {'requests': len(ms), 'errors': errors[kind], 'p50_ms': round(p50, 2),
+                              'p95_ms': round(p95, 2), 'p99_ms': round(p99, 2), 'max_ms': round(max(ms), 2)}
+    return {'url': url, 'requests': requests, 'concurrency': concurrency, 'wall_s': round(wall, 2),
+            'throughput_rps': round(requests / wall, 1), 'errors': sum(errors.values()), 'endpoints': per_kind}
+
+
+# ── Benchmark ────────────────────────────────────────────────────────────────
+def fidelity(copula, real, n=200000, seed=0):
+    """Synthetic vs. real: domains, class-wise means, rank correlations and train-on-synthetic AUC."""
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import roc_auc_score
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+    from heart_data import split_holdout
+    real = real.dropna(subset=FEATURES)
+    syn = sample(copula, n, np.random.default_rng(seed))
+    outside = {f: int((~syn[f].isin(real[f].round(1).unique())).sum()) for f in DISCRETE}
+    means = {f: {c: [round(float(real.loc[real['target'] == c, f].mean()), 2),
+                     round(float(syn.loc[syn['target'] == c, f].mean()), 2)] for c in (0, 1)}
+             for f in ('age', 'chol', 'thalach', 'oldpeak', 'ca')}
+    corr_gap = np.abs(real[FEATURES].corr('spearman').to_numpy() - syn[FEATURES].corr('spearman').to_numpy()).max()
+
+    X_train, X_test, y_train, y_test = split_holdout(real)
+    lr = make_pipeline(StandardScaler(), LogisticRegression(max_iter=1000))
+    train_copula = fit_copula(pd.concat([X_train, y_train.rename('target')], axis=1))
+    syn_train = sample(train_copula, 20000, np.random.default_rng(seed))
+    auc_real = roc_auc_score(y_test, lr.fit(X_train[FEATURES], y_train).predict_proba(X_test[FEATURES])[:, 1])
+    auc_syn = roc_auc_score(y_test, lr.fit(syn_train[FEATURES], syn_train['target']).predict_proba(X_test[FEATURES])[:, 1])
+    return {'rows': n, 'discrete_values_outside_observed_codes': outside,
+            'class_means_real_vs_synthetic': means, 'max_spearman_correlation_gap': round(float(corr_gap), 3),
+            'held_out_auc_lr_trained_on_real': round(float(auc_real), 3),
+            'held_out_auc_lr_trained_on_synthetic': round(float(auc_syn), 3),
+            'prevalence_real_vs_synthetic': [round(float(real['target'].mean()), 3),
+                                             round(float(syn['target'].mean()), 3)]}
+
+
+def benchmark(rows=10_000_000, shard_rows=SHARD_ROWS, out_dir='synthetic_benchmark'):
+    """Fit time, in-memory generation rate, Parquet / CSV shard write rates and fidelity."""
+    import shutil
+    from heart_data import load_training_data
+    real = load_training_data()
+    t = time.perf_counter()
+    copula = fit_copula(real)
+    fit_ms = (time.perf_counter() - t) * 1000
+
+    t = time.perf_counter()
+    generated = sum(len(chunk) for chunk in generate(copula, rows))
+    gen_s = time.perf_counter() - t
+
+    writes = {}
+    for fmt, n in (('parquet', rows // 2), ('csv', rows // 10)):
+        t = time.perf_counter()
+        paths = write_shards(copula, n, out_dir, fmt, shard_rows)
+        secs = time.perf_counter() - t
+        writes[fmt] = {'rows': n, 'shards': len(paths), 'seconds': round(secs, 2),
+                       'rows_per_minute': int(n / secs * 60),
+                       'bytes_per_row': round(sum(os.path.getsize(p) for p in paths) / n, 2)}
+        shutil.rmtree(out_dir, ignore_errors=True)
+    return {'fit_ms': round(fit_ms, 2), 'generate': {'rows': generated, 'seconds': round(gen_s, 2),
+                                                    'rows_per_minute': int(generated / gen_s * 60)},
+            'write_shards': writes, 'fidelity': fidelity(copula, real)}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, help='synthetic patients to write as shards')
+    parser.add_argument('--out', default=OUTPUT_DIR)
+    parser.add_argument('--format', choices=['parquet', 'csv'], default='parquet')
+    parser.add_argument('--shard-rows', type=int, default=SHARD_ROWS)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--sites', default=None, help="UCI sites to fit on (default: cleveland; 'all' for every site)")
+    parser.add_argument('--load-test', metavar='URL', help='base URL of a running api.py')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--mix', default='predict=8,report=1,staged=1', help='weights of predict, report, batch, staged')
+    parser.add_argument('--models', default=None, help='comma-separated model names (default: all five)')
+    parser.add_argument('--batch-size', type=int, default=BATCH_PATIENTS)
+    parser.add_argument('--benchmark', action='store_true')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        print(json.dumps(benchmark(), indent=2))
+    elif args.load_test:
+        print(json.dumps(load_test(args.load_test, args.requests, args.concurrency, parse_mix(args.mix),
+                                   args.models.split(',') if args.models else None, args.batch_size, args.seed,
+                                   load_copula(args.sites)), indent=2))
+    elif args.rows:
+        t = time.perf_counter()
+        paths = write_shards(load_copula(args.sites), args.rows, args.out, args.format, args.shard_rows, args.seed)
+        print(f"Wrote {args.rows} synthetic patients to {len(paths)} {args.format} shard(s) in {args.out}/ "
+              f"({time.perf_counter() - t:.1f}s)")
+    else:
+        parser.print_help()
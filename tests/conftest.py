@@ -0,0 +1,39 @@
+"""
+Shared fixtures: a scratch copy of the repository data with a freshly trained model suite,
+so tests never touch the exported artifacts in the working tree.
+"""
+
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = 'Heart Disease Data'
+sys.path.insert(0, ROOT)
+
+# enough refits to exercise the bank; the served 200 only narrow the percentiles
+TEST_BOOTSTRAP_MODELS = 10
+
+
+@pytest.fixture(scope='session')
+def trained_dir(tmp_path_factory):
+    """A directory holding the site data and a full train_and_export run (Cleveland)."""
+    import train_models
+
+    path = tmp_path_factory.mktemp('trained')
+    shutil.copytree(os.path.join(ROOT, DATA_DIR), path / DATA_DIR)
+    with pytest.MonkeyPatch.context() as mp:
+        mp.chdir(path)
+        train_models.train_and_export(cases_path='no_labelled_cases.csv', workers=1, n_boot=TEST_BOOTSTRAP_MODELS)
+    return path
+
+
+@pytest.fixture
+def workspace(trained_dir, tmp_path, monkeypatch):
+    """A private copy of ``trained_dir`` as the working directory."""
+    path = tmp_path / 'workspace'
+    shutil.copytree(trained_dir, path)
+    monkeypatch.chdir(path)
+    return path
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import profiling
+from compact import CompactScorer, build_compact
+from inference import FEATURES, load_engine
+from heart_data import load_training_data, split_holdout
+
+# pulls probabilities down, so many rows sit above 0.5 raw and below it calibrated
+SHIFTED = {'method': 'platt', 'a': 1.0, 'b': -1.0}
+
+
+@pytest.fixture
+def engine(workspace):
+    return load_engine()
+
+
+@pytest.fixture
+def rows(engine):
+    X_train, X_test, _, _ = split_holdout(load_training_data(engine.metadata.get('sites')))
+    return pd.concat([X_train, X_test], ignore_index=True)[FEATURES]
+
+
+@pytest.mark.parametrize('shifted', [False, True], ids=['stored', 'shifted'])
+def test_class_follows_calibrated_probability(engine, rows, shifted):
+    if shifted:
+        engine.calibration = {name: SHIFTED for name in engine.models}
+        engine.clear_cache()
+    flips = 0
+    for name, model in engine.models.items():
+        probs, preds = engine.predict_batch(name, rows)
+        np.testing.assert_array_equal(preds, (probs >= 50).astype(int))
+        flips += int((model.predict(engine.scaler.transform(rows)) != preds).sum())
+
+        single = [engine.predict(name, feat) for feat in rows.iloc[:40].to_dict('records')]
+        token = profiling.activate(profiling.Trace())
+        try:
+            traced = [engine.predict(name, feat) for feat in rows.iloc[:40].to_dict('records')]
+        finally:
+            profiling.deactivate(token)
+        for (p, y), (tp, ty), bp, by in zip(single, traced, probs[:40], preds[:40]):
+            assert y == ty == by == int(p >= 50)
+            assert p == pytest.approx(bp) and tp == pytest.approx(bp)
+    if shifted:
+        assert flips > 0        # the raw models disagree, so the check above is not vacuous
+
+
+def test_compact_scorer_uses_the_same_rule(engine, rows):
+    calibration = {name: SHIFTED for name in engine.models}
+    engine.calibration = calibration
+    arrays, _ = build_compact(engine.models, engine.scaler, rows, calibration)
+    scorer = CompactScorer(arrays=arrays)
+    for name in engine.models:
+        probs, preds = scorer.predict(name, rows)
+        np.testing.assert_array_equal(preds, (probs >= 50).astype(int))
+        engine_probs, engine_preds = engine.predict_batch(name, rows)
+        clear = np.abs(engine_probs - 50) > 0.1      # beyond the compact export's resolution
+        np.testing.assert_array_equal(preds[clear], engine_preds[clear])
+
+
+def test_exported_metrics_describe_the_served_predictions(engine):
+    _, X_test, _, y_test = split_holdout(load_training_data(engine.metadata.get('sites')))
+    for name, stats in engine.metadata['models'].items():
+        _, preds = engine.predict_batch(name, X_test)
+        y = np.asarray(y_test)
+        assert stats['accuracy'] == pytest.approx(float((preds == y).mean()), abs=1e-4)
+        tn, fp, fn, tp = (int(((preds == p) & (y == t)).sum()) for t, p in ((0, 0), (0, 1), (1, 0), (1, 1)))
+        assert stats['confusion_matrix'] == [[tn, fp], [fn, tp]]
@@ -0,0 +1,17 @@
+import io
+import zipfile
+
+from clinical_report import render_batch_zip, report_filename
+
+
+def test_patient_id_cannot_shape_the_file_name():
+    assert report_filename('P-001.a_b') == 'HeartGuard_Report_P-001.a_b.pdf'
+    assert report_filename('../x"; y\r\n/z') == 'HeartGuard_Report_.._x___y___z.pdf'
+
+
+def test_batch_zip_members_use_sanitised_ids():
+    report = {'patient_id': '../../etc/passwd', 'features': {'age': 54.0}, 'probability': 40.0, 'prediction': 0,
+              'shap': [0.1], 'recommendations': []}
+    f, _ = render_batch_zip([report], 'Voting Ensemble', workers=1)
+    with zipfile.ZipFile(io.BytesIO(f.read())) as zf:
+        assert zf.namelist() == ['HeartGuard_Report_.._.._etc_passwd.pdf']
@@ -0,0 +1,27 @@
+import json
+import os
+
+import pytest
+
+import train_models
+from compact import COMPACT_FILE
+from heart_data import load_training_data, split_holdout
+from inference import load_engine
+
+ARTIFACTS = ['scaler.pkl', 'models_metadata.json', 'model_metadata.json', COMPACT_FILE,
+             'model_logistic_regression.pkl', 'model_voting_ensemble.pkl']
+
+
+def test_failed_export_writes_nothing(workspace):
+    with open('models_metadata.json') as f:
+        metadata = json.load(f)
+    before = {name: os.stat(name).st_mtime_ns for name in ARTIFACTS}
+    engine = load_engine()
+    df = load_training_data(metadata['sites'])
+    X_train, X_test, _, _ = split_holdout(df)
+
+    # a scaled array where the raw frame belongs: the compact export cannot check against it
+    with pytest.raises(TypeError):
+        train_models.export_models(engine.models, engine.scaler, metadata['models'], df,
+                                   engine.scaler.transform(X_train), X_test, metadata['training_run'])
+    assert {name: os.stat(name).st_mtime_ns for name in ARTIFACTS} == before
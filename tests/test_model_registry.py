@@ -0,0 +1,72 @@
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from experiments import ExperimentRouter
+from model_registry import EXPERIMENT_FILE, MANIFEST_FILE, ModelRegistry
+
+
+def fake_versions(registry, n):
+    """``n`` published versions v0 (oldest) .. v{n-1} with bare manifests."""
+    for i in range(n):
+        os.makedirs(registry.path(f'v{i}'))
+        with open(os.path.join(registry.path(f'v{i}'), MANIFEST_FILE), 'w') as f:
+            json.dump({'version': f'v{i}', 'published': f'2026-01-{i + 1:02d}T00:00:00', 'files': {}}, f)
+    return [f'v{i}' for i in range(n)]
+
+
+def write_experiment(registry, shadow=None, split=None):
+    with open(os.path.join(registry.root, EXPERIMENT_FILE), 'w') as f:
+        json.dump({'shadow': shadow, 'split': split or {}}, f)
+
+
+def names(registry):
+    return sorted(m['version'] for m in registry.versions())
+
+
+def test_prune_keeps_newest_active_and_experiment_arms(tmp_path):
+    registry = ModelRegistry(str(tmp_path / 'registry'))
+    fake_versions(registry, 8)
+    registry.activate('v1')
+    write_experiment(registry, shadow='v2', split={'v3': 10})
+    registry.prune(keep=2)
+    assert names(registry) == ['v1', 'v2', 'v3', 'v6', 'v7']
+
+    write_experiment(registry)
+    registry.prune(keep=2)
+    assert names(registry) == ['v1', 'v6', 'v7']
+
+
+def test_rollback_steps_to_the_previously_published_version(tmp_path):
+    registry = ModelRegistry(str(tmp_path / 'registry'))
+    fake_versions(registry, 3)
+    registry.activate('v2')
+    assert registry.previous() == 'v1'
+    registry.activate(registry.previous())
+    assert registry.active() == 'v1' and registry.previous() == 'v0'
+    registry.activate('v0')
+    assert registry.previous() is None
+    with pytest.raises(KeyError):
+        registry.activate('missing')
+
+
+def test_publish_is_content_addressed(workspace):
+    registry = ModelRegistry('registry_test')
+    version = registry.publish(keep=1)
+    assert registry.publish(keep=1) == version
+    assert registry.active() == version
+    assert names(registry) == [version]
+
+
+def test_missing_experiment_arm_is_skipped(workspace):
+    registry = ModelRegistry('registry_test')
+    version = registry.publish()
+    write_experiment(registry, shadow='gone', split={version: 20})
+    server = SimpleNamespace(registry=registry, hooks=[], current=None)
+
+    router = ExperimentRouter(server, db_path='experiment_test.db')     # refreshes once; must not raise
+    assert router.status()['loaded_arms'] == [version]
+    assert list(router.arm_errors) == ['gone']
+    assert server.hooks == [router.refresh]
@@ -0,0 +1,12 @@
+import numpy as np
+
+from train_models import build_base_models, fit_base_models
+
+
+def test_forest_gets_the_cores_left_by_the_pool():
+    rng = np.random.default_rng(0)
+    X, y = rng.normal(size=(60, 4)), np.tile([0, 1], 30)
+    fitted, seconds = fit_base_models(build_base_models(), X, y, workers=6)
+    assert set(seconds) == set(fitted)
+    assert fitted['Random Forest'].n_jobs == 6 - (len(fitted) - 1)
+    assert fitted['K-Nearest Neighbors'].n_jobs == 1
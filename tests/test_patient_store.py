@@ -0,0 +1,17 @@
+import json
+
+from model_registry import WARMUP_PATIENTS
+from patient_store import PatientStore
+
+
+def test_unversioned_assessment_stays_json_serialisable(tmp_path):
+    store = PatientStore(str(tmp_path / 'timeline.db'))
+    feat = WARMUP_PATIENTS[0]
+    store.record('P1', feat, 41.0, 0, 'Voting Ensemble', None, ts=1.0)          # fallback engine: no version
+    store.record('P1', feat, 55.0, 1, 'Voting Ensemble', 'a1b2c3d4e5f6', ts=2.0)
+    store.record('P1', feat, 62.5, 1, 'Voting Ensemble', 'a1b2c3d4e5f6', ts=3.0)
+
+    trend = store.trend('P1')
+    assert trend['model_version'].tolist() == [None, 'a1b2c3d4e5f6', 'a1b2c3d4e5f6']
+    json.dumps(trend.to_dict('records'), allow_nan=False)
+    assert store.assessments('P1')['model_version'].iloc[0] is None
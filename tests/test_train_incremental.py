@@ -0,0 +1,39 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+import train_models
+from compact import CompactScorer
+from conftest import DATA_DIR
+from heart_data import load_training_data, split_holdout
+from inference import load_engine
+
+
+def labelled_cases(path, n=30):
+    cases = pd.read_csv(os.path.join(DATA_DIR, 'processed.switzerland.data'),
+                        names=train_models.COLUMN_NAMES, na_values='?')
+    cases = cases.fillna(cases.median(numeric_only=True)).head(n)
+    cases.to_csv(path, index=False)
+    return cases
+
+
+def test_incremental_run_exports_and_publishes(workspace):
+    cases = labelled_cases('cases.csv')
+    train_models.train_incremental(cases_path='cases.csv', workers=1)
+
+    with open('models_metadata.json') as f:
+        metadata = json.load(f)
+    assert metadata['training_run']['mode'] == 'incremental'
+    assert metadata['train_size'] == len(split_holdout(load_training_data())[0]) + 30
+    assert metadata['compact']['check_rows'] == metadata['train_size'] + metadata['test_size']
+    assert train_models.load_training_state()['cases_consumed'] == 30
+
+    engine = load_engine()
+    scorer = CompactScorer()
+    feat = cases.drop(columns='target').iloc[0].to_dict()
+    for name in engine.models:
+        prob, pred = engine.predict(name, feat)
+        compact_prob, _ = scorer.predict(name, pd.DataFrame([feat]))
+        assert compact_prob[0] == pytest.approx(prob, abs=0.1)
@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import uci_raw
+from conftest import DATA_DIR, ROOT
+
+DATA = os.path.join(ROOT, DATA_DIR)
+
+
+def write_raw(records, path, per_line=8):
+    """Records back in the UCI layout: values wrapped over several lines, the name closing each record."""
+    with open(path, 'w') as f:
+        for rec in records:
+            tokens = ['-9' if np.isnan(v) else f'{v:.9g}' for v in (float(rec[n]) for n in records.dtype.names[:-1])]
+            tokens.append(str(rec['name']))
+            f.writelines(' '.join(tokens[i:i + per_line]) + '\n' for i in range(0, len(tokens), per_line))
+
+
+@pytest.mark.parametrize('name', ['hungarian.data', 'switzerland.data', 'long-beach-va.data'])
+def test_raw_round_trip(name, tmp_path):
+    records = uci_raw.read_raw(os.path.join(DATA, name))
+    out = tmp_path / name
+    write_raw(records, out)
+    again = uci_raw.read_raw(out, chunk_records=17)
+    assert again.dtype == records.dtype
+    for field in records.dtype.names:
+        if records.dtype[field].kind == 'f':
+            np.testing.assert_array_equal(again[field], records[field])
+        else:
+            assert (again[field] == records[field]).all()
+
+
+def test_processed_files_match_raw_with_documented_edits():
+    report = uci_raw.verify_against_processed(DATA)
+    assert len(report) == len(uci_raw.PROCESSED_PAIRS)
+    for entry in report.values():
+        assert entry['matching_rows'] == entry['raw_records'] == entry['processed_rows']
+    assert report['hungarian.data vs reprocessed.hungarian.data']['upstream_edited_values'] == 0
+
+
+def test_undocumented_difference_fails(tmp_path):
+    data = tmp_path / 'data'
+    data.mkdir()
+    for raw, proc, *_ in uci_raw.PROCESSED_PAIRS:
+        for name in (raw, proc):
+            if not (data / name).exists():
+                (data / name).write_bytes(open(os.path.join(DATA, name), 'rb').read())
+    proc = pd.read_csv(data / 'processed.switzerland.data', header=None, na_values='?')
+    proc.iloc[0, 0] += 1          # age of one patient
+    proc.to_csv(data / 'processed.switzerland.data', header=False, index=False, na_rep='?')
+    with pytest.raises(ValueError, match='processed.switzerland.data'):
+        uci_raw.verify_against_processed(data)
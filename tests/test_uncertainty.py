@@ -0,0 +1,46 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from sklearn.dummy import DummyClassifier
+from sklearn.ensemble import RandomForestClassifier, VotingClassifier
+from sklearn.preprocessing import StandardScaler
+
+from train_models import assemble_ensemble, train_and_export
+from uncertainty import UncertaintyEstimator, UNCERTAINTY_BANK_FILE
+
+
+def fitted(p):
+    """A member that always answers probability ``p``."""
+    return DummyClassifier(strategy='prior').fit(np.zeros((10, 1)), [1] * round(p * 10) + [0] * (10 - round(p * 10)))
+
+
+def test_ensemble_range_ignores_zero_weight_members():
+    members = {'Random Forest': fitted(0.3), 'Gradient Boosting': fitted(0.4),
+               'K-Nearest Neighbors': fitted(0.9), 'Logistic Regression': fitted(0.5)}
+    ensemble = assemble_ensemble(members, np.array([0, 1]), weights=[1, 1, 0, 1])
+    X = pd.DataFrame({'x': [0.0]})
+    out = UncertaintyEstimator({'Voting Ensemble': ensemble}, StandardScaler().fit(X)).intervals('Voting Ensemble', X)
+    assert out['probability'][0] == np.float64(40.0)
+    assert (out['low'][0], out['high'][0]) == (30.0, 50.0)
+
+
+def test_forest_interval_is_the_vote_spread():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(200, 3)), columns=['a', 'b', 'c'])
+    y = (X['a'] + rng.normal(scale=1.0, size=200) > 0).astype(int)
+    scaler = StandardScaler().fit(X)
+    rf = RandomForestClassifier(n_estimators=50, random_state=0).fit(scaler.transform(X), y)
+    out = UncertaintyEstimator({'Random Forest': rf}, scaler).intervals('Random Forest', X.iloc[:20])
+    votes = np.stack([t.predict_proba(scaler.transform(X.iloc[:20]))[:, 1] for t in rf.estimators_], axis=1)
+    np.testing.assert_allclose(out['spread'], votes.std(axis=1) * 100)
+
+
+def test_bootstrap_zero_skips_the_bank(workspace):
+    assert os.path.exists(UNCERTAINTY_BANK_FILE)
+    run = train_and_export(cases_path='no_labelled_cases.csv', workers=1, n_boot=0)
+    assert 'fit: uncertainty bank' in run['stage_seconds']
+    assert not os.path.exists(UNCERTAINTY_BANK_FILE)
+    with open('models_metadata.json') as f:
+        assert 'uncertainty' not in json.load(f)
@@ -1,133 +1,325 @@
 """
 HeartGuard Pro - Multi-Model Training Engine
 Trains, evaluates, and exports multiple ML models (Random Forest, Gradient Boosting, KNN, Logistic Regression, Soft Voting Ensemble)
-on the clean UCI Cleveland Heart Disease Dataset.
+on the clean UCI Cleveland Heart Disease Dataset, optionally pooled with the Hungarian,
+Switzerland and Long Beach VA sites (--sites).
+
+The four base models are fitted once, concurrently in a process pool, and the soft-voting
+ensemble is assembled from those fitted members rather than refitting clones of them.
+
+Two modes are supported:
+  python train_models.py                  full retrain of all five models from scratch
+  python train_models.py --incremental    fold newly labelled cases into the exported models,
+                                          falling back to a full retrain when one is due
+  python train_models.py --bootstrap 0    full retrain without the (slowest) uncertainty bank stage
 """
 
+import argparse
+import copy
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
 import pandas as pd
 import numpy as np
 import joblib
 import json
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier, VotingClassifier
-from sklearn.neighbors import KNeighborsClassifier
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score, confusion_matrix
+from sklearn.preprocessing import StandardScaler, LabelEncoder
+from sklearn.ensemble import VotingClassifier
+from sklearn.metrics import (accuracy_score, precision_score, recall_score, f1_score, roc_auc_score, confusion_matrix,
+                             roc_curve, precision_recall_curve)
+from sklearn.utils import Bunch
 import warnings
 
+from heart_data import load_training_data, split_holdout, parse_sites, DEFAULT_SITES, FEATURES
+from acquisition import fit_acquisition, ACQUISITION_MODEL_FILE
+from uncertainty import fit_bank, load_bank, BOOTSTRAP_MODELS, UNCERTAINTY_BANK_FILE
+from calibration import calibrate, decide, fit_calibrators, calibration_report, reliability
+from model_registry import ModelRegistry, file_sha1
+from drift import reference_bins
+from compact import build_compact, write_compact
+from tuning import BASE_ESTIMATORS, dataset_hash
+
 warnings.filterwarnings('ignore')
 
-def train_and_export():
-    print("Starting Multi-Model Training Engine...")
+COLUMN_NAMES = FEATURES + ['target']
 
-    # Load UCI Cleveland dataset
-    url = 'https://archive.ics.uci.edu/ml/machine-learning-databases/heart-disease/processed.cleveland.data'
-    column_names = ['age', 'sex', 'cp', 'trestbps', 'chol', 'fbs', 'restecg', 'thalach', 'exang', 'oldpeak', 'slope', 'ca', 'thal', 'target']
-    
-    try:
-        df = pd.read_csv(url, names=column_names, na_values='?')
-        print("Downloaded UCI Cleveland dataset.")
-    except Exception as e:
-        print(f"Could not load from URL, trying local fallback: {e}")
-        df = pd.read_csv('Heart Disease Data/processed.cleveland.data', names=column_names, na_values='?')
-
-    # Clean dataset (drop NaNs and convert target to binary 0/1)
-    df = df.dropna().reset_index(drop=True)
-    df['target'] = (df['target'] > 0).astype(int)
-
-    X = df.drop('target', axis=1)
-    y = df['target']
+# Locally labelled cases (same 14 columns as the UCI file) are appended here between runs
+LABELLED_CASES_FILE = 'labelled_cases.csv'
+TRAINING_STATE_FILE = 'training_state.json'
+FULL_RETRAIN_INTERVAL_DAYS = 7
+RF_TREES_PER_INCREMENT = 10
+TRAINING_HISTORY_LIMIT = 50
+TRAINING_WORKERS = os.cpu_count() or 1
 
-    # Train/Test Split (80% train, 20% test)
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+# Held-out ROC/PR points, calibration bins and threshold tables, keyed by model file hash
+EVALUATION_CURVES_FILE = 'evaluation_curves.json'
+CALIBRATION_BINS = 10
+THRESHOLD_GRID = [round(t, 2) for t in np.arange(0.05, 1.0, 0.05)]
 
-    # Standard Scaler
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
 
-    # Instantiate Models
-    models = {
-        'Random Forest': RandomForestClassifier(n_estimators=100, random_state=42),
-        'Gradient Boosting': GradientBoostingClassifier(n_estimators=100, random_state=42),
-        'K-Nearest Neighbors': KNeighborsClassifier(n_neighbors=7),
-        'Logistic Regression': LogisticRegression(random_state=42)
+def load_labelled_cases(path=LABELLED_CASES_FILE, start=0):
+    """Rows ``start:`` of the local labelled-cases CSV, cleaned like the UCI data."""
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=COLUMN_NAMES)
+    cases = pd.read_csv(path, na_values='?')
+    missing = [c for c in COLUMN_NAMES if c not in cases.columns]
+    if missing:
+        raise ValueError(f"{path} is missing columns: {missing}")
+    cases = cases[COLUMN_NAMES].iloc[start:].dropna().reset_index(drop=True)
+    cases['target'] = (cases['target'] > 0).astype(int)
+    return cases
+
+
+def count_labelled_cases(path=LABELLED_CASES_FILE):
+    if not os.path.exists(path):
+        return 0
+    return len(pd.read_csv(path, usecols=[0]))
+
+
+def load_training_state(path=TRAINING_STATE_FILE):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_training_state(state, path=TRAINING_STATE_FILE):
+    state['history'] = state.get('history', [])[-TRAINING_HISTORY_LIMIT:]
+    with open(path, 'w') as f:
+        json.dump(state, f, indent=2)
+
+
+def full_retrain_due(state, interval_days=FULL_RETRAIN_INTERVAL_DAYS):
+    if not state or 'last_full_retrain' not in state:
+        return True
+    last = datetime.fromisoformat(state['last_full_retrain'])
+    return datetime.now() - last >= timedelta(days=interval_days)
+
+
+def build_base_models(tuned=None):
+    """Base models at their default settings, overridden by tuned parameters when given."""
+    models = {name: make() for name, make in BASE_ESTIMATORS.items()}
+    for name, info in (tuned or {}).items():
+        if name in models:
+            models[name].set_params(**info['params'])
+    return models
+
+
+def _fit_timed(name, model, X, y):
+    t = time.perf_counter()
+    model.fit(X, y)
+    return name, model, time.perf_counter() - t
+
+
+def fit_base_models(models, X, y, workers=TRAINING_WORKERS):
+    """
+    Fit independent models, concurrently in a process pool when ``workers > 1``.
+    Returns the fitted models and the fit time of each (measured inside its worker).
+    In the pool, the Random Forest grows its trees on the cores the other models leave free.
+    """
+    fitted, seconds = {}, {}
+    if workers <= 1:
+        for name, model in models.items():
+            print(f"Training {name}...")
+            name, model, secs = _fit_timed(name, model, X, y)
+            fitted[name], seconds[name] = model, secs
+        return fitted, seconds
+
+    # one model per process; only the forest parallelises its own fit, so it alone keeps n_jobs,
+    # sized to the cores left over once every other model has a process
+    rf_jobs = max(1, workers - (len(models) - 1))
+    for name, model in models.items():
+        if 'n_jobs' in model.get_params():
+            model.set_params(n_jobs=rf_jobs if name == 'Random Forest' else 1)
+    print(f"Training {', '.join(models)} across {min(workers, len(models))} worker processes "
+          f"(Random Forest: {rf_jobs} threads)...")
+    with ProcessPoolExecutor(max_workers=min(workers, len(models))) as pool:
+        futures = [pool.submit(_fit_timed, name, model, X, y) for name, model in models.items()]
+        for future in futures:
+            name, model, secs = future.result()
+            fitted[name], seconds[name] = model, secs
+    return fitted, seconds
+
+
+def assemble_ensemble(base_models, classes, weights=None):
+    """Soft-voting ensemble over already-fitted base models, without refitting them."""
+    named = [('rf', base_models['Random Forest']), ('gb', base_models['Gradient Boosting']),
+             ('knn', base_models['K-Nearest Neighbors']), ('lr', base_models['Logistic Regression'])]
+    ensemble = VotingClassifier(estimators=named, voting='soft', weights=weights)
+    ensemble.le_ = LabelEncoder().fit(classes)
+    ensemble.classes_ = ensemble.le_.classes_
+    ensemble.estimators_ = [est for _, est in named]
+    ensemble.named_estimators_ = Bunch(**dict(named))
+    return ensemble
+
+
+def reproject_to_scaler(models, old_scaler, new_scaler):
+    """
+    Rewrite fitted models so they give the same outputs under ``new_scaler``.
+    Standardisation is a per-feature affine map, so LR weights map exactly and tree
+    split thresholds map up to float32 rounding at the split boundary. KNN reference
+    points are moved too, but neighbours are then searched under the updated scaling.
+    """
+    ratio = new_scaler.scale_ / old_scaler.scale_
+    shift = (new_scaler.mean_ - old_scaler.mean_) / old_scaler.scale_
+
+    def old_to_new(z, feat):
+        return (z - shift[feat]) / ratio[feat]
+
+    def remap_tree(tree):
+        internal = tree.tree_.feature >= 0
+        feats = tree.tree_.feature[internal]
+        tree.tree_.threshold[internal] = old_to_new(tree.tree_.threshold[internal], feats)
+
+    rf = models['Random Forest']
+    for tree in rf.estimators_:
+        remap_tree(tree)
+
+    gb = models['Gradient Boosting']
+    for tree in gb.estimators_.ravel():
+        remap_tree(tree)
+
+    lr = models['Logistic Regression']
+    lr.intercept_ = lr.intercept_ + lr.coef_ @ shift
+    lr.coef_ = lr.coef_ * ratio
+
+    knn = models['K-Nearest Neighbors']
+    ref_X = (knn._fit_X - shift) / ratio
+    knn.fit(ref_X, knn.classes_[knn._y])
+
+
+def evaluate_model(name, model, X_test_scaled, y_test, df, calibration=None):
+    """Held-out metrics of the served predictions: calibrated probabilities (``calibration`` table) and their class."""
+    y_proba = calibrate(calibration, model.predict_proba(X_test_scaled)[:, 1])
+    y_pred = decide(y_proba)
+
+    acc = accuracy_score(y_test, y_pred)
+    prec = precision_score(y_test, y_pred)
+    rec = recall_score(y_test, y_pred)
+    f1 = f1_score(y_test, y_pred)
+    auc = roc_auc_score(y_test, y_proba)
+    cm = confusion_matrix(y_test, y_pred).tolist()
+
+    # Extract feature importances if available
+    if hasattr(model, 'feature_importances_'):
+        feat_imp = model.feature_importances_.tolist()
+    elif name == 'Logistic Regression':
+        feat_imp = np.abs(model.coef_[0]).tolist()
+    else:
+        # Correlation-based proxy for distance models
+        feat_imp = np.abs(df[FEATURES + ['target']].corr()['target'].drop('target').values).tolist()
+
+    # Normalize feature importances
+    sum_imp = sum(feat_imp) if sum(feat_imp) > 0 else 1.0
+    feat_imp = [round(x / sum_imp, 4) for x in feat_imp]
+
+    print(f"   {name:20} -> Accuracy: {acc*100:.1f}%, AUC: {auc:.3f}, F1: {f1:.3f}")
+
+    return {
+        'accuracy': round(acc, 4),
+        'precision': round(prec, 4),
+        'recall': round(rec, 4),
+        'f1_score': round(f1, 4),
+        'roc_auc': round(auc, 4),
+        'confusion_matrix': cm,
+        'filename': f"model_{name.lower().replace(' ', '_')}.pkl",
+        'feature_importance': dict(zip(FEATURES, feat_imp))
+    }
+
+
+def evaluation_curves(model, X_test_scaled, y_test, calibration=None):
+    """
+    ROC and PR curve points and a threshold table of the calibrated (served) probabilities
+    on the held-out split, plus reliability bins of the raw output.
+    """
+    y_test = np.asarray(y_test)
+    raw = model.predict_proba(X_test_scaled)[:, 1]
+    y_proba = calibrate(calibration, raw)
+    r4 = lambda a: np.round(np.asarray(a, dtype=float), 4).tolist()
+
+    fpr, tpr, roc_thr = roc_curve(y_test, y_proba)
+    precision, recall, _ = precision_recall_curve(y_test, y_proba)
+
+    bins = reliability(y_test, raw, CALIBRATION_BINS)
+
+    table = []
+    for thr in THRESHOLD_GRID:
+        pred = y_proba >= thr
+        tp, fp = int((pred & (y_test == 1)).sum()), int((pred & (y_test == 0)).sum())
+        fn, tn = int((~pred & (y_test == 1)).sum()), int((~pred & (y_test == 0)).sum())
+        table.append({'threshold': thr, 'tp': tp, 'fp': fp, 'tn': tn, 'fn': fn,
+                      'sensitivity': round(tp / max(tp + fn, 1), 4), 'specificity': round(tn / max(tn + fp, 1), 4),
+                      'precision': round(tp / max(tp + fp, 1), 4), 'accuracy': round((tp + tn) / len(y_test), 4)})
+
+    return {
+        'roc': {'fpr': r4(fpr), 'tpr': r4(tpr), 'thresholds': r4(np.clip(roc_thr, 0, 1))},
+        'pr': {'precision': r4(precision), 'recall': r4(recall)},
+        'calibration': bins,
+        'thresholds': table,
+        'test_size': int(len(y_test)),
     }
 
-    # Add Soft Voting Ensemble
-    ensemble = VotingClassifier(
-        estimators=[
-            ('rf', models['Random Forest']),
-            ('gb', models['Gradient Boosting']),
-            ('knn', models['K-Nearest Neighbors']),
-            ('lr', models['Logistic Regression'])
-        ],
-        voting='soft'
-    )
-    models['Voting Ensemble'] = ensemble
-
-    # Train and Evaluate
-    results = {}
-    model_files = {}
 
+def export_evaluation_curves(models, results, X_test_scaled, y_test, calibration=None, path=EVALUATION_CURVES_FILE):
+    """Write held-out curves for every exported model, keyed by the hash of its pickle."""
+    curves = {}
     for name, model in models.items():
-        print(f"Training {name}...")
-        model.fit(X_train_scaled, y_train)
-        
-        y_pred = model.predict(X_test_scaled)
-        y_proba = model.predict_proba(X_test_scaled)[:, 1]
-
-        acc = accuracy_score(y_test, y_pred)
-        prec = precision_score(y_test, y_pred)
-        rec = recall_score(y_test, y_pred)
-        f1 = f1_score(y_test, y_pred)
-        auc = roc_auc_score(y_test, y_proba)
-        cm = confusion_matrix(y_test, y_pred).tolist()
-
-        # Save model pickle file
-        filename = f"model_{name.lower().replace(' ', '_')}.pkl"
-        joblib.dump(model, filename)
-        model_files[name] = filename
-
-        # Extract feature importances if available
-        if hasattr(model, 'feature_importances_'):
-            feat_imp = model.feature_importances_.tolist()
-        elif name == 'Logistic Regression':
-            feat_imp = np.abs(model.coef_[0]).tolist()
-        else:
-            # Correlation-based proxy for distance models
-            feat_imp = np.abs(df.corr()['target'].drop('target').values).tolist()
-
-        # Normalize feature importances
-        sum_imp = sum(feat_imp) if sum(feat_imp) > 0 else 1.0
-        feat_imp = [round(x / sum_imp, 4) for x in feat_imp]
-
-        results[name] = {
-            'accuracy': round(acc, 4),
-            'precision': round(prec, 4),
-            'recall': round(rec, 4),
-            'f1_score': round(f1, 4),
-            'roc_auc': round(auc, 4),
-            'confusion_matrix': cm,
-            'filename': filename,
-            'feature_importance': dict(zip(X.columns, feat_imp))
-        }
+        curves[name] = {'model_sha1': file_sha1(results[name]['filename']),
+                        **evaluation_curves(model, X_test_scaled, y_test, (calibration or {}).get(name))}
+    with open(path, 'w') as f:
+        json.dump({'generated': datetime.now().isoformat(timespec='seconds'), 'models': curves}, f)
+    return curves
 
-        print(f"   {name:20} -> Accuracy: {acc*100:.1f}%, AUC: {auc:.3f}, F1: {f1:.3f}")
 
-    # Export scaler and backward-compatible model
-    joblib.dump(scaler, 'scaler.pkl')
-    joblib.dump(models['Voting Ensemble'], 'heart_disease_knn_model.pkl')
+def load_tuning(data_hash, sites, path='models_metadata.json'):
+    """
+    Winning configurations from the last tuning run recorded in the metadata, if that run
+    tuned on the same training data (``data_hash``) and ``sites``; None (defaults) otherwise.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        tuning = json.load(f).get('tuning')
+    if not tuning:
+        return None
+    stale = [what for what, same in (('training data', tuning.get('dataset_hash') == data_hash),
+                                     ('sites', tuning.get('sites') == sites)) if not same]
+    if stale:
+        print(f"Stored tuning was run on different {' and '.join(stale)} - "
+              f"using default hyperparameters (re-tune with --tune).")
+        return None
+    return tuning
+
+
+def ensemble_weights(tuning):
+    if tuning and 'Voting Ensemble' in tuning['models']:
+        return tuning['models']['Voting Ensemble']['params']['weights']
+    return None
+
+
+def export_models(models, scaler, results, df, X_train, X_test, training_run, tuning=None, staged=None, bank=None,
+                  calibration=None, drift_reference=None):
+    """
+    Write the model suite and its metadata. ``X_train`` / ``X_test`` are the raw (unscaled)
+    feature frames the compact export is checked on. Everything that can fail is built before
+    the first file is written, so a failed export leaves the previous one untouched.
+    """
+    compact_arrays, compact_report = build_compact(models, scaler, pd.concat([X_train, X_test]), calibration)
+
+    y = df['target']
 
     # Export metadata
     metadata = {
-        'features': X.columns.tolist(),
+        'features': FEATURES,
         'dataset_size': len(df),
         'train_size': len(X_train),
         'test_size': len(X_test),
         'positive_cases': int(y.sum()),
         'negative_cases': int(len(y) - y.sum()),
+        'sites': sorted(df['site'].unique().tolist()),
+        'site_sizes': df['site'].value_counts().to_dict(),
         'models': results,
         'feature_names': {
             'age': 'Age (years)',
@@ -143,24 +335,335 @@ def train_and_export():
             'slope': 'Slope of ST Segment',
             'ca': 'Major Vessels (ca)',
             'thal': 'Thalassemia'
+        },
+        'training_run': training_run
+    }
+    if tuning:
+        metadata['tuning'] = tuning
+    if staged is not None:
+        metadata['acquisition'] = {
+            'filename': ACQUISITION_MODEL_FILE,
+            'uncertainty_band': list(staged.band),
+            'stages': [{k: s[k] for k in ('panel', 'tests', 'cumulative_cost', 'cv_roc_auc')} for s in staged.summary()],
         }
+    if bank is not None:
+        metadata['uncertainty'] = {
+            'filename': UNCERTAINTY_BANK_FILE,
+            'bootstrap_models': bank['n_boot'],
+            'banked': [name for name in models if name in bank],
+            'level': bank['level'],
+        }
+    if calibration:
+        metadata['calibration'] = calibration
+    if drift_reference:
+        metadata['drift_reference'] = drift_reference
+
+    legacy_metadata = {
+        'model_name': 'Voting Ensemble',
+        'accuracy': results['Voting Ensemble']['accuracy'],
+        'precision': results['Voting Ensemble']['precision'],
+        'recall': results['Voting Ensemble']['recall'],
+        'f1_score': results['Voting Ensemble']['f1_score'],
+        'features': FEATURES,
+        'feature_importance': {'importance': {str(i): v for i, v in enumerate(results['Voting Ensemble']['feature_importance'].values())}}
     }
 
+    for name, model in models.items():
+        joblib.dump(model, results[name]['filename'])
+    if staged is not None:
+        joblib.dump(staged, ACQUISITION_MODEL_FILE)
+    if bank is not None:
+        joblib.dump(bank, UNCERTAINTY_BANK_FILE)
+    elif os.path.exists(UNCERTAINTY_BANK_FILE):
+        # a bank fitted against earlier models would give them the wrong intervals
+        os.remove(UNCERTAINTY_BANK_FILE)
+
+    # Export scaler and backward-compatible model
+    joblib.dump(scaler, 'scaler.pkl')
+    joblib.dump(models['Voting Ensemble'], 'heart_disease_knn_model.pkl')
+    metadata['compact'] = write_compact(compact_arrays, compact_report)
+
     with open('models_metadata.json', 'w') as f:
         json.dump(metadata, f, indent=2)
 
     with open('model_metadata.json', 'w') as f:
-        json.dump({
-            'model_name': 'Voting Ensemble',
-            'accuracy': results['Voting Ensemble']['accuracy'],
-            'precision': results['Voting Ensemble']['precision'],
-            'recall': results['Voting Ensemble']['recall'],
-            'f1_score': results['Voting Ensemble']['f1_score'],
-            'features': X.columns.tolist(),
-            'feature_importance': {'importance': {str(i): v for i, v in enumerate(results['Voting Ensemble']['feature_importance'].values())}}
-        }, f, indent=2)
+        json.dump(legacy_metadata, f, indent=2)
+
+
+def finish_run(training_run, version, export_seconds, publish_seconds, total_seconds):
+    """
+    The run record kept in training_state.json: the exported one (as in models_metadata.json)
+    plus the registry version and the export / publish / total times, which are only known
+    once the metadata has been written.
+    """
+    return {**training_run, 'registry_version': version,
+            'stage_seconds': {**training_run['stage_seconds'], 'export': round(export_seconds, 4),
+                              'publish': round(publish_seconds, 4), 'total': round(total_seconds, 4)}}
+
+
+def train_and_export(cases_path=LABELLED_CASES_FILE, workers=TRAINING_WORKERS, tune=False, sites=None,
+                     n_boot=BOOTSTRAP_MODELS):
+    print("Starting Multi-Model Training Engine...")
+    stages = {}
+    t0 = time.perf_counter()
+
+    # Load the UCI dataset for the selected sites (Cleveland by default)
+    sites = parse_sites(sites)
+    df = load_training_data(sites)
+    print(f"Loaded {len(df)} records from: {', '.join(sites)}")
+    cases = load_labelled_cases(cases_path)
+    n_cases = count_labelled_cases(cases_path)
+    stages['load_data'] = time.perf_counter() - t0
+
+    # Train/Test Split (80% train, 20% test); locally labelled cases only ever join the training side
+    X_train, X_test, y_train, y_test = split_holdout(df)
+    if len(cases):
+        X_train = pd.concat([X_train, cases[FEATURES]], ignore_index=True)
+        y_train = pd.concat([y_train, cases['target']], ignore_index=True)
+
+    # Standard Scaler
+    t = time.perf_counter()
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+    stages['scaler'] = time.perf_counter() - t
+
+    # Hyperparameters: run the CV search, or reuse the winners from the last tuning run
+    if tune:
+        from tuning import tune_all
+        print("Tuning hyperparameters (stratified k-fold, successive halving)...")
+        t = time.perf_counter()
+        tuning = {**tune_all(X_train, y_train, workers=workers), 'sites': sites}
+        stages['tune'] = time.perf_counter() - t
+    else:
+        tuning = load_tuning(dataset_hash(X_train, y_train), sites)
+    tuned = tuning['models'] if tuning else None
+
+    # Instantiate Models
+    models = build_base_models(tuned)
+
+    # Fit the independent base models concurrently, then build the Soft Voting Ensemble from them
+    t = time.perf_counter()
+    models, fit_seconds = fit_base_models(models, X_train_scaled, y_train, workers)
+    stages['fit: base models (wall)'] = time.perf_counter() - t
+    for name, secs in fit_seconds.items():
+        stages[f'fit: {name}'] = secs
+
+    t = time.perf_counter()
+    models['Voting Ensemble'] = assemble_ensemble(models, np.unique(y_train), ensemble_weights(tuning))
+    stages['assemble: Voting Ensemble'] = time.perf_counter() - t
+
+    # Cost-aware staged sub-models (cheap tests first) served by the API's /predict/staged
+    t = time.perf_counter()
+    staged = fit_acquisition(X_train, y_train)
+    stages['fit: staged acquisition'] = time.perf_counter() - t
+
+    # Bootstrap refits behind the Gradient Boosting / Logistic Regression prediction intervals;
+    # the costliest stage of a full retrain, so its size is a flag and 0 skips it
+    t = time.perf_counter()
+    bank = fit_bank(models, scaler, X_train, y_train, n_boot=n_boot, workers=workers) if n_boot > 0 else None
+    stages['fit: uncertainty bank'] = time.perf_counter() - t
+    print(f"Uncertainty bank: {n_boot} bootstrap refits in {stages['fit: uncertainty bank']:.1f}s"
+          if bank is not None else "Uncertainty bank skipped (--bootstrap 0)")
+
+    # Isotonic / Platt calibrators on out-of-fold probabilities, scored on the held-out split
+    t = time.perf_counter()
+    calibration = calibration_report(models, fit_calibrators(models, X_train_scaled, y_train), X_test_scaled, y_test)
+    stages['fit: calibrators'] = time.perf_counter() - t
+
+    # Evaluate the served predictions: calibrated probabilities and the class derived from them
+    t = time.perf_counter()
+    results = {name: evaluate_model(name, model, X_test_scaled, y_test, df, calibration.get(name))
+               for name, model in models.items()}
+    stages['evaluate'] = time.perf_counter() - t
+
+    now = datetime.now().isoformat(timespec='seconds')
+    training_run = {
+        'mode': 'full',
+        'timestamp': now,
+        'updated': {**{name: 'refit from scratch' for name in fit_seconds},
+                    'Voting Ensemble': 'assembled from fitted members'},
+        'labelled_cases': len(cases),
+        'sites': sites,
+        'workers': workers,
+        'stage_seconds': {k: round(v, 4) for k, v in stages.items()},
+    }
+
+    t = time.perf_counter()
+    export_models(models, scaler, results, df, X_train, X_test, training_run, tuning, staged, bank, calibration,
+                  reference_bins(X_train))
+    export_evaluation_curves(models, results, X_test_scaled, y_test, calibration)
+    export_seconds = time.perf_counter() - t
+
+    # Content-hashed copy under model_registry/, picked up by running API workers
+    t = time.perf_counter()
+    version = ModelRegistry().publish(training_run=training_run)
+    training_run = finish_run(training_run, version, export_seconds, time.perf_counter() - t, time.perf_counter() - t0)
+
+    state = load_training_state() or {}
+    state.update({'last_full_retrain': now, 'cases_consumed': n_cases, 'cases_file': cases_path, 'sites': sites})
+    state.setdefault('history', []).append(training_run)
+    save_training_state(state)
 
     print("All 5 Models, Scaler, and Metadata Successfully Saved!")
+    return training_run
+
+
+def train_incremental(cases_path=LABELLED_CASES_FILE, full_every_days=FULL_RETRAIN_INTERVAL_DAYS,
+                      rf_trees=RF_TREES_PER_INCREMENT, workers=TRAINING_WORKERS, sites=None, n_boot=BOOTSTRAP_MODELS):
+    """
+    Fold labelled cases appended since the last run into the exported models.
+
+    The scaler takes the new rows into its running mean/variance, existing models are
+    re-projected onto the updated scaling, Logistic Regression warm-starts from its
+    previous solution, the Random Forest grows ``rf_trees`` extra trees on the new rows,
+    the KNN reference set is appended to, and the ensemble is re-assembled from the
+    updated members. Gradient Boosting is left untouched until the next full retrain.
+    Changing ``sites`` away from those of the last full retrain forces a full retrain.
+    """
+    state = load_training_state()
+    sites = parse_sites(sites) if sites is not None else (state or {}).get('sites', DEFAULT_SITES)
+    if (full_retrain_due(state, full_every_days) or not os.path.exists('models_metadata.json')
+            or sites != state.get('sites', DEFAULT_SITES)):
+        print(f"Full retrain due (interval: {full_every_days} days) - running full training.")
+        return train_and_export(cases_path, workers, sites=sites, n_boot=n_boot)
+
+    print("Starting Incremental Training Engine...")
+    stages = {}
+    t0 = time.perf_counter()
+
+    consumed = state.get('cases_consumed', 0)
+    new_cases = load_labelled_cases(cases_path, start=consumed)
+    n_cases = count_labelled_cases(cases_path)
+    if new_cases.empty:
+        print("No new labelled cases since the last run - nothing to update.")
+        return None
+
+    with open('models_metadata.json', 'r') as f:
+        metadata = json.load(f)
+    scaler = joblib.load('scaler.pkl')
+    base_names = ['Random Forest', 'Gradient Boosting', 'K-Nearest Neighbors', 'Logistic Regression']
+    models = {n: joblib.load(metadata['models'][n]['filename']) for n in base_names}
+    df = load_training_data(sites)
+    stages['load_data'] = time.perf_counter() - t0
+
+    X_new, y_new = new_cases[FEATURES], new_cases['target']
+    updated = {}
+
+    # Running statistics: StandardScaler.partial_fit merges the new rows into mean_/var_
+    t = time.perf_counter()
+    old_scaler = copy.deepcopy(scaler)
+    scaler.partial_fit(X_new)
+    reproject_to_scaler(models, old_scaler, scaler)
+    X_new_scaled = scaler.transform(X_new)
+    stages['scaler'] = time.perf_counter() - t
+    updated['Scaler'] = f"running statistics over {int(np.max(scaler.n_samples_seen_))} samples"
+
+    # Logistic Regression: warm start from the previous coefficients over the full training pool
+    t = time.perf_counter()
+    X_train, X_test, y_train, y_test = split_holdout(df)
+    pool = load_labelled_cases(cases_path)
+    X_pool_raw = pd.concat([X_train, pool[FEATURES]], ignore_index=True)
+    X_pool = scaler.transform(X_pool_raw)
+    y_pool = pd.concat([y_train, pool['target']], ignore_index=True)
+    lr = models['Logistic Regression']
+    lr.set_params(warm_start=True)
+    lr.fit(X_pool, y_pool)
+    stages['update: Logistic Regression'] = time.perf_counter() - t
+    updated['Logistic Regression'] = f"warm-started over {len(y_pool)} rows ({lr.n_iter_[0]} iterations)"
+
+    # Random Forest: grow extra trees on the new rows only
+    t = time.perf_counter()
+    rf = models['Random Forest']
+    if y_new.nunique() == len(rf.classes_):
+        rf.set_params(warm_start=True, n_estimators=len(rf.estimators_) + rf_trees)
+        rf.fit(X_new_scaled, y_new)
+        updated['Random Forest'] = f"grew {rf_trees} trees on {len(y_new)} new rows ({len(rf.estimators_)} total)"
+    else:
+        updated['Random Forest'] = "skipped: new rows contain a single class"
+    stages['update: Random Forest'] = time.perf_counter() - t
+
+    # KNN: append the new rows to the reference set
+    t = time.perf_counter()
+    knn = models['K-Nearest Neighbors']
+    knn.fit(np.vstack([knn._fit_X, X_new_scaled]), np.concatenate([knn.classes_[knn._y], y_new.values]))
+    stages['update: K-Nearest Neighbors'] = time.perf_counter() - t
+    updated['K-Nearest Neighbors'] = f"appended {len(y_new)} rows ({knn.n_samples_fit_} reference points)"
+
+    updated['Gradient Boosting'] = "unchanged (re-projected only; refit at next full retrain)"
+
+    t = time.perf_counter()
+    models['Voting Ensemble'] = assemble_ensemble(models, rf.classes_, ensemble_weights(metadata.get('tuning')))
+    stages['assemble: Voting Ensemble'] = time.perf_counter() - t
+    updated['Voting Ensemble'] = "re-assembled from updated members"
+
+    X_test_scaled = scaler.transform(X_test)
+
+    # The staged acquisition sub-models carry their own scaling; they are refit on full retrains only
+    staged = joblib.load(ACQUISITION_MODEL_FILE) if os.path.exists(ACQUISITION_MODEL_FILE) else None
+    if staged is not None:
+        updated['Staged Acquisition'] = "unchanged until the next full retrain"
+    bank = load_bank()
+    if bank is not None:
+        updated['Uncertainty Bank'] = "unchanged until the next full retrain"
+    calibration = metadata.get('calibration')
+    if calibration:
+        calibration = calibration_report(models, calibration, X_test_scaled, y_test)
+        updated['Calibrators'] = "unchanged until the next full retrain (held-out Brier re-scored)"
+    results = {name: evaluate_model(name, model, X_test_scaled, y_test, df, (calibration or {}).get(name))
+               for name, model in models.items()}
+
+    now = datetime.now().isoformat(timespec='seconds')
+    training_run = {
+        'mode': 'incremental',
+        'timestamp': now,
+        'updated': updated,
+        'labelled_cases': len(new_cases),
+        'sites': sites,
+        'stage_seconds': {k: round(v, 4) for k, v in stages.items()},
+    }
+
+    t = time.perf_counter()
+    export_models(models, scaler, results, df, X_pool_raw, X_test, training_run, metadata.get('tuning'), staged, bank,
+                  calibration, reference_bins(X_pool_raw))
+    export_evaluation_curves(models, results, X_test_scaled, y_test, calibration)
+    export_seconds = time.perf_counter() - t
+
+    # Content-hashed copy under model_registry/, picked up by running API workers
+    t = time.perf_counter()
+    version = ModelRegistry().publish(training_run=training_run)
+    training_run = finish_run(training_run, version, export_seconds, time.perf_counter() - t, time.perf_counter() - t0)
+
+    state.update({'last_incremental': now, 'cases_consumed': n_cases, 'cases_file': cases_path})
+    state.setdefault('history', []).append(training_run)
+    save_training_state(state)
+
+    print(f"Incremental update complete: {len(new_cases)} new cases folded in.")
+    return training_run
+
 
 if __name__ == '__main__':
-    train_and_export()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--incremental', action='store_true',
+                        help='update the exported models with newly labelled cases instead of refitting')
+    parser.add_argument('--cases', default=LABELLED_CASES_FILE,
+                        help=f'CSV of locally labelled cases (default: {LABELLED_CASES_FILE})')
+    parser.add_argument('--full-every', type=float, default=FULL_RETRAIN_INTERVAL_DAYS,
+                        help=f'days between scheduled full retrains (default: {FULL_RETRAIN_INTERVAL_DAYS})')
+    parser.add_argument('--rf-trees', type=int, default=RF_TREES_PER_INCREMENT,
+                        help=f'trees added to the Random Forest per incremental run (default: {RF_TREES_PER_INCREMENT})')
+    parser.add_argument('--workers', type=int, default=TRAINING_WORKERS,
+                        help=f'processes used to fit the base models in parallel (default: {TRAINING_WORKERS})')
+    parser.add_argument('--tune', action='store_true',
+                        help='run the cross-validated hyperparameter search before a full retrain')
+    parser.add_argument('--sites', default=None,
+                        help="comma-separated UCI sites to train on, or 'all' (default: cleveland)")
+    parser.add_argument('--bootstrap', type=int, default=BOOTSTRAP_MODELS,
+                        help=f'bootstrap refits in the uncertainty bank on a full retrain; 0 skips it and the '
+                             f'Gradient Boosting / Logistic Regression intervals (default: {BOOTSTRAP_MODELS})')
+    args = parser.parse_args()
+
+    if args.incremental:
+        train_incremental(args.cases, args.full_every, args.rf_trees, args.workers, args.sites, args.bootstrap)
+    else:
+        train_and_export(args.cases, args.workers, args.tune, args.sites, args.bootstrap)
@@ -0,0 +1,283 @@
+"""
+HeartGuard Pro - Hyperparameter Tuning Engine
+Stratified k-fold search with successive halving over the five-model suite. Each
+(candidate, fold, resource) evaluation is cached on disk, keyed by a hash of the
+training data and the parameters, so re-running the search only pays for new work.
+
+    python tuning.py                   tune all five models and print the winners
+    python train_models.py --tune      tune, then train/export with the winning configurations
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy import stats
+from sklearn.base import clone
+from sklearn.model_selection import StratifiedKFold, ParameterGrid
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier, VotingClassifier
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, roc_auc_score
+import warnings
+
+warnings.filterwarnings('ignore')
+
+TUNING_CACHE_DIR = 'tuning_cache'
+N_FOLDS = 5
+HALVING_FACTOR = 3
+MIN_RESOURCES = 40
+RANDOM_STATE = 42
+
+SEARCH_SPACES = {
+    'Random Forest': {
+        'n_estimators': [100, 300],
+        'max_depth': [None, 5, 10],
+        'min_samples_leaf': [1, 3],
+        'max_features': ['sqrt', 0.5],
+    },
+    'Gradient Boosting': {
+        'n_estimators': [50, 100, 200],
+        'learning_rate': [0.05, 0.1],
+        'max_depth': [2, 3],
+    },
+    'K-Nearest Neighbors': {
+        'n_neighbors': [5, 7, 9, 11, 15],
+        'weights': ['uniform', 'distance'],
+    },
+    'Logistic Regression': {
+        'C': [0.01, 0.1, 1.0, 10.0],
+        'class_weight': [None, 'balanced'],
+    },
+    # Soft-vote weights over (rf, gb, knn, lr), with members at their tuned settings
+    'Voting Ensemble': {
+        'weights': [(1, 1, 1, 1), (2, 1, 1, 1), (1, 2, 1, 1), (1, 1, 1, 2), (2, 2, 1, 1), (1, 1, 0, 1)],
+    },
+}
+
+# The served models' constructors (train_models.build_base_models builds from these), so tuned
+# parameters are scored under the estimator that will serve them
+BASE_ESTIMATORS = {
+    'Random Forest': lambda: RandomForestClassifier(n_estimators=100, random_state=RANDOM_STATE, n_jobs=-1),
+    'Gradient Boosting': lambda: GradientBoostingClassifier(n_estimators=100, random_state=RANDOM_STATE),
+    'K-Nearest Neighbors': lambda: KNeighborsClassifier(n_neighbors=7),
+    'Logistic Regression': lambda: LogisticRegression(random_state=RANDOM_STATE, max_iter=1000),
+}
+
+
+def dataset_hash(X, y):
+    h = hashlib.sha256()
+    h.update(json.dumps(list(map(str, X.columns))).encode())
+    h.update(np.ascontiguousarray(X.to_numpy(dtype=np.float64)).tobytes())
+    h.update(np.ascontiguousarray(np.asarray(y, dtype=np.int64)).tobytes())
+    return h.hexdigest()[:16]
+
+
+def make_estimator(name, params, member_params=None):
+    """Unfitted estimator for ``name`` with ``params`` applied."""
+    if name == 'Voting Ensemble':
+        member_params = member_params or {}
+        members = [(key, make_estimator(member, member_params.get(member, {})))
+                   for key, member in [('rf', 'Random Forest'), ('gb', 'Gradient Boosting'),
+                                       ('knn', 'K-Nearest Neighbors'), ('lr', 'Logistic Regression')]]
+        return VotingClassifier(estimators=members, voting='soft', weights=list(params['weights']))
+    return BASE_ESTIMATORS[name]().set_params(**params)
+
+
+def _cache_key(data_hash, name, params, member_params, n_folds, fold, resources):
+    payload = json.dumps([data_hash, name, params, member_params, n_folds, fold, resources, RANDOM_STATE],
+                         sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def _cache_path(cache_dir, name, key):
+    return os.path.join(cache_dir, name.lower().replace(' ', '_'), f'{key}.json')
+
+
+def _read_cache(cache_dir, name, key):
+    path = _cache_path(cache_dir, name, key)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def _write_cache(cache_dir, name, key, result):
+    path = _cache_path(cache_dir, name, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(result, f)
+    os.replace(tmp, path)
+
+
+def _subsample(train_idx, y, resources, seed):
+    """Stratified subset of ``train_idx`` with ``resources`` rows (all of them at full budget)."""
+    if resources >= len(train_idx):
+        return train_idx
+    rng = np.random.default_rng(seed)
+    y_sub = y[train_idx]
+    keep = []
+    for cls in np.unique(y_sub):
+        cls_idx = train_idx[y_sub == cls]
+        n = max(1, int(round(resources * len(cls_idx) / len(train_idx))))
+        keep.append(rng.choice(cls_idx, size=min(n, len(cls_idx)), replace=False))
+    return np.sort(np.concatenate(keep))
+
+
+def _evaluate_fold(name, params, member_params, X, y, train_idx, test_idx, resources, seed):
+    """Fit a scaler + model pipeline on one (possibly subsampled) fold and score it."""
+    est = make_estimator(name, params, member_params)
+    if 'n_jobs' in est.get_params():
+        est.set_params(n_jobs=1)
+    fit_idx = _subsample(train_idx, y, resources, seed)
+    model = make_pipeline(StandardScaler(), clone(est))
+    t = time.perf_counter()
+    model.fit(X[fit_idx], y[fit_idx])
+    fit_seconds = time.perf_counter() - t
+    proba = model.predict_proba(X[test_idx])[:, 1]
+    return {
+        'roc_auc': float(roc_auc_score(y[test_idx], proba)),
+        'accuracy': float(accuracy_score(y[test_idx], (proba >= 0.5).astype(int))),
+        'fit_seconds': round(fit_seconds, 4),
+    }
+
+
+def confidence_interval(scores, level=0.95):
+    """Student-t interval for the mean of per-fold scores."""
+    scores = np.asarray(scores, dtype=float)
+    mean = float(scores.mean())
+    if len(scores) < 2:
+        return {'mean': round(mean, 4), 'std': 0.0, 'ci95': [round(mean, 4), round(mean, 4)]}
+    std = float(scores.std(ddof=1))
+    half = float(stats.t.ppf(0.5 + level / 2, len(scores) - 1) * std / math.sqrt(len(scores)))
+    return {'mean': round(mean, 4), 'std': round(std, 4),
+            'ci95': [round(max(0.0, mean - half), 4), round(min(1.0, mean + half), 4)]}
+
+
+def successive_halving(name, X, y, member_params=None, n_folds=N_FOLDS, eta=HALVING_FACTOR,
+                       min_resources=MIN_RESOURCES, cache_dir=TUNING_CACHE_DIR, pool=None,
+                       data_hash=None):
+    """
+    Successive halving over ``SEARCH_SPACES[name]``: every surviving candidate is scored with
+    stratified k-fold CV on a training budget that grows by ``eta`` each round, and only the
+    top ``1/eta`` advance. The last round always uses the full fold training sets.
+    """
+    X_arr = X.to_numpy(dtype=np.float64)
+    y_arr = np.asarray(y, dtype=np.int64)
+    data_hash = data_hash or dataset_hash(X, y)
+    folds = list(StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=RANDOM_STATE).split(X_arr, y_arr))
+    max_resources = min(len(tr) for tr, _ in folds)
+
+    candidates = list(ParameterGrid(SEARCH_SPACES[name]))
+    n_rounds = max(1, math.ceil(math.log(len(candidates), eta))) if len(candidates) > 1 else 1
+    rounds, hits, evaluated = [], 0, 0
+
+    for r in range(n_rounds):
+        resources = int(max(min_resources, max_resources / eta ** (n_rounds - 1 - r)))
+        resources = min(resources, max_resources)
+        if r == n_rounds - 1:
+            resources = max_resources
+
+        fold_scores = {i: [None] * n_folds for i in range(len(candidates))}
+        pending = []
+        for i, params in enumerate(candidates):
+            for f, (train_idx, test_idx) in enumerate(folds):
+                key = _cache_key(data_hash, name, params, member_params, n_folds, f, resources)
+                cached = _read_cache(cache_dir, name, key)
+                if cached is not None:
+                    fold_scores[i][f] = cached
+                    hits += 1
+                else:
+                    pending.append((i, f, key, train_idx, test_idx))
+
+        args = [(name, candidates[i], member_params, X_arr, y_arr, tr, te, resources, RANDOM_STATE + f)
+                for i, f, _, tr, te in pending]
+        if pool is not None and len(args) > 1:
+            outputs = list(pool.map(_evaluate_fold, *zip(*args)))
+        else:
+            outputs = [_evaluate_fold(*a) for a in args]
+        for (i, f, key, _, _), result in zip(pending, outputs):
+            _write_cache(cache_dir, name, key, result)
+            fold_scores[i][f] = result
+        evaluated += len(pending)
+
+        means = [np.mean([s['roc_auc'] for s in fold_scores[i]]) for i in range(len(candidates))]
+        order = np.argsort(means)[::-1]
+        rounds.append({'resources': resources, 'candidates': len(candidates),
+                       'best_roc_auc': round(float(means[order[0]]), 4)})
+
+        if r == n_rounds - 1:
+            best = order[0]
+            auc = [s['roc_auc'] for s in fold_scores[best]]
+            acc = [s['accuracy'] for s in fold_scores[best]]
+            return {
+                'params': candidates[best],
+                'cv_roc_auc': confidence_interval(auc),
+                'cv_accuracy': confidence_interval(acc),
+                'n_folds': n_folds,
+                'candidates': len(ParameterGrid(SEARCH_SPACES[name])),
+                'rounds': rounds,
+                'cache_hits': hits,
+                'evaluated': evaluated,
+            }
+
+        keep = max(1, math.ceil(len(candidates) / eta))
+        candidates = [candidates[i] for i in order[:keep]]
+
+
+def tune_all(X, y, n_folds=N_FOLDS, eta=HALVING_FACTOR, cache_dir=TUNING_CACHE_DIR, workers=None):
+    """
+    Tune the four base models, then the ensemble weights over the tuned members.
+    ``X`` is the raw (unscaled) training frame; scaling is refit inside every fold.
+    """
+    workers = workers or os.cpu_count() or 1
+    data_hash = dataset_hash(X, y)
+    results = {}
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for name in ['Random Forest', 'Gradient Boosting', 'K-Nearest Neighbors', 'Logistic Regression']:
+            t = time.perf_counter()
+            results[name] = successive_halving(name, X, y, n_folds=n_folds, eta=eta, cache_dir=cache_dir,
+                                               pool=pool, data_hash=data_hash)
+            results[name]['seconds'] = round(time.perf_counter() - t, 4)
+            print(f"   {name:20} -> CV AUC: {results[name]['cv_roc_auc']['mean']:.3f} "
+                  f"{results[name]['cv_roc_auc']['ci95']}, params: {results[name]['params']}")
+
+        member_params = {name: res['params'] for name, res in results.items()}
+        t = time.perf_counter()
+        results['Voting Ensemble'] = successive_halving('Voting Ensemble', X, y, member_params=member_params,
+                                                        n_folds=n_folds, eta=eta, cache_dir=cache_dir,
+                                                        pool=pool, data_hash=data_hash)
+        results['Voting Ensemble']['params'] = {'weights': list(results['Voting Ensemble']['params']['weights'])}
+        results['Voting Ensemble']['seconds'] = round(time.perf_counter() - t, 4)
+        print(f"   {'Voting Ensemble':20} -> CV AUC: {results['Voting Ensemble']['cv_roc_auc']['mean']:.3f} "
+              f"{results['Voting Ensemble']['cv_roc_auc']['ci95']}, params: {results['Voting Ensemble']['params']}")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    return {'dataset_hash': data_hash, 'n_folds': n_folds, 'halving_factor': eta, 'models': results}
+
+
+if __name__ == '__main__':
+    from heart_data import load_training_data, split_holdout
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--folds', type=int, default=N_FOLDS)
+    parser.add_argument('--eta', type=int, default=HALVING_FACTOR)
+    parser.add_argument('--cache-dir', default=TUNING_CACHE_DIR)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--sites', default=None, help="comma-separated UCI sites, or 'all' (default: cleveland)")
+    args = parser.parse_args()
+
+    X_train, _, y_train, _ = split_holdout(load_training_data(args.sites))
+    summary = tune_all(X_train, y_train, args.folds, args.eta, args.cache_dir, args.workers)
+    print(json.dumps({n: r['params'] for n, r in summary['models'].items()}, indent=2))
@@ -0,0 +1,233 @@
+"""
+HeartGuard Pro - Raw UCI Record Parser
+Streaming parser for the 76-attribute raw files (hungarian.data, switzerland.data,
+long-beach-va.data, new.data). Each patient record is whitespace-wrapped across several
+lines and ends at the patient-name token; -9 marks a missing value.
+
+The file is read once, line by line, and records are converted in fixed-size chunks with
+NumPy's C tokenizer, so parser memory stays constant regardless of file size.
+
+    python uci_raw.py --verify        check the raw files against the processed 14-column files (fails on a mismatch)
+    python uci_raw.py --benchmark     time the parser on every raw file
+"""
+
+import argparse
+import os
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = 'Heart Disease Data'
+RAW_FILES = ['hungarian.data', 'switzerland.data', 'long-beach-va.data', 'new.data']
+CHUNK_RECORDS = 4096
+MISSING = -9.0
+
+# The 76 attributes documented in heart-disease.names, in record order
+ATTRIBUTES = [
+    'id', 'ccf', 'age', 'sex', 'painloc', 'painexer', 'relrest', 'pncaden', 'cp', 'trestbps',
+    'htn', 'chol', 'smoke', 'cigs', 'years', 'fbs', 'dm', 'famhist', 'restecg', 'ekgmo',
+    'ekgday', 'ekgyr', 'dig', 'prop', 'nitr', 'pro', 'diuretic', 'proto', 'thaldur', 'thaltime',
+    'met', 'thalach', 'thalrest', 'tpeakbps', 'tpeakbpd', 'dummy', 'trestbpd', 'exang', 'xhypo', 'oldpeak',
+    'slope', 'rldv5', 'rldv5e', 'ca', 'restckm', 'exerckm', 'restef', 'restwm', 'exeref', 'exerwm',
+    'thal', 'thalsev', 'thalpul', 'earlobe', 'cmo', 'cday', 'cyr', 'num', 'lmt', 'ladprox',
+    'laddist', 'diag', 'cxmain', 'ramus', 'om1', 'om2', 'rcaprox', 'rcadist', 'lvx1', 'lvx2',
+    'lvx3', 'lvx4', 'lvf', 'cathef', 'junk', 'name',
+]
+
+# Coded attributes; exposed as nullable Int8 columns by ``to_frame``
+CATEGORICAL_ATTRS = [
+    'sex', 'painloc', 'painexer', 'relrest', 'cp', 'htn', 'smoke', 'fbs', 'dm', 'famhist', 'restecg',
+    'dig', 'prop', 'nitr', 'pro', 'diuretic', 'proto', 'exang', 'xhypo', 'slope', 'ca', 'restwm',
+    'exerwm', 'thal', 'num', 'lmt', 'ladprox', 'laddist', 'diag', 'cxmain', 'ramus', 'om1', 'om2',
+    'rcaprox', 'rcadist',
+]
+
+# The 14 standard columns, in the order of the processed files
+PROCESSED_COLUMNS = ['age', 'sex', 'cp', 'trestbps', 'chol', 'fbs', 'restecg', 'thalach',
+                     'exang', 'oldpeak', 'slope', 'ca', 'thal', 'num']
+
+# Documented codes of the standard coded columns; the processed files blank any other value
+VALID_CODES = {'slope': {1, 2, 3}, 'ca': {0, 1, 2, 3}, 'thal': {3, 6, 7}}
+
+# (raw file, processed file, raw records used, same row order, upstream edits; see upstream_edits)
+PROCESSED_PAIRS = [
+    ('new.data', 'processed.cleveland.data', 303, True, ('codes',)),
+    ('hungarian.data', 'reprocessed.hungarian.data', None, True, ()),
+    ('hungarian.data', 'processed.hungarian.data', None, False, ('codes', 'num')),
+    ('switzerland.data', 'processed.switzerland.data', None, False, ('codes',)),
+    ('long-beach-va.data', 'processed.va.data', None, False, ('codes',)),
+]
+
+
+def record_dtype(n_numeric):
+    """
+    Structured dtype for records with ``n_numeric`` numeric attributes before the name.
+    Files wider than the documented 75 (new.data carries 89) get ``extra_N`` columns.
+    """
+    numeric = ATTRIBUTES[:-1]
+    fields = [('id', np.int32), ('ccf', np.int64)]
+    fields += [(name, np.float32) for name in numeric[2:n_numeric]]
+    fields += [(f'extra_{i + 1}', np.float32) for i in range(max(0, n_numeric - len(numeric)))]
+    fields.append(('name', 'U16'))
+    return np.dtype(fields)
+
+
+def _convert(text, names, width, path):
+    values = np.array(' '.join(text).split(), dtype=np.float64)
+    if width is None:
+        width = values.size // len(names)
+    if values.size != width * len(names):
+        raise ValueError(f"{path}: records have inconsistent attribute counts (expected {width} per record)")
+    values = values.reshape(len(names), width)
+
+    dtype = record_dtype(width)
+    out = np.empty(len(names), dtype=dtype)
+    for i, field in enumerate(dtype.names[:-1]):
+        col = values[:, i]
+        if dtype[field].kind == 'f':
+            col = np.where(col == MISSING, np.nan, col)
+        out[field] = col
+    out['name'] = names
+    return out, width
+
+
+def iter_chunks(path, chunk_records=CHUNK_RECORDS):
+    """Yield structured arrays of up to ``chunk_records`` records, reading ``path`` in one pass."""
+    text, names, pending, width = [], [], [], None
+    with open(path, 'r', encoding='latin-1') as f:
+        for line in f:
+            stripped = line.rstrip()
+            if not stripped:
+                continue
+            head, _, last = stripped.rpartition(' ')
+            if last[0].isalpha():
+                # The name token closes the record
+                pending.append(head)
+                text.append(' '.join(pending))
+                names.append(last)
+                pending = []
+                if len(names) == chunk_records:
+                    chunk, width = _convert(text, names, width, path)
+                    yield chunk
+                    text, names = [], []
+            else:
+                pending.append(stripped)
+    if names:
+        chunk, width = _convert(text, names, width, path)
+        yield chunk
+
+
+def read_raw(path, limit=None, chunk_records=CHUNK_RECORDS):
+    """All records of ``path`` (or the first ``limit``) as one structured NumPy array."""
+    chunks, total = [], 0
+    for chunk in iter_chunks(path, chunk_records):
+        chunks.append(chunk)
+        total += len(chunk)
+        if limit is not None and total >= limit:
+            break
+    records = np.concatenate(chunks) if chunks else np.empty(0, dtype=record_dtype(len(ATTRIBUTES) - 1))
+    return records[:limit] if limit is not None else records
+
+
+def to_frame(records):
+    """
+    DataFrame view of parsed records with nullable integer coded attributes and float32
+    measurements. Codes outside the int8 range (proto holds protocol loads such as 130) widen
+    to Int16; a coded column with non-integral values is left as float32.
+    """
+    df = pd.DataFrame(records)
+    for col in CATEGORICAL_ATTRS:
+        if col not in df.columns:
+            continue
+        values = df[col].to_numpy()
+        present = values[~np.isnan(values)]
+        if not np.array_equal(present, np.round(present)):
+            continue
+        df[col] = df[col].astype('Int8' if np.all(np.abs(present) <= 127) else 'Int16')
+    return df
+
+
+def upstream_edits(raw_vals, edits):
+    """
+    Raw standard-column values with the edits made upstream when a processed file was
+    built. ``'codes'``: codes outside ``VALID_CODES`` become missing (Switzerland and VA
+    ``thal``, a VA ``slope`` of 0, a Hungarian ``ca`` of 9); ``'num'``: any diagnosis above 0
+    is stored as 1 (processed.hungarian.data). reprocessed.hungarian.data keeps the raw
+    values as they are. Returns the edited values and the number of edited cells.
+    """
+    out = raw_vals.copy()
+    for col, codes in (VALID_CODES.items() if 'codes' in edits else ()):
+        i = PROCESSED_COLUMNS.index(col)
+        out[~np.isnan(out[:, i]) & ~np.isin(out[:, i], list(codes)), i] = np.nan
+    if 'num' in edits:
+        i = PROCESSED_COLUMNS.index('num')
+        out[:, i] = np.where(out[:, i] > 0, 1, out[:, i])
+    edited = int((~np.isclose(out, raw_vals, equal_nan=True)).sum())
+    return out, edited
+
+
+def verify_against_processed(data_dir=DATA_DIR):
+    """
+    Check that every processed 14-column file is the raw records' standard columns with only
+    the upstream edits of ``upstream_edits``. Cleveland (the first 303 records of new.data)
+    and reprocessed.hungarian.data keep the raw row order; the other processed files were
+    re-ordered upstream, so they are compared as multisets of rows. Raises ValueError on
+    any unexplained difference; returns the per-file report otherwise.
+    """
+    report, failures = {}, []
+    for raw_name, proc_name, limit, ordered, edits in PROCESSED_PAIRS:
+        raw = read_raw(os.path.join(data_dir, raw_name), limit)
+        raw_vals = np.column_stack([raw[c].astype(np.float64) for c in PROCESSED_COLUMNS])
+        expected, edited = upstream_edits(raw_vals, edits)
+        proc = pd.read_csv(os.path.join(data_dir, proc_name), header=None, sep=r'[\s,]+', engine='python',
+                           na_values=['?', '-9', '-9.0']).to_numpy(dtype=np.float64)
+        if ordered:
+            matched = int(np.isclose(expected, proc, equal_nan=True).all(axis=1).sum()) if len(proc) == len(expected) else 0
+        else:
+            keys = lambda a: Counter(tuple(np.round(np.nan_to_num(r, nan=MISSING), 2)) for r in a)
+            matched = sum((keys(expected) & keys(proc)).values())
+        name = f'{raw_name} vs {proc_name}'
+        report[name] = {'raw_records': len(raw), 'processed_rows': len(proc), 'matching_rows': matched,
+                        'row_order': ordered, 'upstream_edited_values': edited}
+        if not (matched == len(raw) == len(proc)):
+            failures.append(f"{name}: {matched} of {len(proc)} rows match ({len(raw)} raw records)")
+    if failures:
+        raise ValueError("Raw records disagree with the processed files: " + '; '.join(failures))
+    return report
+
+
+def benchmark(data_dir=DATA_DIR, repeats=5):
+    results = {}
+    for name in RAW_FILES:
+        path = os.path.join(data_dir, name)
+        best = float('inf')
+        for _ in range(repeats):
+            t = time.perf_counter()
+            records = read_raw(path)
+            best = min(best, time.perf_counter() - t)
+        size_mb = os.path.getsize(path) / 1e6
+        results[name] = {'records': len(records), 'attributes': len(records.dtype.names),
+                         'seconds': round(best, 5), 'records_per_s': int(len(records) / best),
+                         'mb_per_s': round(size_mb / best, 1)}
+    return results
+
+
+if __name__ == '__main__':
+    import json
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--verify', action='store_true')
+    parser.add_argument('--benchmark', action='store_true')
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    args = parser.parse_args()
+
+    if args.verify:
+        print(json.dumps(verify_against_processed(args.data_dir), indent=2))
+    if args.benchmark:
+        print(json.dumps(benchmark(args.data_dir), indent=2))
+    if not (args.verify or args.benchmark):
+        for name in RAW_FILES:
+            recs = read_raw(os.path.join(args.data_dir, name))
+            print(f"{name:20} {len(recs):5d} records x {len(recs.dtype.names)} attributes")
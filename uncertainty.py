@@ -0,0 +1,284 @@
+"""
+HeartGuard Pro - Prediction Uncertainty
+An interval around every predicted probability, by the method that suits each model:
+
+    Random Forest        spread of the individual trees' votes (one ``apply`` call, leaf table lookup)
+    Gradient Boosting    bootstrap bank: the model refit on resampled training sets
+    Logistic Regression  bootstrap bank, as above
+    K-Nearest Neighbors  Wilson interval of a vote over k neighbours
+    Voting Ensemble      disagreement between the member models that carry weight
+
+The bootstrap banks are fitted by ``train_models.py`` on full retrains, across the same
+process pool as the base models, and saved to ``uncertainty_bank.pkl`` with the scaler
+they were fitted against. They are compiled for scoring in one pass: the logistic bank is
+a single coefficient matrix, and every tree of every boosted model is stacked into padded
+node arrays that are traversed together.
+
+    python uncertainty.py --benchmark     latency overhead per model; stacked bank vs. a loop over its models
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+from scipy.special import expit, logit
+from scipy.stats import norm
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier, VotingClassifier
+from sklearn.neighbors import KNeighborsClassifier
+
+UNCERTAINTY_BANK_FILE = 'uncertainty_bank.pkl'
+# 200 refits leave 10 in each tail of a 90% percentile interval; fewer makes the bounds jumpy
+BOOTSTRAP_MODELS = 200
+BANK_WORKERS = os.cpu_count() or 1
+INTERVAL_LEVEL = 0.90
+RANDOM_STATE = 42
+
+
+class TreeBank:
+    """
+    Many fitted trees stacked into (trees, nodes) arrays. Leaves point to themselves, so
+    ``max_depth`` steps of a vectorised descent land every (row, tree) pair on its leaf.
+    """
+
+    def __init__(self, trees):
+        n_nodes = max(t.node_count for t in trees)
+        shape = (len(trees), n_nodes)
+        self.feature = np.zeros(shape, dtype=np.intp)
+        self.threshold = np.zeros(shape)
+        self.left = np.zeros(shape, dtype=np.intp)
+        self.right = np.zeros(shape, dtype=np.intp)
+        self.value = np.zeros(shape)
+        for i, t in enumerate(trees):
+            k = t.node_count
+            leaf = t.children_left == -1
+            self.feature[i, :k] = np.where(leaf, 0, t.feature)
+            self.threshold[i, :k] = t.threshold
+            self.left[i, :k] = np.where(leaf, np.arange(k), t.children_left)
+            self.right[i, :k] = np.where(leaf, np.arange(k), t.children_right)
+            self.value[i, :k] = t.value[:, 0, 0]
+        self.depth = max(t.max_depth for t in trees)
+
+    def __len__(self):
+        return len(self.feature)
+
+    def predict(self, X):
+        """Leaf value of every tree for every row: shape (rows, trees)."""
+        X = np.asarray(X, dtype=np.float32).astype(float)   # trees compare float32 inputs
+        trees = np.arange(len(self))[None, :]
+        node = np.zeros((len(X), len(self)), dtype=np.intp)
+        for _ in range(self.depth):
+            x = np.take_along_axis(X, self.feature[trees, node], axis=1)
+            node = np.where(x <= self.threshold[trees, node], self.left[trees, node], self.right[trees, node])
+        return self.value[trees, node]
+
+
+def _bootstrap_indices(y, n_boot, rng):
+    """Resamples that keep both classes present (a boosted model needs two)."""
+    out = []
+    while len(out) < n_boot:
+        idx = rng.integers(0, len(y), len(y))
+        if len(np.unique(y[idx])) == 2:
+            out.append(idx)
+    return out
+
+
+def _fit_resamples(model, Xs, y, indices):
+    return [clone(model).fit(Xs[i], y[i]) for i in indices]
+
+
+def _refit(jobs, Xs, y, indices, workers):
+    """``{name: [model refit on each resample]}``, chunked across a process pool when ``workers > 1``."""
+    if workers <= 1:
+        return {name: _fit_resamples(model, Xs, y, indices) for name, model in jobs.items()}
+    chunks = [c for c in np.array_split(np.arange(len(indices)), workers) if len(c)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {name: [pool.submit(_fit_resamples, model, Xs, y, [indices[i] for i in c]) for c in chunks]
+                   for name, model in jobs.items()}
+        return {name: [m for f in fs for m in f.result()] for name, fs in futures.items()}
+
+
+def fit_bank(models, scaler, X_train, y_train, n_boot=BOOTSTRAP_MODELS, random_state=RANDOM_STATE,
+             keep_models=False, workers=BANK_WORKERS):
+    """
+    Refit Gradient Boosting and Logistic Regression (same parameters) on ``n_boot`` bootstrap
+    resamples of the training set, in ``workers`` processes, and compile them for stacked scoring.
+    The resamples are drawn up front, so the bank does not depend on the worker count.
+    """
+    Xs = scaler.transform(X_train)
+    y = np.asarray(y_train)
+    indices = _bootstrap_indices(y, n_boot, np.random.default_rng(random_state))
+    bank = {'scaler': scaler, 'n_boot': n_boot, 'level': INTERVAL_LEVEL}
+    jobs = {}
+    if models.get('Logistic Regression') is not None:
+        jobs['Logistic Regression'] = clone(models['Logistic Regression']).set_params(warm_start=False)
+    if models.get('Gradient Boosting') is not None:
+        jobs['Gradient Boosting'] = models['Gradient Boosting']
+    fitted = _refit(jobs, Xs, y, indices, workers)
+
+    if 'Logistic Regression' in fitted:
+        bank['Logistic Regression'] = {
+            'coef': np.vstack([m.coef_[0] for m in fitted['Logistic Regression']]),
+            'intercept': np.array([m.intercept_[0] for m in fitted['Logistic Regression']]),
+        }
+
+    if 'Gradient Boosting' in fitted:
+        members = fitted['Gradient Boosting']
+        bank['Gradient Boosting'] = {
+            'trees': TreeBank([est.tree_ for m in members for est in m.estimators_[:, 0]]),
+            'n_estimators': np.array([len(m.estimators_) for m in members]),
+            'learning_rate': np.array([m.learning_rate for m in members]),
+            'init': logit(np.clip([m.init_.predict_proba(Xs[:1])[0, 1] for m in members], 1e-12, 1 - 1e-12)),
+        }
+    if keep_models:
+        bank['models'] = fitted
+    return bank
+
+
+def score_bank(bank, model_name, X_raw):
+    """Probability from every bootstrap model for every row: shape (rows, n_boot)."""
+    Xs = bank['scaler'].transform(X_raw)
+    b = bank[model_name]
+    if model_name == 'Logistic Regression':
+        return expit(Xs @ b['coef'].T + b['intercept'])
+    leaf = b['trees'].predict(Xs)
+    # members may have different tree counts after early stopping; sum each member's block
+    ends = np.cumsum(b['n_estimators'])
+    raw = np.add.reduceat(leaf, ends - b['n_estimators'], axis=1)
+    return expit(b['init'] + b['learning_rate'] * raw)
+
+
+def load_bank(path=UNCERTAINTY_BANK_FILE):
+    return joblib.load(path) if os.path.exists(path) else None
+
+
+class UncertaintyEstimator:
+    """Intervals for the model suite; ``scaler`` is the one the served models expect."""
+
+    def __init__(self, models, scaler, bank=None, level=INTERVAL_LEVEL):
+        self.models = models
+        self.scaler = scaler
+        self.bank = bank
+        self.level = level
+        self._leaf_tables = {}
+
+    def _tails(self):
+        a = (1 - self.level) / 2 * 100
+        return a, 100 - a
+
+    def _forest_votes(self, name, Xs):
+        rf = self.models[name]
+        if name not in self._leaf_tables:
+            n_nodes = max(t.tree_.node_count for t in rf.estimators_)
+            table = np.zeros((len(rf.estimators_), n_nodes))
+            for i, t in enumerate(rf.estimators_):
+                v = t.tree_.value[:, 0, :]
+                table[i, :t.tree_.node_count] = v[:, 1] / v.sum(axis=1)
+            self._leaf_tables[name] = table
+        table = self._leaf_tables[name]
+        return table[np.arange(len(table))[None, :], rf.apply(Xs)]
+
+    def intervals(self, model_name, X_raw):
+        """
+        Per-row probability, interval bounds and spread (all in percent) plus the method used.
+        ``X_raw`` is a DataFrame of unscaled features.
+        """
+        model = self.models[model_name]
+        Xs = self.scaler.transform(X_raw)
+        lo_q, hi_q = self._tails()
+        z = norm.ppf(0.5 + self.level / 2)
+
+        if isinstance(model, RandomForestClassifier):
+            votes = self._forest_votes(model_name, Xs)
+            # fully grown trees vote 0 or 1, so percentiles of the votes collapse; use their spread.
+            # Not a standard error of the mean: the trees are correlated, so that would be far too narrow
+            p, spread = votes.mean(axis=1), votes.std(axis=1)
+            low, high = p - z * spread, p + z * spread
+            method = f'per-tree vote spread ({votes.shape[1]} trees)'
+        elif isinstance(model, VotingClassifier):
+            members = np.stack([est.predict_proba(Xs)[:, 1] for est in model.estimators_], axis=1)
+            w = np.ones(members.shape[1]) if model.weights is None else np.asarray(model.weights, dtype=float)
+            p = members @ w / w.sum()
+            # members tuned to weight 0 take no part in the vote, so not in its range either
+            weighted = members[:, w > 0]
+            low, high = weighted.min(axis=1), weighted.max(axis=1)
+            spread = np.sqrt(((members - p[:, None]) ** 2) @ w / w.sum())
+            method = f'member disagreement (range of the {weighted.shape[1]} weighted member probabilities)'
+        elif self.bank is not None and model_name in self.bank:
+            boot = score_bank(self.bank, model_name, X_raw)
+            p = model.predict_proba(Xs)[:, 1]
+            low, high = np.percentile(boot, [lo_q, hi_q], axis=1)
+            spread, method = boot.std(axis=1), f'bootstrap bank ({boot.shape[1]} refits)'
+        elif isinstance(model, KNeighborsClassifier):
+            k = model.n_neighbors
+            p = model.predict_proba(Xs)[:, 1]
+            spread = np.sqrt(p * (1 - p) / k)
+            centre = (p + z ** 2 / (2 * k)) / (1 + z ** 2 / k)
+            half = z / (1 + z ** 2 / k) * np.sqrt(spread ** 2 + z ** 2 / (4 * k ** 2))
+            low, high = centre - half, centre + half
+            method = f'Wilson interval over {k} neighbours'
+        else:
+            p = model.predict_proba(Xs)[:, 1]
+            return {'probability': p * 100, 'low': None, 'high': None, 'spread': None,
+                    'method': 'unavailable (no bootstrap bank; run train_models.py)', 'level': self.level}
+
+        return {'probability': p * 100, 'low': np.clip(low, 0, 1) * 100, 'high': np.clip(high, 0, 1) * 100,
+                'spread': spread * 100, 'method': method, 'level': self.level}
+
+
+def benchmark(n_boot=BOOTSTRAP_MODELS, batch=100, repeats=20):
+    """
+    Latency of a plain prediction vs. prediction plus interval, for one row and for a
+    batch, per model; and the stacked bank pass vs. a Python loop over the bank's models.
+    """
+    from inference import load_engine
+    from heart_data import load_training_data, split_holdout
+    engine = load_engine()
+    X_train, X_test, y_train, _ = split_holdout(load_training_data(engine.metadata.get('sites')))
+    t = time.perf_counter()
+    bank = fit_bank(engine.models, engine.scaler, X_train, y_train, n_boot, keep_models=True)
+    results = {'bank_fit_s': round(time.perf_counter() - t, 2), 'n_boot': n_boot, 'latency_ms': {}}
+    est = UncertaintyEstimator(engine.models, engine.scaler, bank)
+    one, many = X_test.iloc[:1], X_test.sample(batch, replace=True, random_state=0)
+
+    def timed(fn):
+        fn()
+        t = time.perf_counter()
+        for _ in range(repeats):
+            fn()
+        return round((time.perf_counter() - t) / repeats * 1000, 2)
+
+    for name, model in engine.models.items():
+        results['latency_ms'][name] = {
+            'predict_1': timed(lambda: model.predict_proba(engine.scaler.transform(one))),
+            'with_interval_1': timed(lambda: est.intervals(name, one)),
+            f'predict_{batch}': timed(lambda: model.predict_proba(engine.scaler.transform(many))),
+            f'with_interval_{batch}': timed(lambda: est.intervals(name, many)),
+        }
+
+    for name, members in bank.pop('models').items():
+        Xs = engine.scaler.transform(one)
+        stacked = score_bank(bank, name, one)
+        looped = np.array([[m.predict_proba(Xs)[0, 1] for m in members]])
+        results.setdefault('bank_pass_ms', {})[name] = {
+            'stacked': timed(lambda: score_bank(bank, name, one)),
+            'python_loop': timed(lambda: [m.predict_proba(Xs) for m in members]),
+            'max_abs_diff': float(np.abs(stacked - looped).max()),
+        }
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--benchmark', action='store_true')
+    parser.add_argument('--bootstrap', type=int, default=BOOTSTRAP_MODELS)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        print(json.dumps(benchmark(args.bootstrap), indent=2))
+    else:
+        parser.print_help()